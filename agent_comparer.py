@@ -1,33 +1,79 @@
+from collections import deque
 from typing import Optional
 import os
-from openai import AzureOpenAI
+import threading
+import time
 
-client = AzureOpenAI(
-    api_key=os.environ["OPENAI_API_KEY"],
-    api_version="2024-08-01-preview",
-    azure_endpoint="https://forhr.openai.azure.com/"
-)
+# The openai SDK is slow to import, so the client is built on first use (or by
+# warmup.py in the background) rather than when this module is imported.
+_client = None
+_client_lock = threading.Lock()
 
-def _build_summary_prompt(cand_summary: str, other_summaries: dict[str, str]) -> str:
-    others_text = "\n\n".join(
-        f"--- {name} ---\n{summary}" for name, summary in other_summaries.items()
-    )
-    return f"""
-You are a precise hiring brief writer.
+def get_client():
+    """Process-wide AzureOpenAI client, or None when OPENAI_API_KEY isn't set."""
+    global _client
+    with _client_lock:
+        if _client is None and os.getenv("OPENAI_API_KEY"):
+            from openai import AzureOpenAI
+            _client = AzureOpenAI(
+                api_key=os.environ["OPENAI_API_KEY"],
+                api_version="2024-08-01-preview",
+                azure_endpoint="https://forhr.openai.azure.com/"
+            )
+        return _client
 
-Task: Compare {cand_name}'s summary with the other candidates applying for the same role. Focus specifically on the following capability pairings:
+DOC_CHARS_PER_CANDIDATE = 4000  # keep uploaded-document excerpts from dominating the prompt
+
+# Everything candidate-independent lives in this one system message, ahead of the
+# inputs; the user message then goes from least to most specific: current
+# candidate, the others, document excerpts last. This is about 270 tokens, well
+# short of the 1024-token shared prefix Azure's prompt cache needs, so on its own
+# it earns no cache hits; only a regenerate or a repeat with the same candidate and
+# a long summary/documents gets that far. Cost estimates count cached tokens only
+# when the API reports them, at the route's cached price.
+INSTRUCTIONS = """You are a precise, factual HR analyst and hiring brief writer.
+
+Task: Compare the current candidate's summary with the other candidates applying for the same role. Focus specifically on the following capability pairings:
 - People Orientation + Tolerance
 - Decision-making + Ability to Notice
 - Dealing with Difficult Situations + Tolerance
 - Trainability + Role ID / Receptiveness to Change
 
 Instructions:
-- If {cand_name} is stronger or weaker than another candidate in any area, state this clearly with evidence.
+- If the current candidate is stronger or weaker than another candidate in any area, state this clearly with evidence.
 - Mention any additional 'leg ups' either candidate may have.
 - Write in a professional, manager-friendly tone.
+- Refer to candidates by the names given in the inputs.
+
+Output format:
+1. **Narrative Comparison**: A cohesive paragraph summarizing relative strengths, risks, and fit.
+2. **Factual Highlights**: 3–5 concise bullet points with specific comparisons (trait vs trait).
+3. **Interview Probes**: 2–3 targeted interview questions for each candidate, focusing on areas of uncertainty, contradictions, or critical gaps.
+
+The inputs follow in the next message."""
 
-Inputs:
-Current Candidate ({cand_name}):
+def _documents_block(documents: dict[str, str] | None) -> str:
+    if not documents:
+        return ""
+    parts = [
+        f"--- {name} ---\n{(text or '')[:DOC_CHARS_PER_CANDIDATE]}"
+        for name, text in documents.items() if (text or "").strip()
+    ]
+    if not parts:
+        return ""
+    return "\nSupporting documents (résumés/reports, excerpts):\n---\n" + "\n\n".join(parts) + "\n---\n"
+
+def _build_summary_prompt(
+    cand_summary: str,
+    other_summaries: dict[str, str],
+    cand_name: str = "the current candidate",
+    documents: dict[str, str] | None = None,
+) -> str:
+    """The per-request part of the prompt (the user message); INSTRUCTIONS is the fixed part."""
+    others_text = "\n\n".join(
+        f"--- {name} ---\n{summary}" for name, summary in other_summaries.items()
+    )
+    return f"""Current Candidate ({cand_name}):
 ---
 {cand_summary}
 ---
@@ -36,35 +82,166 @@ Other Candidates:
 ---
 {others_text}
 ---
+{_documents_block(documents)}"""
 
-Output format:
-1. **Narrative Comparison**: A cohesive paragraph summarizing relative strengths, risks, and fit.
-2. **Factual Highlights**: 3–5 concise bullet points with specific comparisons (trait vs trait).
-3. **Interview Probes**: 2–3 targeted interview questions for each candidate, focusing on areas of uncertainty, contradictions, or critical gaps.
-"""
+def _build_messages(prompt: str) -> list[dict]:
+    return [
+        {"role": "system", "content": INSTRUCTIONS},
+        {"role": "user", "content": prompt},
+    ]
+
+# ---------- routing ----------
+# Drafts for small groups go to a fast, cheap deployment; big groups, long inputs
+# (documents included) and final briefs go to the strong one. Prices are USD per
+# 1K tokens as "input,output[,cached input]" and only feed the cost estimates in
+# route_stats(); without a cached price, cached tokens are billed as input (gpt-4
+# has no prompt caching).
+
+def _prices(env: str, default: str) -> tuple[float, float, float]:
+    parts = [float(p) for p in os.getenv(env, default).split(",")]
+    return parts[0], parts[1], parts[2] if len(parts) > 2 else parts[0]
+
+ROUTES = {
+    "fast": {"deployment": os.getenv("LLM_FAST_DEPLOYMENT", "gpt-4o-mini"),
+             "prices": _prices("LLM_FAST_PRICES", "0.00015,0.0006,0.000075")},
+    "strong": {"deployment": os.getenv("LLM_STRONG_DEPLOYMENT", "gpt-4"),
+               "prices": _prices("LLM_STRONG_PRICES", "0.03,0.06")},
+}
+STRONG_MIN_OTHERS = int(os.getenv("LLM_STRONG_MIN_OTHERS", "3"))
+STRONG_MIN_CHARS = int(os.getenv("LLM_STRONG_MIN_CHARS", "12000"))   # ≈3K prompt tokens
+
+def choose_route(n_others: int, prompt_chars: int, final: bool = False) -> str:
+    if final or n_others >= STRONG_MIN_OTHERS or prompt_chars >= STRONG_MIN_CHARS:
+        return "strong"
+    return "fast"
+
+def _cost(route: str, tokens_in: int, cached: int, tokens_out: int) -> float:
+    p_in, p_out, p_cached = ROUTES.get(route, ROUTES["strong"])["prices"]
+    return ((tokens_in - cached) * p_in + cached * p_cached + tokens_out * p_out) / 1000
+
+_calls = deque(maxlen=2000)   # recent call records for route_stats()
+_calls_lock = threading.Lock()
+
+def summarize_calls(calls: list[dict]) -> dict:
+    """{route: calls, cache hits, errors, latency p50/p95, tokens, cached tokens, cost} for call records."""
+    out = {}
+    for route in sorted({c["route"] for c in calls}):
+        mine = [c for c in calls if c["route"] == route]
+        live = sorted(c["seconds"] for c in mine if not c["cache_hit"] and not c["error"])
+        pct = lambda p: round(live[min(len(live) - 1, round(p * (len(live) - 1)))], 3) if live else None
+        ttfts = sorted(c["ttft_s"] for c in mine if c.get("ttft_s") is not None)
+        out[route] = {
+            "calls": len(mine),
+            "cache_hits": sum(c["cache_hit"] for c in mine),
+            "errors": sum(bool(c["error"]) for c in mine),
+            "p50_s": pct(0.5),
+            "p95_s": pct(0.95),
+            "ttft_p50_s": ttfts[len(ttfts) // 2] if ttfts else None,
+            "tokens_in": sum(c["tokens_in"] for c in mine),
+            "cached_tokens": sum(c["cached_tokens"] for c in mine),
+            "tokens_out": sum(c["tokens_out"] for c in mine),
+            "cost_usd": round(sum(c["cost_usd"] for c in mine), 4),
+        }
+    return out
+
+def route_stats() -> dict:
+    """summarize_calls() over this process's recent agent calls."""
+    with _calls_lock:
+        return summarize_calls(list(_calls))
+
+def _stream_completion(client, model: str, messages: list[dict], t0: float):
+    """(text, usage, seconds to the first content token) from a streamed completion."""
+    parts, usage, ttft = [], None, None
+    for chunk in client.chat.completions.create(model=model, messages=messages, temperature=0.3,
+                                                stream=True, stream_options={"include_usage": True}):
+        if chunk.choices and chunk.choices[0].delta.content:
+            if ttft is None:
+                ttft = round(time.perf_counter() - t0, 3)
+            parts.append(chunk.choices[0].delta.content)
+        usage = getattr(chunk, "usage", None) or usage
+    return "".join(parts), usage, ttft
+
+def compare_summaries_detailed(
+    cand_summary: str,
+    other_summaries: dict[str, str],
+    *,
+    cand_name: str = "the current candidate",
+    documents: Optional[dict[str, str]] = None,
+    model: Optional[str] = None,
+    route: Optional[str] = None,
+    final: bool = False,
+    use_cache: bool = True,
+    stream: bool = False,
+) -> dict:
+    """compare_summaries_agent, returning the text with its call record.
+
+    {"text", "route", "model", "cache_hit", "seconds", "ttft_s", "tokens_in",
+    "cached_tokens", "tokens_out", "cost_usd", "error"}. `route` ("fast"/"strong")
+    overrides choose_route(); an explicit `model` overrides the route's deployment.
+    stream=True streams the completion so ttft_s (time to first token) is measured.
+    """
+    prompt = _build_summary_prompt(cand_summary, other_summaries, cand_name, documents)
+    messages = _build_messages(prompt)
+    route = route or choose_route(len(other_summaries), len(INSTRUCTIONS) + len(prompt), final)
+    model = model or ROUTES.get(route, ROUTES["strong"])["deployment"]
+    call = {"text": "", "route": route, "model": model, "cache_hit": False, "seconds": 0.0, "ttft_s": None,
+            "tokens_in": 0, "cached_tokens": 0, "tokens_out": 0, "cost_usd": 0.0, "error": None}
+    client = get_client()
+    if client is None:
+        return {**call, "text": "(Agent not configured)", "error": "not configured"}
+
+    # identical messages + model → reuse the earlier answer (shared across instances)
+    import hashlib
+    from cache_backend import get_cache
+    cache_key = hashlib.sha256(f"{model}\n{INSTRUCTIONS}\n{prompt}".encode("utf-8")).hexdigest()
+    cached = get_cache().get("llm", cache_key) if use_cache else None
+    if cached is not None:
+        call.update(text=cached.decode("utf-8"), cache_hit=True)
+    else:
+        t0 = time.perf_counter()
+        try:
+            if stream:
+                out, usage, call["ttft_s"] = _stream_completion(client, model, messages, t0)
+            else:
+                resp = client.chat.completions.create(model=model, messages=messages, temperature=0.3)
+                out, usage = resp.choices[0].message.content, getattr(resp, "usage", None)
+            out = out.strip()
+            get_cache().set("llm", cache_key, out.encode("utf-8"), ttl=7 * 24 * 3600)
+            details = getattr(usage, "prompt_tokens_details", None)
+            call.update(
+                text=out,
+                tokens_in=getattr(usage, "prompt_tokens", 0) or 0,
+                cached_tokens=getattr(details, "cached_tokens", 0) or 0,
+                tokens_out=getattr(usage, "completion_tokens", 0) or 0,
+            )
+            call["cost_usd"] = _cost(route, call["tokens_in"], call["cached_tokens"], call["tokens_out"])
+        except Exception as e:
+            call.update(text=f"(Agent error: {e})", error=str(e))
+        call["seconds"] = round(time.perf_counter() - t0, 3)
+    with _calls_lock:
+        _calls.append({k: v for k, v in call.items() if k != "text"})
+    return call
 
 def compare_summaries_agent(
     cand_summary: str,
     other_summaries: dict[str, str],
     *,
+    cand_name: str = "the current candidate",
+    documents: Optional[dict[str, str]] = None,
     model: Optional[str] = None,
+    route: Optional[str] = None,
+    final: bool = False,
+    use_cache: bool = True,
 ) -> str:
-    """Compare one candidate’s summary against multiple others."""
-    prompt = _build_summary_prompt(cand_summary, other_summaries)
-    if client is None:
-        return "(Agent not configured)"
-
-    model = model or "gpt-4"
-
-    try:
-        resp = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "You are a precise, factual HR analyst."},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.3,
-        )
-        return resp.choices[0].message.content.strip()
-    except Exception as e:
-        return f"(Agent error: {e})"
+    """Compare one candidate’s summary against multiple others.
+
+    `documents` maps a candidate name to text extracted from their uploaded
+    files (see extract.py); excerpts are appended to the prompt when given.
+    The deployment comes from choose_route() unless `route` or `model` is given;
+    pass final=True for briefs that will be archived.
+    Answers are cached per prompt+model; pass use_cache=False to force a new draft.
+    """
+    return compare_summaries_detailed(
+        cand_summary, other_summaries, cand_name=cand_name, documents=documents,
+        model=model, route=route, final=final, use_cache=use_cache,
+    )["text"]
@@ -0,0 +1,415 @@
+# api.py
+# Read-only JSON API over the candidate bank, for tools that shouldn't have to open the UI.
+#
+#   python api.py [--host 127.0.0.1] [--port 8601] [--no-warm]
+#
+#   GET /health
+#   GET /candidates?offset=0&limit=50&q=<substring>
+#   GET /candidates/<cand>                 summary + Athena + Genos tables
+#   GET /candidates/<cand>/summary
+#   GET /candidates/<cand>/athena?offset=&limit=
+#   GET /candidates/<cand>/genos?offset=&limit=
+#   GET /compare?c=<cand>&c=<cand>...      side-by-side Athena and Genos tables
+#
+# Data comes from the same loaders as the Compare panel (compare.py) and the bank's
+# listing (listing.py). Responses are cached in-process per URL together with the
+# version of the blobs they were built from (their ETags in the listing), so a poll
+# for something that hasn't changed is a dict lookup: the body is reused, and with
+# If-None-Match / If-Modified-Since it's a 304 with no body at all. A background
+# thread keeps the listing current; when a candidate's blobs change, its entries in
+# the compare.py / cache_backend caches are dropped before anything is rebuilt.
+# Bodies over GZIP_MIN_BYTES are gzipped once per version for clients that accept it.
+# Set API_TOKEN to require "Authorization: Bearer <token>".
+import argparse
+import gzip
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlencode, urlsplit
+
+log = logging.getLogger("api")
+
+API_TOKEN = os.getenv("API_TOKEN", "")
+REFRESH_S = float(os.getenv("API_REFRESH_S", "2"))     # listing catch-up interval
+MAX_AGE = int(os.getenv("API_MAX_AGE", "5"))           # Cache-Control max-age for clients
+CACHE_ENTRIES = int(os.getenv("API_CACHE_ENTRIES", "4096"))
+WARM_CANDIDATES = int(os.getenv("API_WARM_CANDIDATES", "200"))
+GZIP_MIN_BYTES = 1024
+DEFAULT_LIMIT, MAX_LIMIT = 50, 500
+MAX_COMPARE = 10
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class _Entry:
+    __slots__ = ("version", "body", "etag", "last_modified", "headers", "_gz")
+
+    def __init__(self, version, body: bytes, last_modified: float, headers: dict | None = None):
+        self.version = version
+        self.body = body
+        self.headers = headers or {}
+        self.etag = f'W/"{hashlib.blake2b(body, digest_size=10).hexdigest()}"'
+        self.last_modified = last_modified
+        self._gz = None
+
+    def gzipped(self) -> bytes:
+        if self._gz is None:
+            self._gz = gzip.compress(self.body, compresslevel=6)
+        return self._gz
+
+
+class ResponseCache:
+    """URL → last body built, keyed by the source version it was built from (LRU)."""
+
+    def __init__(self, max_entries: int = CACHE_ENTRIES):
+        self._max = max_entries
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "builds": 0, "not_modified": 0}
+
+    def get(self, key: str, version, build) -> _Entry:
+        with self._lock:
+            e = self._entries.get(key)
+            if e is not None:
+                self._entries.move_to_end(key)
+                if version is not None and e.version == version:
+                    self.stats["hits"] += 1
+                    return e
+        obj = build()
+        body = json.dumps(obj, default=str, separators=(",", ":")).encode("utf-8")
+        nxt = obj.get("next") if isinstance(obj, dict) else None
+        new = _Entry(version, body, time.time(), {"Link": f'<{nxt}>; rel="next"'} if nxt else None)
+        if e is not None and e.etag == new.etag:
+            new.last_modified = e.last_modified   # same bytes as before: keep the old validator dates
+        with self._lock:
+            self.stats["builds"] += 1
+            self._entries[key] = new
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max:
+                self._entries.popitem(last=False)
+        return new
+
+
+# ---------- data ----------
+
+class Bank:
+    """Listing-backed versions plus the compare.py loaders, with per-candidate invalidation."""
+
+    def __init__(self):
+        import records
+        from listing import get_listing
+        self.container = records.CONTAINER
+        self.listing = get_listing(self.container)
+        self._versions: dict[str, tuple] = {}   # cand → blob version last served
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        self.listing.refresh()
+
+    def candidates(self) -> list[str]:
+        return self.listing.candidates()
+
+    def exists(self, cand: str) -> bool:
+        return self.listing.blobs(cand) != {}
+
+    def version(self, cand: str) -> tuple | None:
+        """((blob, etag, size), ...) for a candidate; None while the listing can't say."""
+        blobs = self.listing.blobs(cand)
+        if blobs is None:
+            return None
+        v = tuple(sorted((p, *meta) for p, meta in blobs.items()))
+        with self._lock:
+            old = self._versions.get(cand)
+            self._versions[cand] = v
+        if old is not None and old != v:
+            self._invalidate(cand, old)
+        return v
+
+    def _invalidate(self, cand: str, old: tuple):
+        """Drop everything the loaders cached for `cand` so the rebuild reads storage."""
+        import compare as cmp
+        import records
+        from cache_backend import get_cache
+        c = get_cache()
+        for path, *_ in old:
+            c.delete("blob", f"{cmp.DASHBOARD}/{path}")
+        records.invalidate_candidate(cand)
+        cmp.load_summary_text.clear(cand)
+        cmp._list_csvs_for_candidate.clear(cand)
+        cmp.load_candidate_measure_maps.clear(cand)
+        cmp.build_athena_table.clear([cand])
+        cmp.build_gensos_table.clear([cand])
+
+    # loaders (compare.py)
+    def summary(self, cand: str) -> str:
+        import compare as cmp
+        return cmp.load_summary_text(cand)
+
+    def athena(self, cands: list[str]):
+        import compare as cmp
+        if len(cands) > 1:
+            cmp.build_athena_table.clear(cands)   # group tables aren't keyed per candidate
+        return cmp.build_athena_table(cands)
+
+    def genos(self, cands: list[str]):
+        import compare as cmp
+        if len(cands) > 1:
+            cmp.build_gensos_table.clear(cands)
+        return cmp.build_gensos_table(cands)
+
+
+def _table(df, offset: int = 0, limit: int | None = None, next_url=None) -> dict:
+    """{'columns', 'rows', 'total', 'offset', 'limit'[, 'next']}; rows are dicts keyed by column."""
+    rows = [] if df is None else df.to_dict(orient="records")
+    total = len(rows)
+    out = {"columns": [] if df is None else [str(c) for c in df.columns],
+           "rows": rows[offset:offset + limit] if limit else rows,
+           "total": total, "offset": offset, "limit": limit or total}
+    if limit and next_url:
+        out["next"] = next_url(total)
+    return out
+
+
+def _page_args(qs: dict) -> tuple[int, int]:
+    try:
+        offset = max(0, int(qs.get("offset", ["0"])[0]))
+        limit = min(MAX_LIMIT, max(1, int(qs.get("limit", [str(DEFAULT_LIMIT)])[0])))
+    except ValueError:
+        raise ApiError(400, "offset and limit must be integers")
+    return offset, limit
+
+
+def _next_link(path: str, qs: dict, offset: int, limit: int, total: int) -> str | None:
+    if offset + limit >= total:
+        return None
+    q = {k: v for k, v in qs.items() if k not in ("offset", "limit")}
+    q.update(offset=[str(offset + limit)], limit=[str(limit)])
+    return quote(path) + "?" + urlencode(q, doseq=True)
+
+
+# ---------- routing ----------
+
+class Api:
+    def __init__(self, bank: Bank | None = None, cache: ResponseCache | None = None):
+        self.bank = bank or Bank()
+        self.cache = cache or ResponseCache()
+        self.started = time.time()
+
+    def handle(self, raw_path: str) -> _Entry:
+        """Cached response entry for a GET; raises ApiError."""
+        url = urlsplit(raw_path)
+        path = "/" + "/".join(unquote(p) for p in url.path.split("/") if p)
+        qs = parse_qs(url.query)
+        key = f"{path}?{urlencode(sorted((k, v) for k, vs in qs.items() for v in vs))}"
+        parts = path.strip("/").split("/") if path != "/" else []
+
+        if parts == ["health"]:
+            return self._health()
+
+        if parts == ["candidates"]:
+            offset, limit = _page_args(qs)
+            needle = (qs.get("q", [""])[0] or "").strip().lower()
+
+            def build():
+                from records import display_name
+                names = self.bank.candidates()
+                found = [c for c in names if needle in c.lower() or needle in display_name(c).lower()] if needle else names
+                return {"items": [{"name": c, "display_name": display_name(c)} for c in found[offset:offset + limit]],
+                        "total": len(found), "offset": offset, "limit": limit,
+                        "next": _next_link(path, qs, offset, limit, len(found))}
+            # any put/delete in the bank bumps the listing's generation
+            return self.cache.get(key, self.bank.listing.generation, build)
+
+        if len(parts) in (2, 3) and parts[0] == "candidates":
+            cand = parts[1]
+            if not self.bank.exists(cand):
+                raise ApiError(404, f"unknown candidate: {cand}")
+            view = parts[2] if len(parts) == 3 else ""
+            if view not in ("", "summary", "athena", "genos"):
+                raise ApiError(404, f"unknown view: {view}")
+            offset, limit = _page_args(qs) if view in ("athena", "genos") else (0, None)
+            version = self.bank.version(cand)
+
+            def build():
+                from records import display_name
+                if view == "summary":
+                    return {"name": cand, "summary": self.bank.summary(cand)}
+                if view in ("athena", "genos"):
+                    df = self.bank.athena([cand]) if view == "athena" else self.bank.genos([cand])
+                    return {"name": cand, **_table(df, offset, limit,
+                                                   lambda total: _next_link(path, qs, offset, limit, total))}
+                return {"name": cand, "display_name": display_name(cand), "summary": self.bank.summary(cand),
+                        "athena": _table(self.bank.athena([cand])), "genos": _table(self.bank.genos([cand])),
+                        "files": [p for p, *_ in version] if version else None}
+            return self.cache.get(key, version, build)
+
+        if parts == ["compare"]:
+            cands = list(dict.fromkeys(c for v in qs.get("c", []) + qs.get("cands", []) for c in v.split(",") if c))
+            if not 1 <= len(cands) <= MAX_COMPARE:
+                raise ApiError(400, f"pass 1–{MAX_COMPARE} candidates as ?c=A&c=B")
+            unknown = [c for c in cands if not self.bank.exists(c)]
+            if unknown:
+                raise ApiError(404, f"unknown candidate(s): {', '.join(unknown)}")
+            versions = tuple(self.bank.version(c) for c in cands)
+            version = None if any(v is None for v in versions) else versions
+
+            def build():
+                return {"candidates": cands, "athena": _table(self.bank.athena(cands)),
+                        "genos": _table(self.bank.genos(cands))}
+            return self.cache.get(key, version, build)
+
+        raise ApiError(404, f"no route for {path}")
+
+    def _health(self) -> _Entry:
+        from cache_backend import get_cache
+        body = {"ok": True, "uptime_s": round(time.time() - self.started, 1),
+                "candidates": len(self.bank.candidates()), "listing_complete": self.bank.listing.complete,
+                "listing": self.bank.listing.stats, "responses": self.cache.stats, "cache": get_cache().stats()}
+        return _Entry(None, json.dumps(body, default=str).encode("utf-8"), time.time())
+
+    # ---- background work ----
+    def start_refresher(self, interval: float = REFRESH_S) -> threading.Thread:
+        def _loop():
+            while True:
+                try:
+                    self.bank.refresh()
+                except Exception as e:   # storage hiccup: keep serving the last listing
+                    log.warning("listing refresh failed: %s", e)
+                time.sleep(interval)
+        t = threading.Thread(target=_loop, name="api-refresh", daemon=True)
+        t.start()
+        return t
+
+    def warm(self, max_candidates: int = WARM_CANDIDATES) -> dict:
+        """Finish the first listing resync and build the hottest responses before serving."""
+        import records
+        t0 = time.perf_counter()
+        cands = records.list_candidates(wait=True)
+        self.handle("/candidates")
+        todo = cands[:max_candidates]
+
+        def _one(c):
+            try:
+                self.handle(f"/candidates/{quote(c)}")
+                return True
+            except Exception:
+                return False
+        with ThreadPoolExecutor(max_workers=8) as ex:
+            built = sum(ex.map(_one, todo))
+        return {"candidates": len(cands), "warmed": built, "seconds": round(time.perf_counter() - t0, 3)}
+
+
+# ---------- HTTP ----------
+
+def _not_modified(entry: _Entry, headers) -> bool:
+    inm = headers.get("If-None-Match")
+    if inm is not None:
+        tags = {t.strip() for t in inm.split(",")}
+        # weak comparison (RFC 9110 13.1.2): gzip and identity share a validator
+        return "*" in tags or entry.etag in tags or entry.etag[2:] in tags
+    ims = headers.get("If-Modified-Since")
+    if ims:
+        try:
+            return int(entry.last_modified) <= parsedate_to_datetime(ims).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def make_handler(api: Api):
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "CandidateAPI/1"
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):
+            log.debug("%s - %s", self.address_string(), fmt % args)
+
+        def _send(self, status: int, body: bytes, headers: dict, head: bool = False):
+            self.send_response(status)
+            for k, v in headers.items():
+                self.send_header(k, v)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if not head and body:
+                self.wfile.write(body)
+
+        def _error(self, status: int, message: str, head: bool = False):
+            body = json.dumps({"error": message}).encode("utf-8")
+            self._send(status, body, {"Content-Type": "application/json", "Cache-Control": "no-store"}, head)
+
+        def _authorized(self) -> bool:
+            if not API_TOKEN:
+                return True
+            got = self.headers.get("Authorization", "")
+            return hmac.compare_digest(got.encode(), f"Bearer {API_TOKEN}".encode())
+
+        def do_GET(self, head: bool = False):
+            if not self._authorized():
+                return self._error(401, "missing or wrong bearer token", head)
+            try:
+                entry = api.handle(self.path)
+            except ApiError as e:
+                return self._error(e.status, str(e), head)
+            except Exception as e:
+                log.exception("GET %s failed", self.path)
+                return self._error(500, f"{type(e).__name__}: {e}", head)
+            headers = {
+                "ETag": entry.etag,
+                "Last-Modified": formatdate(entry.last_modified, usegmt=True),
+                "Cache-Control": f"max-age={MAX_AGE}",
+                "Vary": "Accept-Encoding",
+                **entry.headers,
+            }
+            if _not_modified(entry, self.headers):
+                api.cache.stats["not_modified"] += 1
+                return self._send(304, b"", headers, head=True)
+            body = entry.body
+            if len(body) >= GZIP_MIN_BYTES and "gzip" in self.headers.get("Accept-Encoding", ""):
+                body = entry.gzipped()
+                headers["Content-Encoding"] = "gzip"
+            headers["Content-Type"] = "application/json; charset=utf-8"
+            self._send(200, body, headers, head)
+
+        def do_HEAD(self):
+            self.do_GET(head=True)
+
+    return Handler
+
+
+def serve(host: str = "127.0.0.1", port: int = 8601, warm: bool = True) -> ThreadingHTTPServer:
+    api = Api()
+    if warm:
+        log.info("warm-up: %s", api.warm())
+    api.start_refresher()
+    httpd = ThreadingHTTPServer((host, port), make_handler(api))
+    httpd.daemon_threads = True
+    httpd.api = api
+    return httpd
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    ap = argparse.ArgumentParser(description="Read-only JSON API over the candidate bank")
+    ap.add_argument("--host", default=os.getenv("API_HOST", "127.0.0.1"))
+    ap.add_argument("--port", type=int, default=int(os.getenv("API_PORT", "8601")))
+    ap.add_argument("--no-warm", action="store_true", help="serve immediately; caches fill on first use")
+    args = ap.parse_args()
+    httpd = serve(args.host, args.port, warm=not args.no_warm)
+    log.info("serving on http://%s:%d", args.host, args.port)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
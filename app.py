@@ -1,5 +1,9 @@
 # app.py
 import streamlit as st
+import warmup
+
+# no-op after the first session; `python warmup.py` starts it before the server listens
+warmup.start_warmup()
 
 st.set_page_config(page_title="Candidates", page_icon="🧩", layout="wide")
 
@@ -0,0 +1,306 @@
+# benchmarks/agent_eval.py
+# Offline latency/token evaluation of the comparison agent (agent_comparer.py).
+#
+#   python benchmarks/agent_eval.py                                     # stub LLM, auto/fast/strong
+#   python benchmarks/agent_eval.py --variant new --variant old:module=/tmp/agent_comparer_old.py
+#   python benchmarks/agent_eval.py --record calls.jsonl                # real deployments, saved
+#   python benchmarks/agent_eval.py --replay calls.jsonl                # the same calls, no network
+#   python benchmarks/agent_eval.py --json after.json --baseline before.json --tolerance 0.1
+#
+# A fixed corpus of candidate summaries (fakes.seed_bank, or --corpus FILE as
+# {name: summary}) is cut into comparison cases of each --groups size, and every
+# case goes through compare_summaries_detailed(stream=True, use_cache=False) once
+# per variant. Each call is measured at the client: prompt/cached/completion
+# tokens, time to first token, total latency and answer size.
+#
+# A variant is NAME[:key=value,...] with keys
+#   route=fast|strong   force a route instead of choose_route()
+#   model=DEPLOYMENT    force a deployment
+#   final=1             route as a final brief
+#   module=PATH         load agent_comparer from another file, e.g. the previous
+#                       version: git show HEAD~1:agent_comparer.py > /tmp/agent_comparer_old.py
+#
+# Responses come from fakes.StubLLM by default (per-model speed profiles, scaled
+# by --time-scale), from a recording (--replay), or from the real client when
+# OPENAI_API_KEY is set and --record is given. With --baseline the run is compared
+# with an earlier --json file; a metric that grew by more than --tolerance is a
+# regression and the exit code is 1.
+import argparse
+import importlib.util
+import json
+import os
+import random
+import sys
+import threading
+import time
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.dirname(os.path.abspath(__file__))]
+
+import fakes  # noqa: E402
+
+# stub (seconds to first token, tokens/s) per deployment; unknown models use --stub-latency
+STUB_PROFILES = {"gpt-4o-mini": (0.35, 110.0), "gpt-4": (0.9, 30.0)}
+DEFAULT_VARIANTS = ("auto", "fast:route=fast", "strong:route=strong")
+# lower is better for all of these; a baseline comparison flags growth beyond --tolerance
+GUARDED = ("ttft_p95_s", "latency_p95_s", "tokens_in_mean", "tokens_out_mean", "output_chars_mean", "cost_usd")
+
+
+def _pct(xs: list[float], p: float) -> float | None:
+    xs = sorted(x for x in xs if x is not None)
+    return round(xs[min(len(xs) - 1, max(0, round(p / 100 * (len(xs) - 1))))], 3) if xs else None
+
+
+def _mean(xs) -> float | None:
+    xs = [x for x in xs if x is not None]
+    return round(sum(xs) / len(xs), 1) if xs else None
+
+
+# ---------- clients ----------
+
+class Meter:
+    """Wraps an LLM client and measures each completion from the caller's thread."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self._local = threading.local()
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self._create))
+
+    def last(self) -> dict | None:
+        return getattr(self._local, "last", None)
+
+    def _finish(self, rec: dict, t0: float, text: str, usage):
+        details = getattr(usage, "prompt_tokens_details", None)
+        rec.update(seconds=round(time.perf_counter() - t0, 3), output_chars=len(text), text=text,
+                   tokens_in=getattr(usage, "prompt_tokens", 0) or 0,
+                   cached_tokens=getattr(details, "cached_tokens", 0) or 0,
+                   tokens_out=getattr(usage, "completion_tokens", 0) or 0)
+
+    def _create(self, *, model, messages, stream=False, **kw):
+        rec = {"key": fakes.request_key(model, messages), "model": model,
+               "prompt_chars": sum(len(m["content"]) for m in messages), "ttft_s": None}
+        self._local.last = rec
+        t0 = time.perf_counter()
+        resp = self.inner.chat.completions.create(model=model, messages=messages, stream=stream, **kw)
+        if not stream:
+            text = resp.choices[0].message.content or ""
+            rec["ttft_s"] = round(time.perf_counter() - t0, 3)   # nothing arrives before the whole answer
+            self._finish(rec, t0, text, getattr(resp, "usage", None))
+            return resp
+
+        def _chunks():
+            parts, usage = [], None
+            for chunk in resp:
+                if chunk.choices and chunk.choices[0].delta.content and rec["ttft_s"] is None:
+                    rec["ttft_s"] = round(time.perf_counter() - t0, 3)
+                if chunk.choices:
+                    parts.append(chunk.choices[0].delta.content or "")
+                usage = getattr(chunk, "usage", None) or usage
+                yield chunk
+            self._finish(rec, t0, "".join(parts), usage)
+        return _chunks()
+
+
+def _load_agent(name: str, path: str | None):
+    if not path:
+        import agent_comparer
+        return agent_comparer
+    spec = importlib.util.spec_from_file_location(f"agent_comparer_{name}", path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def parse_variant(spec: str) -> dict:
+    name, _, opts = spec.partition(":")
+    v = {"name": name, "route": None, "model": None, "final": False, "module": None}
+    for kv in filter(None, opts.split(",")):
+        k, _, val = kv.partition("=")
+        if k not in v or k == "name":
+            raise SystemExit(f"unknown variant option {k!r} in {spec!r}")
+        v[k] = val.lower() in ("1", "true", "yes") if k == "final" else val
+    return v
+
+
+# ---------- corpus ----------
+
+def load_corpus(path: str | None, bank: int, seed: int) -> dict[str, str]:
+    if path:
+        with open(path) as f:
+            return json.load(f)
+    import records
+    import storage
+    fakes.install_storage()
+    cc = fakes.STORE.get_container_client(records.CONTAINER)
+    return {records.display_name(c): storage.download(cc, f"{c}/summary.txt").decode("utf-8")
+            for c in fakes.seed_bank(bank, records.CONTAINER, seed)}
+
+
+def make_cases(corpus: dict[str, str], groups: list[int], per_group: int, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    names = sorted(corpus)
+    cases = []
+    for size in groups:
+        for i in range(per_group):
+            picked = rng.sample(names, min(len(names), size + 1))
+            cases.append({"id": f"g{size}-{i}", "group": size, "cand": picked[0], "others": picked[1:]})
+    return cases
+
+
+# ---------- run ----------
+
+def run_variant(v: dict, cases: list[dict], corpus: dict[str, str], meter: Meter) -> list[dict]:
+    mod = _load_agent(v["name"], v["module"])
+    mod._client = meter
+    rows = []
+    for case in cases:
+        kw = dict(cand_name=case["cand"], model=v["model"], use_cache=False)
+        t0 = time.perf_counter()
+        if hasattr(mod, "compare_summaries_detailed"):
+            call = mod.compare_summaries_detailed(
+                corpus[case["cand"]], {o: corpus[o] for o in case["others"]},
+                route=v["route"], final=v["final"], stream=True, **kw)
+            route, error, cost = call["route"], call["error"], call["cost_usd"]
+        else:   # an older agent_comparer: no routing, no streaming
+            text = mod.compare_summaries_agent(corpus[case["cand"]], {o: corpus[o] for o in case["others"]}, **kw)
+            route, error, cost = None, text if text.startswith("(Agent") else None, None
+        wall = round(time.perf_counter() - t0, 3)
+        m = meter.last() or {}
+        meter._local.last = None
+        rows.append({"variant": v["name"], "case": case["id"], "group": case["group"], "route": route,
+                     "model": m.get("model"), "error": error, "wall_s": wall, "cost_usd": cost,
+                     **{k: m.get(k) for k in ("key", "prompt_chars", "tokens_in", "cached_tokens", "tokens_out",
+                                              "ttft_s", "seconds", "output_chars", "text")}})
+    return rows
+
+
+def summarize(rows: list[dict]) -> dict:
+    ok = [r for r in rows if not r["error"]]
+    costs = [r["cost_usd"] for r in ok if r["cost_usd"] is not None]
+    return {
+        "calls": len(rows),
+        "errors": len(rows) - len(ok),
+        "ttft_p50_s": _pct([r["ttft_s"] for r in ok], 50),
+        "ttft_p95_s": _pct([r["ttft_s"] for r in ok], 95),
+        "latency_p50_s": _pct([r["seconds"] for r in ok], 50),
+        "latency_p95_s": _pct([r["seconds"] for r in ok], 95),
+        "tokens_in_mean": _mean(r["tokens_in"] for r in ok),
+        "cached_share": round(sum(r["cached_tokens"] or 0 for r in ok) / max(1, sum(r["tokens_in"] or 0 for r in ok)), 3),
+        "tokens_out_mean": _mean(r["tokens_out"] for r in ok),
+        "output_chars_mean": _mean(r["output_chars"] for r in ok),
+        "cost_usd": round(sum(costs), 4) if costs else None,
+        "routes": sorted({r["route"] for r in ok if r["route"]}),
+        "by_group": {g: {"latency_p50_s": _pct([r["seconds"] for r in ok if r["group"] == g], 50),
+                         "tokens_in_mean": _mean(r["tokens_in"] for r in ok if r["group"] == g)}
+                     for g in sorted({r["group"] for r in ok})},
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[dict]:
+    """Guarded metrics that grew by more than `tolerance` against the baseline, per variant."""
+    out = []
+    for name, now in results.items():
+        before = baseline.get("variants", {}).get(name)
+        if not before:
+            continue
+        for metric in GUARDED:
+            old, new = before.get(metric), now.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else (1.0 if new else 0.0)
+            out.append({"variant": name, "metric": metric, "before": old, "after": new,
+                        "change": round(change, 3), "regression": change > tolerance})
+        if now["errors"] > before.get("errors", 0):
+            out.append({"variant": name, "metric": "errors", "before": before.get("errors", 0),
+                        "after": now["errors"], "change": None, "regression": True})
+    return out
+
+
+def _print_table(results: dict, source: str):
+    cols = ("calls", "errors", "ttft_p50_s", "ttft_p95_s", "latency_p50_s", "latency_p95_s",
+            "tokens_in_mean", "cached_share", "tokens_out_mean", "output_chars_mean", "cost_usd")
+    heads = ("calls", "err", "ttft50", "ttft95", "lat50", "lat95", "tok in", "cached", "tok out", "chars", "cost $")
+    print(f"responses: {source}")
+    print(f"{'variant':<14}" + "".join(f"{h:>9}" for h in heads))
+    for name, s in results.items():
+        print(f"{name:<14}" + "".join(f"{'-' if s[c] is None else s[c]:>9}" for c in cols))
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Offline latency/token evaluation of the comparison agent")
+    ap.add_argument("--variant", action="append", help="NAME[:route=..,model=..,final=1,module=PATH] (repeatable)")
+    ap.add_argument("--corpus", help="JSON {name: summary}; default: a seeded synthetic bank")
+    ap.add_argument("--save-corpus", help="write the corpus used to this file")
+    ap.add_argument("--bank", type=int, default=12, help="synthetic corpus size")
+    ap.add_argument("--groups", default="1,2,4", help="comma-separated numbers of others per case")
+    ap.add_argument("--cases", type=int, default=3, help="cases per group size")
+    ap.add_argument("--seed", type=int, default=0)
+    src = ap.add_mutually_exclusive_group()
+    src.add_argument("--replay", help="JSONL of recorded responses to play back")
+    src.add_argument("--record", help="call the real deployments and save responses to this JSONL")
+    ap.add_argument("--time-scale", type=float, default=0.1, help="multiplies stub/replay waits")
+    ap.add_argument("--stub-latency", type=float, default=0.5, help="stub seconds for models without a profile")
+    ap.add_argument("--json", help="write per-call rows and summaries to this file")
+    ap.add_argument("--baseline", help="an earlier --json file to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.1, help="allowed growth per guarded metric (0.1 = 10%%)")
+    args = ap.parse_args(argv)
+
+    corpus = load_corpus(args.corpus, args.bank, args.seed)
+    if args.save_corpus:
+        with open(args.save_corpus, "w") as f:
+            json.dump(corpus, f, indent=2)
+    cases = make_cases(corpus, [int(g) for g in args.groups.split(",")], args.cases, args.seed)
+    variants = [parse_variant(s) for s in (args.variant or DEFAULT_VARIANTS)]
+
+    if args.record:
+        import agent_comparer
+        inner = agent_comparer.get_client()
+        if inner is None:
+            raise SystemExit("--record needs OPENAI_API_KEY (the real deployments)")
+        source = f"live, recorded to {args.record}"
+    elif args.replay:
+        with open(args.replay) as f:
+            inner = fakes.ReplayLLM([json.loads(line) for line in f if line.strip()], args.time_scale)
+        source = f"replay of {args.replay} (time x{args.time_scale})"
+    else:
+        inner = fakes.StubLLM(args.stub_latency, STUB_PROFILES, args.time_scale)
+        source = f"stub (time x{args.time_scale})"
+
+    rows, results = [], {}
+    for v in variants:
+        # a fresh stub per variant, so one variant doesn't warm another's simulated prompt cache
+        if not (args.record or args.replay):
+            inner = fakes.StubLLM(args.stub_latency, STUB_PROFILES, args.time_scale)
+        mine = run_variant(v, cases, corpus, Meter(inner))
+        rows += mine
+        results[v["name"]] = summarize(mine)
+
+    if args.record:
+        with open(args.record, "w") as f:
+            for r in (r for r in rows if not r["error"] and r["key"]):
+                usage = {"prompt_tokens": r["tokens_in"], "completion_tokens": r["tokens_out"],
+                         "cached_tokens": r["cached_tokens"]}
+                f.write(json.dumps({"key": r["key"], "model": r["model"], "text": r["text"], "usage": usage,
+                                    "ttft_s": r["ttft_s"], "seconds": r["seconds"]}) + "\n")
+
+    _print_table(results, source)
+    out = {"source": source, "cases": len(cases), "variants": results,
+           "calls": [{k: v for k, v in r.items() if k != "text"} for r in rows]}
+    code = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            out["comparison"] = compare(results, json.load(f), args.tolerance)
+        bad = [c for c in out["comparison"] if c["regression"]]
+        for c in bad:
+            print(f"REGRESSION {c['variant']} {c['metric']}: {c['before']} -> {c['after']}")
+        code = 1 if bad else 0
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(out, f, indent=2)
+    print(json.dumps({k: v for k, v in out.items() if k != "calls"}))
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+# benchmarks/compression.py
+# Bytes transferred and read/write latency for text blobs with and without storage.py compression.
+#
+#   python benchmarks/compression.py --bank 200
+#   python benchmarks/compression.py --bank 200 --bandwidth 2 --latency 0.03 --json compression.json
+#
+# Payloads are the app's own: Athena/Genos CSVs and summaries from fakes.seed_bank, and
+# the solo HTML report bulk_export renders for each candidate. Every codec writes them
+# all through storage.upload and reads them back through storage.download against the
+# in-memory store, whose per-call latency plus size/bandwidth stands in for the network.
+# CPU cost of (de)compression is measured separately with no simulated I/O.
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.dirname(os.path.abspath(__file__))]
+
+import fakes  # noqa: E402
+
+
+def _pct(xs: list[float], p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, max(0, round(p / 100 * (len(xs) - 1))))] if xs else 0.0
+
+
+def _payloads(bank: int, seed: int) -> list[tuple[str, str, bytes]]:
+    """[(kind, content type, bytes)] for every CSV, summary and solo HTML report in a seeded bank."""
+    from bulk_export import render_packet
+    cands = fakes.seed_bank(bank, os.getenv("CONTAINER", "dashboard"), seed)
+    cc = fakes.STORE.get_container_client(os.getenv("CONTAINER", "dashboard"))
+    out = []
+    for b in cc.list_blobs():
+        data = cc.download_blob(b.name).readall()
+        kind, ctype = ("csv", "text/csv") if b.name.endswith(".csv") else ("summary", "text/plain")
+        out.append((kind, ctype, data))
+    for cand in cands:
+        out.append(("html", "text/html", render_packet(cand)["html"].encode("utf-8")))
+    return out
+
+
+def run_codec(codec: str, payloads) -> dict:
+    import storage
+    storage.CODEC = codec
+    cc = fakes.STORE.get_container_client(f"bench-{codec}")
+    before = dict(fakes.STORE.traffic)
+    writes, reads = {}, {}
+    stored = 0
+    for i, (kind, ctype, data) in enumerate(payloads):
+        t = time.perf_counter()
+        res = storage.upload(cc, f"{kind}/{i}", data, content_type=ctype)
+        writes.setdefault(kind, []).append(time.perf_counter() - t)
+        stored += res["size"]
+    for i, (kind, _, data) in enumerate(payloads):
+        t = time.perf_counter()
+        got = storage.download(cc, f"{kind}/{i}")
+        reads.setdefault(kind, []).append(time.perf_counter() - t)
+        assert got == data, f"round trip changed {kind}/{i}"
+
+    # CPU only: encode + decode every payload with no simulated I/O
+    t = time.perf_counter()
+    for kind, ctype, data in payloads:
+        body, enc = storage.encode(kind, data, ctype)
+        storage.decompress(body, enc)
+    cpu = time.perf_counter() - t
+
+    raw = sum(len(p[2]) for p in payloads)
+    return {
+        "codec": storage.codec() or "none",
+        "blobs": len(payloads),
+        "raw_bytes": raw,
+        "stored_bytes": stored,
+        "ratio": round(raw / stored, 2) if stored else 0.0,
+        "uploaded_bytes": fakes.STORE.traffic["up"] - before["up"],
+        "downloaded_bytes": fakes.STORE.traffic["down"] - before["down"],
+        "cpu_ms_per_blob": round(cpu / len(payloads) * 1000, 3),
+        "write_p50_ms": {k: round(_pct(v, 50) * 1000, 2) for k, v in writes.items()},
+        "read_p50_ms": {k: round(_pct(v, 50) * 1000, 2) for k, v in reads.items()},
+        "read_p95_ms": {k: round(_pct(v, 95) * 1000, 2) for k, v in reads.items()},
+        "read_total_s": round(sum(sum(v) for v in reads.values()), 3),
+        "write_total_s": round(sum(sum(v) for v in writes.values()), 3),
+    }
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Compression savings for text blobs (storage.py)")
+    ap.add_argument("--bank", type=int, default=100, help="candidates to seed")
+    ap.add_argument("--latency", type=float, default=0.02, help="seconds per storage call")
+    ap.add_argument("--bandwidth", type=float, default=5.0, help="MB/s per transfer")
+    ap.add_argument("--codecs", default="none,gzip,zstd", help="comma-separated; zstd needs `zstandard`")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args(argv)
+
+    fakes.install_storage()
+    payloads = _payloads(args.bank, args.seed)
+    fakes.STORAGE_LATENCY = args.latency
+    fakes.STORAGE_BANDWIDTH = args.bandwidth * 1024 * 1024
+
+    import storage
+    results, done = [], set()
+    for codec in args.codecs.split(","):
+        storage.CODEC = codec
+        if (storage.codec() or "none") in done:   # e.g. zstd without the package falls back to gzip
+            continue
+        done.add(storage.codec() or "none")
+        results.append(run_codec(codec, payloads))
+
+    print(f"{'codec':>6}{'blobs':>7}{'stored KB':>11}{'ratio':>7}{'down KB':>10}{'read s':>8}{'write s':>9}"
+          f"{'html p50':>10}{'cpu ms':>8}")
+    for r in results:
+        print(f"{r['codec']:>6}{r['blobs']:>7}{r['stored_bytes'] / 1024:>11.1f}{r['ratio']:>7}"
+              f"{r['downloaded_bytes'] / 1024:>10.1f}{r['read_total_s']:>8}{r['write_total_s']:>9}"
+              f"{r['read_p50_ms'].get('html', 0):>10}{r['cpu_ms_per_blob']:>8}")
+    out = {"latency_s": args.latency, "bandwidth_mb_s": args.bandwidth, "results": results}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(out, f, indent=2)
+    print(json.dumps(out))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,397 @@
+# benchmarks/fakes.py
+# In-process stand-ins used by the load test: local blob storage and a stub LLM.
+#
+# install_storage() makes BlobServiceClient.from_connection_string return a
+# MemoryBlobService, which implements the subset of the container/blob client API
+# the app uses (list/walk/download/upload/delete/exists/server-side copy).
+# install_llm() puts a StubLLM behind agent_comparer.get_client(); ReplayLLM plays
+# back completions recorded by benchmarks/agent_eval.py.
+# Both can simulate I/O latency through GATE (see RunGate); STORAGE_BANDWIDTH adds
+# transfer time per byte and STORE.traffic counts the bytes moved.
+import hashlib
+import os
+import threading
+import time
+import types
+
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+
+
+class RunGate:
+    """Lets one AppTest run execute at a time, except while it waits on simulated I/O.
+
+    AppTest swaps process-global state (Runtime._instance, config options) in and
+    out around every run, so two runs can't execute Python at the same moment.
+    A real server overlaps its script threads at I/O waits (the GIL is released),
+    and this gate does the same: a script thread waiting on the stub LLM or on
+    storage latency releases it, and when it takes the gate back it restores its
+    own runtime.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self._lock.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self._lock.release()
+
+    def io_wait(self, seconds: float):
+        if seconds <= 0:
+            return
+        from streamlit.runtime import Runtime
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        if get_script_run_ctx() is None or not self._lock.locked():
+            time.sleep(seconds)   # background/pool thread: it doesn't own the gate
+            return
+        runtime = Runtime._instance
+        self._lock.release()
+        try:
+            time.sleep(seconds)
+        finally:
+            self._lock.acquire()
+            Runtime._instance = runtime
+
+
+GATE = RunGate()
+STORAGE_LATENCY = 0.0   # seconds added to every download/upload/list call
+STORAGE_BANDWIDTH = 0.0  # bytes/s for uploads and downloads (0 = unlimited)
+
+
+def _transfer_wait(nbytes: int):
+    GATE.io_wait(STORAGE_LATENCY + (nbytes / STORAGE_BANDWIDTH if STORAGE_BANDWIDTH else 0.0))
+
+
+class _Props(dict):
+    __getattr__ = dict.get
+
+
+class _Paged(list):
+    """list_blobs result; by_page() pages it like ItemPaged, with offset continuation tokens."""
+
+    def __init__(self, items, per_page: int):
+        super().__init__(items)
+        self._per_page = per_page
+
+    def by_page(self, continuation_token=None):
+        return _PageIterator(self, self._per_page, int(continuation_token or 0))
+
+
+class _PageIterator:
+    def __init__(self, items: list, per_page: int, start: int):
+        self._items, self._per_page, self._start = items, per_page, start
+        self.continuation_token = str(start) if start else None
+
+    def __iter__(self):
+        while self._start < len(self._items):
+            page = self._items[self._start:self._start + self._per_page]
+            self._start += self._per_page
+            self.continuation_token = str(self._start) if self._start < len(self._items) else None
+            yield iter(page)
+
+
+class _Download:
+    def __init__(self, data: bytes, properties=None):
+        self._data = data
+        self.properties = properties
+
+    def readall(self) -> bytes:
+        return self._data
+
+    def chunks(self):
+        for i in range(0, len(self._data), 4 * 1024 * 1024):
+            yield self._data[i:i + 4 * 1024 * 1024]
+
+
+class MemoryBlobClient:
+    def __init__(self, container: "MemoryContainer", name: str):
+        self.container, self.blob_name = container, name
+
+    @property
+    def url(self) -> str:
+        return f"memory://{self.container.container_name}/{self.blob_name}"
+
+    def exists(self) -> bool:
+        return self.blob_name in self.container._blobs
+
+    def upload_blob(self, data, overwrite=True, **kw):
+        return self.container.upload_blob(self.blob_name, data, overwrite=overwrite, **kw)
+
+    def download_blob(self, **kw):
+        return self.container.download_blob(self.blob_name, **kw)
+
+    def delete_blob(self, **kw):
+        self.container.delete_blob(self.blob_name)
+
+    def get_blob_properties(self):
+        with self.container._lock:
+            if self.blob_name not in self.container._blobs:
+                raise ResourceNotFoundError("blob not found")
+            return self.container._blobs[self.blob_name][1]
+
+    def start_copy_from_url(self, url: str, **kw):
+        container, name = url.split("://", 1)[1].split("/", 1)
+        # server-side: no transfer through the client, and the blob's properties come along
+        src = self.container._service.get_container_client(container)
+        with self.container._lock:
+            data, props = src._blobs[name]
+        self.container._store(self.blob_name, data, props.content_settings, props.metadata)
+        return {"copy_status": "success"}
+
+
+class MemoryContainer:
+    def __init__(self, service: "MemoryBlobService", name: str):
+        self._service, self.container_name = service, name
+        self._blobs: dict[str, tuple[bytes, _Props]] = service._data.setdefault(name, {})
+        self._lock = service._lock
+
+    def exists(self) -> bool:
+        return True
+
+    def create_container(self, **kw):
+        return self
+
+    def _store(self, name, data: bytes, content_settings, metadata) -> str:
+        with self._lock:
+            etag = hashlib.md5(data + str(time.time_ns()).encode()).hexdigest()
+            self._blobs[name] = (data, _Props(
+                name=name, etag=etag, size=len(data), metadata=dict(metadata or {}),
+                content_settings=content_settings, last_modified=time.time(),
+            ))
+        return etag
+
+    def upload_blob(self, name, data, overwrite=True, content_settings=None, metadata=None, **kw):
+        if hasattr(data, "read"):
+            data = data.read()
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        data = bytes(data)
+        _transfer_wait(len(data))
+        with self._lock:
+            if not overwrite and name in self._blobs:
+                raise ResourceExistsError(f"blob exists: {name}")
+            if kw.get("etag") and name in self._blobs and self._blobs[name][1].etag != kw["etag"]:
+                raise ResourceModifiedError(f"blob changed: {name}")   # match_condition=IfNotModified
+            self._service.traffic["up"] += len(data)
+            return {"etag": self._store(name, data, content_settings, metadata)}
+
+    def download_blob(self, name, offset=None, length=None, **kw):
+        with self._lock:
+            if name not in self._blobs:
+                raise ResourceNotFoundError(f"blob not found: {name}")
+            data, props = self._blobs[name]
+        if offset is not None:
+            data = data[offset:offset + length if length is not None else None]
+        _transfer_wait(len(data))
+        with self._lock:
+            self._service.traffic["down"] += len(data)
+        return _Download(data, props)
+
+    def delete_blob(self, name, **kw):
+        with self._lock:
+            if self._blobs.pop(name, None) is None:
+                raise ResourceNotFoundError(f"blob not found: {name}")
+
+    def list_blobs(self, name_starts_with=None, results_per_page=5000, **kw):
+        GATE.io_wait(STORAGE_LATENCY)
+        prefix = name_starts_with or ""
+        with self._lock:
+            return _Paged([self._blobs[n][1] for n in sorted(self._blobs) if n.startswith(prefix)], results_per_page)
+
+    def walk_blobs(self, name_starts_with=None, delimiter="/", **kw):
+        GATE.io_wait(STORAGE_LATENCY)
+        prefix, out, seen = name_starts_with or "", [], set()
+        with self._lock:
+            names = sorted(self._blobs)
+        for n in names:
+            if not n.startswith(prefix):
+                continue
+            rest = n[len(prefix):]
+            item = prefix + rest.split(delimiter, 1)[0] + delimiter if delimiter in rest else n
+            if item not in seen:
+                seen.add(item)
+                out.append(types.SimpleNamespace(name=item))
+        return out
+
+    def get_blob_client(self, name):
+        return MemoryBlobClient(self, name)
+
+
+class MemoryBlobService:
+    def __init__(self):
+        self._data: dict[str, dict] = {}
+        self._lock = threading.RLock()
+        self.traffic = {"up": 0, "down": 0}   # bytes moved by upload_blob / download_blob
+
+    def get_container_client(self, name):
+        return MemoryContainer(self, name)
+
+    def get_blob_client(self, container, blob):
+        return MemoryBlobClient(MemoryContainer(self, container), blob)
+
+    def reset(self):
+        with self._lock:
+            self._data.clear()
+            self.traffic = {"up": 0, "down": 0}
+
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(len(v[0]) for c in self._data.values() for v in c.values())
+
+
+STORE = MemoryBlobService()
+
+
+def install_storage() -> MemoryBlobService:
+    import os
+    from azure.storage.blob import BlobServiceClient
+    os.environ.setdefault("AZURE_STORAGE_CONNECTION_STRING", "UseLocalMemoryStore=true")
+    BlobServiceClient.from_connection_string = classmethod(lambda cls, *a, **kw: STORE)
+    return STORE
+
+
+def _chunk(content=None, usage=None):
+    choices = [] if content is None else [types.SimpleNamespace(delta=types.SimpleNamespace(content=content))]
+    return types.SimpleNamespace(choices=choices, usage=usage)
+
+
+def _usage(prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0):
+    return types.SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                 prompt_tokens_details=types.SimpleNamespace(cached_tokens=cached_tokens))
+
+
+def _stream(text: str, usage, ttft: float, total: float, step: int = 16):
+    """Chunks of `text` with the first after `ttft` and the last by `total`, then a usage chunk."""
+    pieces = [text[i:i + step] for i in range(0, len(text), step)] or [""]
+    GATE.io_wait(ttft)
+    gap = max(0.0, total - ttft) / len(pieces)
+    for i, piece in enumerate(pieces):
+        if i:
+            GATE.io_wait(gap)
+        yield _chunk(piece)
+    yield _chunk(usage=usage)
+
+
+class StubLLM:
+    """Mimics client.chat.completions.create (plain and stream=True) with a canned answer.
+
+    Without a profile every call takes `latency` seconds. profiles maps a model to
+    (seconds to first token, tokens per second) so fast and strong deployments
+    differ; `time_scale` shrinks every wait. The answer grows with the number of
+    candidates in the prompt. When a prompt repeats at least 1024 tokens from the
+    start of an earlier prompt to the same model, that shared prefix is reported
+    as cached in 128-token blocks, the way Azure OpenAI's prompt cache does.
+    """
+
+    def __init__(self, latency: float = 0.5, profiles: dict | None = None, time_scale: float = 1.0):
+        self.latency = latency
+        self.profiles = profiles or {}
+        self.time_scale = time_scale
+        self.calls = 0
+        self._prefixes: dict[str, list[str]] = {}
+        self._lock = threading.Lock()
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self._create))
+
+    def _cached_tokens(self, model: str, prompt: str) -> int:
+        with self._lock:
+            seen = self._prefixes.setdefault(model, [])
+            shared = max((len(os.path.commonprefix([prompt, p])) for p in seen), default=0)
+            seen.append(prompt)
+            del seen[:-32]
+        if shared // 4 < 1024:   # the shared prefix itself must reach 1024 tokens
+            return 0
+        return (shared // 4) // 128 * 128
+
+    def _create(self, *, model, messages, stream=False, **kw):
+        self.calls += 1
+        prompt = "".join(m["content"] for m in messages)
+        n = max(1, messages[-1]["content"].count("\n--- "))
+        text = (f"1. **Narrative Comparison**: stub answer ({len(prompt)} prompt chars). "
+                + "Relative strengths and risks. " * (6 * n) + "\n2. **Factual Highlights**:\n"
+                + "".join(f"- trait comparison {i}\n" for i in range(3 + n))
+                + "3. **Interview Probes**:\n" + "".join(f"- q{i}\n" for i in range(2 * (n + 1))))
+        usage = _usage(len(prompt) // 4, len(text) // 4, self._cached_tokens(model, prompt))
+        if model in self.profiles:
+            ttft, tps = self.profiles[model]
+            ttft, total = ttft * self.time_scale, (ttft + usage.completion_tokens / tps) * self.time_scale
+        else:
+            ttft = total = self.latency
+        if stream:
+            return _stream(text, usage, ttft, total)
+        GATE.io_wait(total)
+        msg = types.SimpleNamespace(content=text)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=msg)], usage=usage)
+
+
+def install_llm(latency: float = 0.5, profiles: dict | None = None, time_scale: float = 1.0) -> StubLLM:
+    import agent_comparer
+    stub = StubLLM(latency, profiles, time_scale)
+    agent_comparer._client = stub
+    return stub
+
+
+def request_key(model: str, messages: list[dict]) -> str:
+    """Identifies a completion request in a recording (ReplayLLM, benchmarks/agent_eval.py)."""
+    h = hashlib.sha256(model.encode("utf-8"))
+    for m in messages:
+        h.update(b"\0" + m["role"].encode("utf-8") + b"\0" + m["content"].encode("utf-8"))
+    return h.hexdigest()
+
+
+class ReplayLLM:
+    """Plays back recorded completions ({"key", "text", "usage", "ttft_s", "seconds"} per line).
+
+    Timings are replayed as recorded (times time_scale); a request that isn't in
+    the recording raises KeyError, which the agent reports as an error.
+    """
+
+    def __init__(self, records: list[dict], time_scale: float = 1.0):
+        self.records = {r["key"]: r for r in records}
+        self.time_scale = time_scale
+        self.calls = 0
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self._create))
+
+    def _create(self, *, model, messages, stream=False, **kw):
+        self.calls += 1
+        rec = self.records.get(request_key(model, messages))
+        if rec is None:
+            raise KeyError(f"no recorded response for this {model} request")
+        u = rec.get("usage") or {}
+        usage = _usage(u.get("prompt_tokens", 0), u.get("completion_tokens", 0), u.get("cached_tokens", 0))
+        total = rec.get("seconds", 0.0) * self.time_scale
+        ttft = (rec.get("ttft_s") if rec.get("ttft_s") is not None else rec.get("seconds", 0.0)) * self.time_scale
+        if stream:
+            return _stream(rec["text"], usage, ttft, total)
+        GATE.io_wait(total)
+        msg = types.SimpleNamespace(content=rec["text"])
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=msg)], usage=usage)
+
+
+ATHENA_TRAITS = ("Echelon Scores", "Global Spread", "People Orientation", "Tolerance", "Decision-making",
+                 "Ability to Notice", "Dealing with Difficult Situations", "Trainability", "Role ID",
+                 "Receptiveness to Change")
+RATINGS = ("Poor", "Satisfactory", "Excellent", "Unique + Excellent")
+GENOS_MEASURES = ("Empathy", "Drive", "Resilience", "Self-awareness", "Influence", "Adaptability")
+
+
+def seed_bank(n: int, container: str = "dashboard", seed: int = 0) -> list[str]:
+    """Write `n` synthetic candidates (Athena CSV, Genos CSV, summary.txt) into local storage."""
+    import random
+    rng = random.Random(seed)
+    cc = STORE.get_container_client(container)
+    names = []
+    for i in range(n):
+        cand = f"Candidate{i:05d}"
+        rows = ["Trait,Candidate Value,Top Performers", f"Echelon Scores,{rng.randint(1, 9)} / 9,",
+                f"Global Spread,{rng.choice(RATINGS[1:3])},"]
+        rows += [f"{t},{rng.choice(RATINGS)},{rng.choice(RATINGS[1:])}" for t in ATHENA_TRAITS[2:]]
+        cc.upload_blob(f"{cand}/athena_vs_top.csv", "\n".join(rows) + "\n")
+        genos = ["Measure,Raw Score"] + [f"{m},{rng.randint(1, 99)}" for m in GENOS_MEASURES]
+        cc.upload_blob(f"{cand}/genos.csv", "\n".join(genos) + "\n")
+        words = rng.sample(["empathy", "drive", "calm", "forklift", "certified", "leadership", "detail",
+                            "customer", "service", "safety", "team", "training", "shift", "night"], 8)
+        cc.upload_blob(f"{cand}/summary.txt", f"{cand} shows {' '.join(words)}. " * 20)
+        names.append(cand)
+    return names
@@ -0,0 +1,125 @@
+# benchmarks/import_time.py
+# Import-time budget check built on `python -X importtime`.
+#
+#   python benchmarks/import_time.py            measure, compare with import_budget.json, exit 1 if over
+#   python benchmarks/import_time.py --update   rewrite the "measured_ms" column of the budget file
+#
+# Each module is imported in a fresh interpreter (best of --runs) with OPENAI_API_KEY
+# and storage settings removed, so the numbers reflect import cost only. Streamlit
+# pages (the "pages" section) can't be imported without running them, so only their
+# module-level import statements are executed: the cost a cold page pays before it
+# draws anything. Imports inside functions and panels are not counted.
+import argparse
+import ast
+import json
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "import_budget.json")
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def _importtime(code: str) -> list[tuple[int, int, int, str]]:
+    """(self us, cumulative us, depth, module) rows of `python -X importtime -c code`, in print order."""
+    env = {k: v for k, v in os.environ.items()
+           if k not in ("OPENAI_API_KEY", "AZURE_STORAGE_CONNECTION_STRING", "AZURE_STORAGE_ACCOUNT_NAME")}
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{code!r} failed:\n{proc.stderr[-2000:]}")
+    return [(int(m[1]), int(m[2]), len(m[3]), m[4]) for m in map(_LINE.match, proc.stderr.splitlines()) if m]
+
+
+def measure(module: str, runs: int = 3) -> dict:
+    """Cumulative import time of `module` (ms, best of `runs`) and its slowest direct imports."""
+    best, children = None, []
+    for _ in range(runs):
+        rows = _importtime(f"import {module}")
+        # children are printed before their parent: collect depth-2 rows since the previous top-level one
+        kids, total = [], None
+        for _, us, depth, name in rows:
+            if depth == 1:
+                if name == module:
+                    total = us
+                    break
+                kids = []
+            elif depth == 3:
+                kids.append((us, name))
+        if total is None:
+            continue
+        if best is None or total < best:
+            best = total
+            children = sorted(kids, reverse=True)[:5]
+    return {"ms": round((best or 0) / 1000, 1), "slowest": [(n, round(us / 1000, 1)) for us, n in children]}
+
+
+def page_imports(path: str) -> str:
+    """The module-level import statements of a script, as code that runs them and nothing else."""
+    with open(os.path.join(ROOT, path)) as f:
+        tree = ast.parse(f.read())
+    return "\n".join(ast.unparse(n) for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom)))
+
+
+def measure_page(path: str, runs: int = 3) -> dict:
+    """Time (ms, best of `runs`) to run a page's module-level imports, and the slowest of them.
+
+    "own_ms" is the self time of this repo's modules among them (third-party
+    packages excluded), which is what deferring an app module saves.
+    """
+    code = page_imports(path)
+    names = {(a.name if isinstance(n, ast.Import) else n.module).split(".")[0]
+             for n in ast.parse(code).body for a in n.names}
+    best, top, own, loaded = None, [], None, []
+    for _ in range(runs):
+        rows = _importtime(code)
+        # one top-level row per module the page pulls in that the interpreter hadn't loaded at startup
+        tops = [(us, name) for _, us, depth, name in rows if depth == 1 and name.split(".")[0] in names]
+        total = sum(us for us, _ in tops)
+        mine = [(us, name) for us, _, _, name in rows if os.path.exists(os.path.join(ROOT, f"{name}.py"))]
+        if best is None or total < best:
+            best, top = total, sorted(tops, reverse=True)[:5]
+        if own is None or sum(us for us, _ in mine) < own:
+            own, loaded = sum(us for us, _ in mine), sorted(n for _, n in mine)
+    return {"ms": round((best or 0) / 1000, 1), "own_ms": round((own or 0) / 1000, 1), "app_modules": loaded,
+            "slowest": [(n, round(us / 1000, 1)) for us, n in top]}
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Import-time budget check")
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--update", action="store_true", help="record measurements in the budget file")
+    args = ap.parse_args(argv)
+
+    with open(BUDGET_FILE) as f:
+        budget = json.load(f)
+    over = []
+    print(f"{'module':<18}{'baseline':>10}{'budget':>9}{'now':>9}  slowest direct imports")
+    rows = [(m, r, measure) for m, r in budget["modules"].items()]
+    rows += [(p, r, measure_page) for p, r in budget.get("pages", {}).items()]
+    for module, row, fn in rows:
+        res = fn(module, args.runs)
+        row["measured_ms"] = res["ms"]
+        if "own_ms" in res:
+            row["own_ms"] = res["own_ms"]
+            row["app_modules"] = len(res["app_modules"])
+        flag = " OVER" if res["ms"] > row["budget_ms"] else ""
+        if flag:
+            over.append(module)
+        slow = ", ".join(f"{n} {ms}" for n, ms in res["slowest"][:3])
+        print(f"{module:<18}{str(row.get('baseline_ms') or '-'):>10}{row['budget_ms']:>9}{res['ms']:>9}{flag}  {slow}")
+    if args.update:
+        with open(BUDGET_FILE, "w") as f:
+            json.dump(budget, f, indent=2)
+            f.write("\n")
+    if over:
+        print(f"over budget: {', '.join(over)}")
+    print(json.dumps({"modules": {m: r["measured_ms"] for m, r in budget["modules"].items()},
+                      "pages": {p: r["measured_ms"] for p, r in budget.get("pages", {}).items()}, "over": over}))
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+# benchmarks/load_test.py
+# Headless load test: N simulated HR users driving the Streamlit pages via AppTest.
+#
+#   python benchmarks/load_test.py --users 1,5,10 --bank 20,200 --rounds 3
+#   python benchmarks/load_test.py --users 25 --bank 1000 --llm-latency 1.5 --json results.json
+#
+# Everything runs in one process against local in-memory storage and a stub LLM
+# (benchmarks/fakes.py), so st.cache_data / cache_resource and the shared cache
+# behave as they would for concurrent sessions on one instance.
+# Each user is a thread with its own AppTest sessions and follows a weighted mix of flows:
+#   browse    - load candidates.py, search, open Compare for a candidate and generate
+#   edit      - load candidates.py, edit a Solo summary and save it
+#   editor    - summary_editor.py: load a candidate, change the text, save
+#   upload    - uploads.py: render and type a name; the files are written straight to raw/
+#               (AppTest can't drive st.file_uploader)
+# Runs go through fakes.GATE: Python work is serialized (as under one server's GIL)
+# and overlaps only while a run waits on the stub LLM or simulated storage latency.
+# For each (bank size, users) cell it reports p50/p95/p99 rerun latency, reruns/s and peak RSS.
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.dirname(os.path.abspath(__file__))]
+
+import fakes  # noqa: E402
+
+FLOWS = {"browse": 0.45, "edit": 0.25, "editor": 0.2, "upload": 0.1}
+# st.page_link needs the st.navigation registry from app.py, which a page loaded on its own doesn't have
+IGNORED_ERRORS = ("Could not find page",)
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _pct(xs: list[float], p: float) -> float:
+    if not xs:
+        return 0.0
+    xs = sorted(xs)
+    k = min(len(xs) - 1, max(0, round(p / 100 * (len(xs) - 1))))
+    return xs[k]
+
+
+class User:
+    def __init__(self, uid: int, cands: list[str], record, rng: random.Random):
+        self.uid, self.cands, self.record, self.rng = uid, cands, record, rng
+
+    def _run(self, at, flow: str, step: str):
+        t0 = time.perf_counter()
+        with fakes.GATE:
+            at.run()
+        errors = [e.message for e in at.exception if not e.message.startswith(IGNORED_ERRORS)]
+        self.record(flow, step, time.perf_counter() - t0, errors[0] if errors else None)
+        return at
+
+    def _app(self, page: str):
+        from streamlit.testing.v1 import AppTest
+        return AppTest.from_file(os.path.join(ROOT, page), default_timeout=120)
+
+    def browse(self):
+        at = self._run(self._app("candidates.py"), "browse", "load")
+        at.text_input(key="bank-search").set_value(self.rng.choice(["empathy", "forklift certified", "safety"]))
+        self._run(at, "browse", "search")
+        cand = self.rng.choice(self.cands)
+        at.radio(key=f"mode-{cand}").set_value("Compare")
+        self._run(at, "browse", "compare")
+        gen = [b for b in at.button if b.key == f"gen-top-{cand.lower()}"]
+        if gen:
+            gen[0].click()
+            self._run(at, "browse", "generate")
+
+    def edit(self):
+        at = self._run(self._app("candidates.py"), "edit", "load")
+        cand = self.rng.choice(self.cands)
+        at.button(key=f"edit-{cand}").click()
+        self._run(at, "edit", "open-editor")
+        at.text_area(key=f"solo-editor-{cand}").set_value(f"Edited by user {self.uid} at {time.time():.0f}")
+        self._run(at, "edit", "type")
+        save = [b for b in at.button if b.label.startswith("💾 Save updated summary")]
+        if save:
+            save[0].click()
+            self._run(at, "edit", "save")
+
+    def editor(self):
+        at = self._app("summary_editor.py")
+        at.session_state["selected_candidate"] = self.rng.choice(self.cands)
+        self._run(at, "editor", "load")
+        at.text_area[0].set_value(f"Rewritten by user {self.uid}")
+        self._run(at, "editor", "type")
+        at.button[0].click()
+        self._run(at, "editor", "save")
+
+    def upload(self):
+        at = self._run(self._app("uploads.py"), "upload", "load")
+        name = f"New Hire {self.uid} {self.rng.randint(0, 10**6)}"
+        at.text_input[0].set_value(name)
+        self._run(at, "upload", "type")
+        raw = fakes.STORE.get_container_client(os.getenv("RAW_CONTAINER", "raw"))
+        slug = name.replace(" ", "")
+        raw.upload_blob(f"{slug}/athena_vs_top.csv", "Trait,Candidate Value,Top Performers\nTolerance,Poor,Excellent\n")
+
+    def loop(self, rounds: int):
+        flows, weights = zip(*FLOWS.items())
+        for _ in range(rounds):
+            flow = self.rng.choices(flows, weights)[0]
+            try:
+                getattr(self, flow)()
+            except Exception as e:  # a broken flow is a data point, not a crash
+                self.record(flow, f"error:{type(e).__name__}", 0.0, str(e))
+
+
+def _prepare_apptest():
+    # AppTest turns `global.appTest` on and restores the previous value around each
+    # run; with it already on, a run finishing never switches it off under another.
+    from streamlit import config
+    config.set_option("global.appTest", True)
+
+
+def _reset_caches():
+    import streamlit as st
+    import cache_backend
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    cache_backend._cache = None
+    gc.collect()
+
+
+def run_cell(users: int, bank: int, rounds: int, seed: int = 0) -> dict:
+    fakes.STORE.reset()
+    cands = fakes.seed_bank(bank, os.getenv("CONTAINER", "dashboard"), seed)
+    _reset_caches()
+
+    samples: list[tuple[str, str, float, str | None]] = []   # (flow, step, seconds, error)
+    lock = threading.Lock()
+
+    def record(flow, step, secs, error):
+        with lock:
+            samples.append((flow, step, secs, error))
+
+    peak = [_rss_mb()]
+    done = threading.Event()
+
+    def sampler():
+        while not done.wait(0.2):
+            peak[0] = max(peak[0], _rss_mb())
+
+    threading.Thread(target=sampler, daemon=True).start()
+    rss0 = _rss_mb()
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=User(u, cands, record, random.Random(seed * 1000 + u)).loop, args=(rounds,))
+               for u in range(users)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+    done.set()
+
+    lat = [s[2] for s in samples if not s[1].startswith("error")]
+    by_step: dict[str, list[float]] = {}
+    for flow, step, secs, _ in samples:
+        if not step.startswith("error"):
+            by_step.setdefault(f"{flow}/{step}", []).append(secs)
+    return {
+        "users": users,
+        "bank": bank,
+        "reruns": len(lat),
+        "errors": sum(1 for s in samples if s[3]),
+        "error_samples": sorted({f"{s[0]}/{s[1]}: {s[3][:160]}" for s in samples if s[3]})[:5],
+        "p50_ms": round(_pct(lat, 50) * 1000, 1),
+        "p95_ms": round(_pct(lat, 95) * 1000, 1),
+        "p99_ms": round(_pct(lat, 99) * 1000, 1),
+        "reruns_per_s": round(len(lat) / wall, 2) if wall else 0.0,
+        "wall_s": round(wall, 2),
+        "rss_start_mb": round(rss0, 1),
+        "rss_peak_mb": round(peak[0], 1),
+        "steps_p95_ms": {k: round(_pct(v, 95) * 1000, 1) for k, v in sorted(by_step.items())},
+    }
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Headless multi-user load test")
+    ap.add_argument("--users", default="1,5,10", help="comma-separated concurrent user counts")
+    ap.add_argument("--bank", default="20,200", help="comma-separated bank sizes (candidates)")
+    ap.add_argument("--rounds", type=int, default=3, help="flows per user")
+    ap.add_argument("--llm-latency", type=float, default=0.5, help="stub LLM seconds per call")
+    ap.add_argument("--storage-latency", type=float, default=0.0, help="seconds added per storage call")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", help="write all cells to this file")
+    args = ap.parse_args(argv)
+
+    fakes.install_storage()
+    fakes.STORAGE_LATENCY = args.storage_latency
+    stub = fakes.install_llm(args.llm_latency)
+    _prepare_apptest()
+
+    cells = []
+    print(f"{'bank':>6}{'users':>6}{'reruns':>8}{'err':>5}{'p50':>9}{'p95':>9}{'p99':>9}{'rr/s':>8}{'rss MB':>9}")
+    for bank in (int(b) for b in args.bank.split(",")):
+        for users in (int(u) for u in args.users.split(",")):
+            cell = run_cell(users, bank, args.rounds, args.seed)
+            cells.append(cell)
+            print(f"{bank:>6}{users:>6}{cell['reruns']:>8}{cell['errors']:>5}{cell['p50_ms']:>9}"
+                  f"{cell['p95_ms']:>9}{cell['p99_ms']:>9}{cell['reruns_per_s']:>8}{cell['rss_peak_mb']:>9}",
+                  flush=True)
+    result = {"llm_latency_s": args.llm_latency, "storage_latency_s": args.storage_latency,
+              "llm_calls": stub.calls, "cells": cells}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+    print(json.dumps(result))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+# benchmarks/record_memory.py
+# What a candidate record costs, and what dropping its DataFrames would buy.
+#
+#   python benchmarks/record_memory.py --bank 300
+#   python benchmarks/record_memory.py --bank 300 --json record_memory.json
+#
+# Records come from records._build_record over a seeded bank. "cached" is the pickle
+# the "frame" cache holds per candidate; "live" is what one unpickled record holds
+# (tracemalloc) while a rerun renders it. The "rebuilt" variant stores each frame as
+# per-column category codes and builds the DataFrame again when asked. The page renders
+# every candidate's panel on each rerun, so "rerun ms" compares reading all frames once:
+# unpickling them as stored vs rebuilding them from codes.
+import argparse
+import gc
+import json
+import os
+import pickle
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.dirname(os.path.abspath(__file__))]
+
+import fakes  # noqa: E402
+
+FRAMES = ("athena_df", "genos_df")
+
+
+def _pack(df):
+    import pandas as pd
+    if df is None:
+        return None
+    cols = []
+    for c in df.columns:
+        s = df[c]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            cols.append((c, "cat", tuple(s.cat.categories), s.cat.codes.to_numpy()))
+        elif pd.api.types.is_string_dtype(s) or s.dtype == object:
+            cat = s.astype("category")
+            cols.append((c, "str", tuple(cat.cat.categories), cat.cat.codes.to_numpy()))
+        else:
+            cols.append((c, "num", None, s.to_numpy()))
+    return cols
+
+
+def _unpack(cols):
+    import pandas as pd
+    if cols is None:
+        return None
+    data = {}
+    for c, kind, cats, vals in cols:
+        if kind == "num":
+            data[c] = vals
+        else:
+            cat = pd.Categorical.from_codes(vals, list(cats))
+            data[c] = cat if kind == "cat" else pd.Series(cat).astype("str")
+    return pd.DataFrame(data)
+
+
+def _live_bytes(blobs: list[bytes], pick=None) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        live = [pickle.loads(b) for b in blobs]
+        if pick:
+            live = [pick(r) for r in live]
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0] // len(blobs)
+    finally:
+        tracemalloc.stop()
+
+
+def _rerun_ms(blobs: list[bytes], read, repeat: int) -> float:
+    t = time.perf_counter()
+    for _ in range(repeat):
+        for b in blobs:
+            read(pickle.loads(b))
+    return round((time.perf_counter() - t) / repeat * 1000, 1)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Memory and rebuild cost of candidate records (records.py)")
+    ap.add_argument("--bank", type=int, default=300, help="candidates to seed")
+    ap.add_argument("--repeat", type=int, default=3, help="reruns to average")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args(argv)
+
+    fakes.install_storage()
+    names = fakes.seed_bank(args.bank, "dashboard", args.seed)
+    import records
+    built = [records._build_record(c) for c in names]
+    stored = [pickle.dumps(r, protocol=pickle.HIGHEST_PROTOCOL) for r in built]
+    rebuilt = [pickle.dumps({**{k: v for k, v in r.items() if k not in FRAMES},
+                             **{k: _pack(r[k]) for k in FRAMES}}, protocol=pickle.HIGHEST_PROTOCOL)
+               for r in built]
+    del built
+
+    parts = {k: _live_bytes(stored, lambda r, k=k: r.get(k)) for k in (*FRAMES, "athena_codes", "genos_codes",
+                                                                       "summary")}
+    results = {
+        "stored": {"cached_bytes": sum(map(len, stored)) // len(stored), "live_bytes": _live_bytes(stored),
+                   "rerun_ms": _rerun_ms(stored, lambda r: [r[k] for k in FRAMES], args.repeat)},
+        "rebuilt": {"cached_bytes": sum(map(len, rebuilt)) // len(rebuilt), "live_bytes": _live_bytes(rebuilt),
+                    "rerun_ms": _rerun_ms(rebuilt, lambda r: [_unpack(r[k]) for k in FRAMES], args.repeat)},
+    }
+
+    print(f"{'variant':>8}{'cached B':>10}{'live B':>9}{'rerun ms':>10}")
+    for name, r in results.items():
+        print(f"{name:>8}{r['cached_bytes']:>10}{r['live_bytes']:>9}{r['rerun_ms']:>10}")
+    print("live bytes by field:", ", ".join(f"{k} {v}" for k, v in parts.items()))
+    out = {"bank": args.bank, "live_bytes_by_field": parts, "results": results}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(out, f, indent=2)
+    print(json.dumps(out))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+# bulk_export.py
+# Bulk export of candidate packets (solo HTML + summary text + original raw files)
+# as one zip. Packets are rendered in a thread pool with a bounded in-flight window
+# and written straight into a zip that spills to disk, so memory stays flat no
+# matter how many candidates are exported. A candidate is listed as exported only
+# once its whole packet is in the zip; a packet that breaks partway is listed as
+# failed and marked in the zip with an EXPORT_INCOMPLETE.txt next to what was written.
+#
+# The dashboard never reads a finished zip into memory to serve it: share_export
+# uploads it to the finished container and hands the browser a short-lived SAS
+# link. Only when no link can be signed does it fall back to an in-app download,
+# and only for zips up to EXPORT_DOWNLOAD_MAX_MB (download_payload).
+import io
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Iterable, Iterator
+
+import pandas as pd
+from azure.storage.blob import ContentSettings
+
+import storage
+from documents import iter_chunks
+from report import render_solo
+
+RAW_CONTAINER = os.getenv("RAW_CONTAINER", "raw")
+SPOOL_MAX_BYTES = 8 * 1024 * 1024   # zip stays in RAM below this, then spills to a temp file
+DOWNLOAD_MAX_BYTES = int(float(os.getenv("EXPORT_DOWNLOAD_MAX_MB", "100")) * 1024 * 1024)
+
+
+def _dash_cc():
+    from compare import _cc
+    return _cc()
+
+
+def _raw_cc():
+    from compare import _bsc
+    return _bsc().get_container_client(RAW_CONTAINER)
+
+
+def _read_text(cc, path: str) -> str | None:
+    try:
+        return storage.download(cc, path).decode("utf-8", errors="replace")
+    except Exception:
+        return None
+
+
+def _read_csv(cc, path: str | None) -> pd.DataFrame | None:
+    if not path:
+        return None
+    txt = _read_text(cc, path)
+    if txt is None:
+        return None
+    try:
+        return pd.read_csv(io.StringIO(txt))
+    except Exception:
+        return None
+
+
+def render_packet(cand: str, title_fn: Callable[[str], str] = lambda s: s) -> dict:
+    """Load one candidate from the dashboard container and render its solo report."""
+    cc = _dash_cc()
+    prefix = cand.rstrip("/") + "/"
+    csvs = sorted(b.name for b in cc.list_blobs(name_starts_with=prefix) if b.name.lower().endswith(".csv"))
+    athena_path = next((p for p in csvs if "athena" in p.lower()), None)
+    genos_path = next((p for p in csvs if "genos" in p.lower()), None)
+    summary = _read_text(cc, f"{prefix}summary.txt") or ""
+    html = render_solo(title_fn(cand), summary, _read_csv(cc, athena_path), _read_csv(cc, genos_path))
+    return {"cand": cand, "html": html, "summary": summary}
+
+
+def _render_stream(
+    cands: list[str], title_fn: Callable[[str], str], max_workers: int
+) -> Iterator[dict]:
+    """Yield rendered packets in input order, never holding more than 2×workers at once."""
+    window = max(1, max_workers * 2)
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        pending = []
+        it = iter(cands)
+        for cand in it:
+            pending.append((cand, ex.submit(render_packet, cand, title_fn)))
+            if len(pending) >= window:
+                break
+        while pending:
+            cand, fut = pending.pop(0)
+            try:
+                yield fut.result()
+            except Exception as e:
+                yield {"cand": cand, "error": str(e)}
+            nxt = next(it, None)
+            if nxt is not None:
+                pending.append((nxt, ex.submit(render_packet, nxt, title_fn)))
+
+
+def _copy_raw_files(zf: zipfile.ZipFile, cand: str, arc_dir: str) -> int:
+    """Stream the candidate's raw uploads into the zip chunk by chunk."""
+    cc = _raw_cc()
+    copied = 0
+    for blob in cc.list_blobs(name_starts_with=cand.rstrip("/") + "/"):
+        name = blob.name.split("/", 1)[-1]
+        if not name:
+            continue
+        with zf.open(f"{arc_dir}/raw/{name}", "w", force_zip64=True) as dst:
+            if storage.is_encoded(blob):   # compressed text (storage.py): small, decode in one go
+                dst.write(storage.download(cc, blob.name))
+            else:
+                for chunk in iter_chunks(blob.name, size=blob.size, cc=cc):
+                    dst.write(chunk)
+        copied += 1
+    return copied
+
+
+def write_export_zip(
+    fileobj,
+    cands: Iterable[str],
+    *,
+    title_fn: Callable[[str], str] = lambda s: s,
+    slug_fn: Callable[[str], str] = lambda s: s,
+    include_raw: bool = True,
+    max_workers: int | None = None,
+    progress: Callable[[int, int], None] | None = None,
+) -> dict:
+    """Write a packet zip for `cands` into `fileobj`. Returns a small manifest."""
+    cands = list(cands)
+    max_workers = max_workers or min(16, (os.cpu_count() or 2) * 2)
+    manifest = {"exported": [], "failed": {}, "raw_files": 0}
+    with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for i, pkt in enumerate(_render_stream(cands, title_fn, max_workers), start=1):
+            cand = pkt["cand"]
+            if "error" in pkt:
+                manifest["failed"][cand] = pkt["error"]
+            else:
+                arc_dir = slug_fn(cand)
+                zf.writestr(f"{arc_dir}/{arc_dir}_summary.html", pkt["html"])
+                zf.writestr(f"{arc_dir}/{arc_dir}_summary.txt", pkt["summary"])
+                try:
+                    raw_files = _copy_raw_files(zf, cand, arc_dir) if include_raw else 0
+                except Exception as e:
+                    manifest["failed"][cand] = f"raw files: {e}"
+                    zf.writestr(f"{arc_dir}/EXPORT_INCOMPLETE.txt", f"Raw files could not be copied: {e}\n")
+                else:
+                    manifest["raw_files"] += raw_files
+                    manifest["exported"].append(cand)
+            if progress:
+                progress(i, len(cands))
+    return manifest
+
+
+def build_export_file(cands: Iterable[str], **kwargs) -> tuple[tempfile.SpooledTemporaryFile, dict]:
+    """Build the zip into a spooled temp file (rewound) and return it with its manifest.
+
+    The caller owns the spool and should close it (it's a context manager); it is
+    closed here if the build fails.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    try:
+        manifest = write_export_zip(spool, cands, **kwargs)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool, manifest
+
+
+def upload_export(spool, blob_name: str | None = None) -> str:
+    """Stream a built export into the finished container in parallel chunks."""
+    from send_back import _archive_cc
+    blob_name = blob_name or f"exports/candidates-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.zip"
+    spool.seek(0)
+    _archive_cc().upload_blob(
+        blob_name,
+        spool,
+        overwrite=True,
+        max_concurrency=4,
+        content_settings=ContentSettings(content_type="application/zip"),
+    )
+    spool.seek(0)
+    return blob_name
+
+
+def share_export(spool, blob_name: str | None = None) -> tuple[str, str | None]:
+    """Upload a built export and return (blob name, short-lived read link or None if none can be signed)."""
+    from documents import share_url
+    from send_back import _archive_cc
+    blob_name = upload_export(spool, blob_name)
+    return blob_name, share_url(blob_name, cc=_archive_cc())
+
+
+def download_payload(spool) -> bytes | None:
+    """The export's bytes for an in-app download, or None when it is over DOWNLOAD_MAX_BYTES."""
+    spool.seek(0, os.SEEK_END)
+    size = spool.tell()
+    spool.seek(0)
+    return None if size > DOWNLOAD_MAX_BYTES else spool.read()
@@ -0,0 +1,299 @@
+# cache_backend.py
+# Shared cache for blob bytes, parsed frames, listings ("manifests"), LLM outputs
+# and document previews.
+#
+# Every App Service instance has its own st.cache_data, so scaling out multiplies
+# storage traffic. This module puts a small in-process LRU (L1) in front of an
+# optional shared L2 so instances can share warm data:
+#
+#   CACHE_BACKEND=memory            in-process LRU only (default)
+#   CACHE_BACKEND=disk              + SQLite file at CACHE_DIR (shared by workers on one host)
+#   CACHE_BACKEND=redis             + any Redis-protocol server at CACHE_URL
+#                                   (redis://host:6379/0; rediss:// for TLS, e.g. Azure Cache for Redis)
+#
+# Values are bytes; get_obj/set_obj pickle Python objects (DataFrames, dicts).
+# Hit/miss counters per namespace are available from stats().
+import os
+import pickle
+import socket
+import sqlite3
+import ssl
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+NAMESPACES = ("blob", "frame", "manifest", "llm", "doc")
+
+
+class MemoryLRU:
+    """Byte-budgeted LRU with per-entry TTL."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, tuple[float, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, val = item
+            if expires and expires < time.time():
+                self._bytes -= len(self._data.pop(key)[1])
+                return None
+            self._data.move_to_end(key)
+            return val
+
+    def set(self, key: str, val: bytes, ttl: float | None = None):
+        if len(val) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[1])
+            self._data[key] = ((time.time() + ttl) if ttl else 0.0, val)
+            self._bytes += len(val)
+            while self._bytes > self.max_bytes and self._data:
+                self._bytes -= len(self._data.popitem(last=False)[1][1])
+
+    def delete(self, key: str):
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[1])
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+
+class DiskCache:
+    """SQLite-backed cache; safe across processes on the same host."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as c:
+            c.execute("CREATE TABLE IF NOT EXISTS cache (k TEXT PRIMARY KEY, v BLOB, expires REAL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> bytes | None:
+        row = self._conn().execute("SELECT v, expires FROM cache WHERE k = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] and row[1] < time.time():
+            self.delete(key)
+            return None
+        return bytes(row[0])
+
+    def set(self, key: str, val: bytes, ttl: float | None = None):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO cache (k, v, expires) VALUES (?, ?, ?)",
+            (key, sqlite3.Binary(val), (time.time() + ttl) if ttl else 0.0),
+        )
+
+    def delete(self, key: str):
+        self._conn().execute("DELETE FROM cache WHERE k = ?", (key,))
+
+    def clear(self):
+        self._conn().execute("DELETE FROM cache")
+
+
+class RedisCache:
+    """Minimal RESP client (GET/SET PX/DEL) for any Redis-protocol server."""
+
+    def __init__(self, url: str, timeout: float = 2.0):
+        u = urlparse(url)
+        self.host, self.port = u.hostname or "localhost", u.port or 6379
+        self.password = u.password
+        self.db = int((u.path or "/0").strip("/") or 0)
+        self.tls = u.scheme == "rediss"
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _sock(self):
+        s = getattr(self._local, "sock", None)
+        if s is None:
+            s = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            if self.tls:
+                s = ssl.create_default_context().wrap_socket(s, server_hostname=self.host)
+            self._local.sock, self._local.buf = s, b""
+            if self.password:
+                self._call(b"AUTH", self.password.encode())
+            if self.db:
+                self._call(b"SELECT", str(self.db).encode())
+        return s
+
+    def _readline(self) -> bytes:
+        while b"\r\n" not in self._local.buf:
+            chunk = self._local.sock.recv(65536)
+            if not chunk:
+                raise ConnectionError("connection closed")
+            self._local.buf += chunk
+        line, self._local.buf = self._local.buf.split(b"\r\n", 1)
+        return line
+
+    def _readexact(self, n: int) -> bytes:
+        while len(self._local.buf) < n + 2:
+            chunk = self._local.sock.recv(65536)
+            if not chunk:
+                raise ConnectionError("connection closed")
+            self._local.buf += chunk
+        data, self._local.buf = self._local.buf[:n], self._local.buf[n + 2:]
+        return data
+
+    def _call(self, *args: bytes):
+        s = self._sock()
+        payload = b"*%d\r\n" % len(args) + b"".join(b"$%d\r\n%s\r\n" % (len(a), a) for a in args)
+        try:
+            s.sendall(payload)
+            line = self._readline()
+        except Exception:
+            self._local.sock = None
+            raise
+        kind, rest = line[:1], line[1:]
+        if kind == b"-":
+            raise RuntimeError(rest.decode())
+        if kind == b"$":
+            n = int(rest)
+            return None if n < 0 else self._readexact(n)
+        if kind == b":":
+            return int(rest)
+        return rest
+
+    def get(self, key: str) -> bytes | None:
+        return self._call(b"GET", key.encode())
+
+    def set(self, key: str, val: bytes, ttl: float | None = None):
+        if ttl:
+            self._call(b"SET", key.encode(), val, b"PX", str(int(ttl * 1000)).encode())
+        else:
+            self._call(b"SET", key.encode(), val)
+
+    def delete(self, key: str):
+        self._call(b"DEL", key.encode())
+
+    def clear(self):
+        self._call(b"FLUSHDB")
+
+
+class TieredCache:
+    """L1 (in-process) in front of an optional shared L2, with per-namespace counters."""
+
+    def __init__(self, l1: MemoryLRU, l2=None, l1_ttl: float = 30.0):
+        self.l1, self.l2, self.l1_ttl = l1, l2, l1_ttl
+        self._stats = {ns: {"l1_hits": 0, "l2_hits": 0, "misses": 0, "errors": 0} for ns in NAMESPACES}
+        self._lock = threading.Lock()
+
+    def _count(self, ns: str, field: str):
+        with self._lock:
+            self._stats.setdefault(ns, {"l1_hits": 0, "l2_hits": 0, "misses": 0, "errors": 0})[field] += 1
+
+    def get(self, ns: str, key: str) -> bytes | None:
+        k = f"{ns}:{key}"
+        val = self.l1.get(k)
+        if val is not None:
+            self._count(ns, "l1_hits")
+            return val
+        if self.l2 is not None:
+            try:
+                val = self.l2.get(k)
+            except Exception:
+                self._count(ns, "errors")
+                val = None
+            if val is not None:
+                self._count(ns, "l2_hits")
+                self.l1.set(k, val, self.l1_ttl)
+                return val
+        self._count(ns, "misses")
+        return None
+
+    def set(self, ns: str, key: str, val: bytes, ttl: float | None = None):
+        k = f"{ns}:{key}"
+        self.l1.set(k, val, min(ttl, self.l1_ttl) if ttl else self.l1_ttl)
+        if self.l2 is not None:
+            try:
+                self.l2.set(k, val, ttl)
+            except Exception:
+                self._count(ns, "errors")
+
+    def delete(self, ns: str, key: str):
+        k = f"{ns}:{key}"
+        self.l1.delete(k)
+        if self.l2 is not None:
+            try:
+                self.l2.delete(k)
+            except Exception:
+                self._count(ns, "errors")
+
+    def get_obj(self, ns: str, key: str):
+        val = self.get(ns, key)
+        return None if val is None else pickle.loads(val)
+
+    def set_obj(self, ns: str, key: str, obj, ttl: float | None = None):
+        self.set(ns, key, pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL), ttl)
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = {}
+            for ns, s in self._stats.items():
+                total = s["l1_hits"] + s["l2_hits"] + s["misses"]
+                out[ns] = {**s, "hit_rate": round((s["l1_hits"] + s["l2_hits"]) / total, 3) if total else None}
+            return out
+
+
+_cache: TieredCache | None = None
+_cache_lock = threading.Lock()
+
+
+def make_cache() -> TieredCache:
+    backend = os.getenv("CACHE_BACKEND", "memory").lower()
+    l1 = MemoryLRU(int(os.getenv("CACHE_L1_BYTES", str(64 * 1024 * 1024))))
+    if backend == "disk":
+        return TieredCache(l1, DiskCache(os.path.join(os.getenv("CACHE_DIR", ".cache"), "cache.sqlite3")))
+    if backend == "redis":
+        return TieredCache(l1, RedisCache(os.getenv("CACHE_URL", "redis://localhost:6379/0")))
+    return TieredCache(l1)
+
+
+def get_cache() -> TieredCache:
+    """Process-wide cache configured from the environment."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = make_cache()
+        return _cache
+
+
+def cached_bytes(ns: str, key: str, loader, ttl: float | None = None) -> bytes | None:
+    """Return cached bytes for (ns, key), calling `loader()` on a miss. None results aren't cached."""
+    c = get_cache()
+    val = c.get(ns, key)
+    if val is None:
+        val = loader()
+        if val is not None:
+            c.set(ns, key, val, ttl)
+    return val
+
+
+def cached_obj(ns: str, key: str, loader, ttl: float | None = None):
+    """Pickled-object flavour of cached_bytes."""
+    c = get_cache()
+    val = c.get_obj(ns, key)
+    if val is None:
+        val = loader()
+        if val is not None:
+            c.set_obj(ns, key, val, ttl)
+    return val
@@ -9,6 +9,7 @@ from agent_comparer import compare_summaries_agent
 from send_back import render_candidate_download, delete_candidate_from_dashboard
 st.set_page_config(page_title="Candidate Page", page_icon="🧩", layout="wide")
 from send_back import _archive_cc 
+import storage
 
 import re
 if "removed_candidates" not in st.session_state:
@@ -27,7 +28,7 @@ def _finished_exists(blob_name: str) -> bool:
 def _finished_load(blob_name: str) -> str | None:
     cc = _archive_cc()
     try:
-        return cc.download_blob(blob_name).readall().decode("utf-8", errors="replace")
+        return storage.download(cc, blob_name).decode("utf-8", errors="replace")
     except Exception:
         return None
 
@@ -62,7 +63,7 @@ def get_cc():
     
 def _download_blob_bytes(path: str) -> bytes | None:
     try:
-        return get_cc().download_blob(path).readall()
+        return storage.download(get_cc(), path)
     except Exception:
         return None
 
@@ -111,7 +112,7 @@ def load_csv(blob_path: str) -> pd.DataFrame | None:
 def load_summary(cand: str) -> str:
     """Read dashboard/{cand}/summary.txt → str ('' if missing)."""
     try:
-        data = get_cc().download_blob(f"{cand.rstrip('/')}/summary.txt").readall()
+        data = storage.download(get_cc(), f"{cand.rstrip('/')}/summary.txt")
         return data.decode("utf-8", errors="replace")
     except Exception:
         return ""
@@ -0,0 +1,391 @@
+# cli.py
+# Headless entry point for nightly batch runs (no Streamlit server).
+#
+#   python -m cli warm [--records] [--workers N]
+#   python -m cli score [CAND ...] [--where EXPR] [--order KEYS] [-k N]
+#   python -m cli compare-batch CAND [CAND ...] --with OTHER [OTHER ...] [--archive] [--route R] [--docs] [--fresh]
+#   python -m cli compare-matrix [CAND ...] [--final] [--fresh] [--concurrency N] [--rpm N]
+#   python -m cli export [CAND ...] [--out FILE] [--no-raw]
+#   python -m cli purge [CAND ...] [--changes-older-than DAYS] [--drafts-older-than HOURS] [--yes]
+#   python -m cli compress-blobs [--container NAME ...] [--prefix P] [--yes]
+#
+# The commands call the same loaders and writers as the pages: records.py (what
+# candidates.py shows), query.py (the Shortlist), agent_comparer.py (Compare),
+# bulk_export.py (Bulk export) and send_back.py (Remove from dashboard).
+# Record loading and LLM drafting run in a ProcessPoolExecutor (--workers); writes
+# to storage stay in this process. Workers are spawned, not forked: warm has
+# already started the search-index refresher thread by the time they start. compare-matrix drafts in threads under one
+# pairwise.Quota instead, so the rate limit holds across the whole cohort. Each
+# command prints one JSON object to stdout with its result, per-phase "timings"
+# and total "seconds"; logs go to stderr.
+# The exit code is 1 if anything failed. purge and compress-blobs only report
+# unless --yes is given.
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+
+log = logging.getLogger("cli")
+
+DEFAULT_WORKERS = min(8, os.cpu_count() or 2)
+
+
+class _Timings(dict):
+    """{phase: seconds}; `with t.phase(name):` records one phase."""
+
+    @contextmanager
+    def phase(self, name: str):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self[name] = round(self.get(name, 0.0) + time.perf_counter() - t, 3)
+
+
+def _chunks(items: list, n: int) -> list[list]:
+    """Split `items` into about 4×n slices so slow candidates don't leave workers idle."""
+    if not items:
+        return []
+    size = max(1, -(-len(items) // (max(1, n) * 4)))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _pool(workers: int):
+    # one worker runs inline: easier to profile, and nothing to fork for a handful of candidates
+    if workers <= 1:
+        return ThreadPoolExecutor(max_workers=1)
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def _resolve(cands: list[str]) -> list[str]:
+    import records
+    bank = records.list_candidates(wait=True)
+    if not cands:
+        return bank
+    missing = [c for c in cands if c not in bank]
+    if missing:
+        log.warning("not in the dashboard: %s", ", ".join(missing))
+    return [c for c in cands if c in bank]
+
+
+# ---------- worker functions (run in child processes) ----------
+
+def _load_chunk(cands: list[str]) -> dict:
+    """Load records through the shared cache; only counts go back to the parent."""
+    import records
+    recs = records.load_records(cands)
+    return {"candidates": len(recs), "empty": sum(1 for r in recs.values() if not r.get("csvs"))}
+
+
+def _score_chunk(cands: list[str]) -> list[tuple]:
+    """(cand, athena codes, genos codes, echelon) with measure names: ids are per process (encoding.py)."""
+    import encoding
+    import records
+    out = []
+    for cand, rec in records.load_records(cands).items():
+        out.append((cand, encoding.portable(rec.get("athena_codes")), encoding.portable(rec.get("genos_codes")),
+                    rec.get("echelon", float("nan"))))
+    return out
+
+
+def _compare_one(cand: str, others: list[str], model: str | None, route: str | None, final: bool,
+                 docs: bool, fresh: bool) -> dict:
+    import records
+    from agent_comparer import compare_summaries_detailed
+    t0 = time.perf_counter()
+    recs = records.load_records([cand, *others])
+    documents = None
+    if docs:
+        documents = {records.display_name(c): records.candidate_documents(c) for c in [cand, *others]}
+    call = compare_summaries_detailed(
+        cand_summary=recs[cand].get("summary", "") or "",
+        other_summaries={records.display_name(o): recs[o].get("summary", "") or "" for o in others},
+        cand_name=records.display_name(cand),
+        documents=documents,
+        model=model,
+        route=route,
+        final=final,
+        use_cache=not fresh,
+    )
+    ok = bool(call["text"]) and not call["error"]
+    # the call record travels back with the result: route stats live in the worker process
+    return {"cand": cand, "others": others, "ok": ok, "text": call["text"], "call": call,
+            "seconds": round(time.perf_counter() - t0, 3)}
+
+
+# ---------- commands ----------
+
+def cmd_warm(args) -> dict:
+    import warmup
+    t = _Timings()
+    with t.phase("warmup"):
+        report = warmup.warm()
+    out = {"steps": report["steps"]}
+    if args.records:
+        with t.phase("list"):
+            cands = _resolve([])
+        with t.phase("records"), _pool(args.workers) as ex:
+            parts = list(ex.map(_load_chunk, _chunks(cands, args.workers)))
+        out["records"] = {"candidates": sum(p["candidates"] for p in parts), "empty": sum(p["empty"] for p in parts)}
+        if os.getenv("CACHE_BACKEND", "memory").lower() == "memory":
+            out["note"] = "CACHE_BACKEND=memory: records were loaded but nothing outlives this process"
+    out["ok"] = all(s.get("ok") for s in report["steps"].values())
+    return {**out, "timings": t}
+
+
+def cmd_score(args) -> dict:
+    import encoding
+    from query import BankQuery, QueryError
+    t = _Timings()
+    with t.phase("list"):
+        cands = _resolve(args.cands)
+    qi = BankQuery(capacity=max(1024, len(cands)))
+    with t.phase("load"), _pool(args.workers) as ex:
+        for part in ex.map(_score_chunk, _chunks(cands, args.workers)):
+            for cand, a, g, echelon in part:
+                qi.upsert(cand, encoding.localize(a), encoding.localize(g), echelon)
+    try:
+        with t.phase("query"):
+            res = qi.query(args.where or "", args.order, args.k if args.k > 0 else len(cands))
+    except QueryError as e:
+        return {"ok": False, "error": str(e), "timings": t}
+    return {"ok": True, "matched": res["matched"], "total": res["total"], "rows": res["rows"], "timings": t}
+
+
+def cmd_compare_batch(args) -> dict:
+    import records
+    t = _Timings()
+    with t.phase("list"):
+        cands = _resolve(args.cands)
+        others = _resolve(args.others)
+    jobs = [(c, [o for o in others if o != c]) for c in cands]
+    jobs = [(c, os_) for c, os_ in jobs if os_]
+    results, archived, failed = [], 0, {}
+    with t.phase("draft"), _pool(args.workers) as ex:
+        route = None if args.route == "auto" else args.route
+        # archived briefs are final ones: the auto route sends them to the strong deployment
+        futs = [ex.submit(_compare_one, c, os_, args.model, route, args.archive, args.docs, args.fresh)
+                for c, os_ in jobs]
+        for fut, (cand, _) in zip(futs, jobs):
+            try:
+                results.append(fut.result())
+            except Exception as e:
+                failed[cand] = str(e)
+    for r in results:
+        if not r["ok"]:
+            failed[r["cand"]] = r["text"]
+    if args.archive:
+        import compare as cmp
+        from report import render_compare
+        from send_back import comparison_archive_paths, upload_text, upload_text_fanout
+        with t.phase("archive"):
+            for r in (r for r in results if r["ok"]):
+                cand, others_ = r["cand"], r["others"]
+                others_title = ", ".join(records.display_name(o) for o in others_)
+                others_slug = "-and-".join(records.slug(o) for o in others_)
+                selected = [cand, *others_]
+                try:
+                    html = render_compare(records.display_name(cand), others_title, r["text"],
+                                          cmp.build_athena_table(selected), cmp.build_gensos_table(selected))
+                    # same layout as the Compare panel's "Save updated comparison"
+                    upload_text_fanout([f"compare/{records.slug(cand)}-vs-{others_slug}.html",
+                                        *comparison_archive_paths(cand, others_title)], html)
+                    upload_text(f"{records.slug(cand)}_vs_{others_slug}_cohesive_summary.txt", r["text"],
+                                content_type="text/plain")
+                    archived += 1
+                except Exception as e:
+                    failed[cand] = f"archive: {e}"
+    from agent_comparer import summarize_calls
+    drafts = [{"cand": r["cand"], "others": r["others"], "ok": r["ok"], "seconds": r["seconds"],
+               "route": r["call"]["route"], "model": r["call"]["model"],
+               **({"text": r["text"]} if args.print_text else {})} for r in results]
+    return {"ok": not failed, "jobs": len(jobs), "drafted": sum(r["ok"] for r in results),
+            "archived": archived, "failed": failed, "drafts": drafts,
+            "routes": summarize_calls([r["call"] for r in results]), "timings": t}
+
+
+def cmd_compare_matrix(args) -> dict:
+    # LLM-bound, not CPU-bound: threads in this process under one Quota rather than --workers processes
+    import pairwise
+    import records
+    from agent_comparer import summarize_calls
+    t = _Timings()
+    with t.phase("list"):
+        cands = _resolve(args.cands)
+    with t.phase("load"):
+        recs = records.load_records(cands)
+    summaries = {c: recs[c].get("summary", "") or "" for c in cands}
+    with t.phase("pairs"):
+        res = pairwise.matrix(cands, summaries, final=args.final, fresh=args.fresh,
+                              quota=pairwise.Quota(args.concurrency, args.rpm))
+    return {"ok": not res["failed"], "candidates": len(cands), "pairs": len(res["pairs"]) + len(res["failed"]),
+            "reused": res["reused"], "drafted": res["drafted"], "failed": res["failed"],
+            "routes": summarize_calls(res["calls"]), "timings": t}
+
+
+def cmd_export(args) -> dict:
+    import records
+    from bulk_export import build_export_file, upload_export
+    t = _Timings()
+    with t.phase("list"):
+        cands = _resolve(args.cands)
+    with t.phase("build"):
+        spool, manifest = build_export_file(cands, title_fn=records.display_name, slug_fn=records.slug,
+                                            include_raw=not args.no_raw, max_workers=args.workers * 2)
+    with spool:
+        size = spool.seek(0, os.SEEK_END)
+        with t.phase("write"):
+            if args.out:
+                spool.seek(0)
+                with open(args.out, "wb") as f:
+                    shutil.copyfileobj(spool, f)
+                dest = os.path.abspath(args.out)
+            else:
+                dest = "finished/" + upload_export(spool)
+    return {"ok": not manifest["failed"], "exported": len(manifest["exported"]), "raw_files": manifest["raw_files"],
+            "failed": manifest["failed"], "bytes": size, "dest": dest, "timings": t}
+
+
+def cmd_purge(args) -> dict:
+    import records
+    from listing import get_listing, prune_changes
+    from send_back import delete_candidate_from_dashboard
+    t = _Timings()
+    dry = not args.yes
+    out = {"dry_run": dry}
+    if args.cands:
+        with t.phase("list"):
+            cands = _resolve(args.cands)
+        if dry:
+            bank = get_listing(records.CONTAINER)
+            out["candidates"] = {c: len(bank.files(c) or []) for c in cands}
+        else:
+            def _purge(cand):
+                n, errors = delete_candidate_from_dashboard(cand)
+                records.invalidate_candidate(cand)
+                return cand, n, errors
+            with t.phase("delete"), ThreadPoolExecutor(max_workers=args.workers) as ex:
+                done = list(ex.map(_purge, cands))
+            out["candidates"] = {c: n for c, n, _ in done}
+            out["errors"] = {c: e for c, _, e in done if e}
+    if args.changes_older_than is not None:
+        with t.phase("changes"):
+            out["changes"] = prune_changes(records.get_cc(), args.changes_older_than, dry_run=dry)
+    if args.drafts_older_than is not None:
+        from send_back import _archive_cc
+        from session_store import prune_spills
+        with t.phase("drafts"):
+            out["drafts"] = prune_spills(_archive_cc(), args.drafts_older_than, dry_run=dry)
+    out["ok"] = not out.get("errors")
+    return {**out, "timings": t}
+
+
+def cmd_compress_blobs(args) -> dict:
+    import records
+    import storage
+    t = _Timings()
+    dry = not args.yes
+    out = {"dry_run": dry, "codec": storage.codec(), "containers": {}}
+    for name in args.container:
+        with t.phase(name):
+            # the dashboard's rewrites go through the change log so listings pick up the new ETags
+            out["containers"][name] = storage.migrate(records.make_bsc().get_container_client(name), args.prefix,
+                                                      dry_run=dry, max_workers=args.workers * 2,
+                                                      record=name == records.CONTAINER)
+    out["ok"] = not any(s["failed"] for s in out["containers"].values())
+    return {**out, "timings": t}
+
+
+COMMANDS = {
+    "warm": cmd_warm,
+    "score": cmd_score,
+    "compare-batch": cmd_compare_batch,
+    "compare-matrix": cmd_compare_matrix,
+    "export": cmd_export,
+    "purge": cmd_purge,
+    "compress-blobs": cmd_compress_blobs,
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="python -m cli", description="Headless batch commands for the candidate bank")
+    ap.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="worker processes (1 = run inline)")
+    ap.add_argument("--pretty", action="store_true", help="indent the JSON output")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("warm", help="warm clients, listing and search index (warmup.py)")
+    p.add_argument("--records", action="store_true", help="also load every candidate record into the shared cache")
+
+    p = sub.add_parser("score", help="fit/Echelon for the bank, filtered and ranked like the Shortlist")
+    p.add_argument("cands", nargs="*", help="candidates to score (default: whole bank)")
+    p.add_argument("--where", default="", help='filter, e.g. "fit >= 70%% and genos empathy >= high"')
+    p.add_argument("--order", default="-fit, -echelon", help="sort keys, best first with '-'")
+    p.add_argument("-k", type=int, default=0, help="top k rows (0 = all)")
+
+    p = sub.add_parser("compare-batch", help="draft comparison summaries with the agent")
+    p.add_argument("cands", nargs="+", help="candidates to write comparisons for")
+    p.add_argument("--with", dest="others", nargs="+", required=True, help="candidates to compare against")
+    p.add_argument("--model", default=None, help="deployment name; overrides the route's")
+    p.add_argument("--route", choices=("auto", "fast", "strong"), default="auto",
+                   help="auto: fast for small drafts, strong for big groups and --archive")
+    p.add_argument("--docs", action="store_true", help="include uploaded résumés/reports (extract.py)")
+    p.add_argument("--fresh", action="store_true", help="bypass the LLM answer cache")
+    p.add_argument("--archive", action="store_true", help="save HTML + text to 'finished' like the Compare panel")
+    p.add_argument("--print-text", action="store_true", help="include the drafted text in the JSON")
+
+    p = sub.add_parser("compare-matrix", help="draft every missing pairwise brief for a cohort (pairwise.py)")
+    p.add_argument("cands", nargs="*", help="the cohort (default: whole bank)")
+    p.add_argument("--final", action="store_true", help="strong-route briefs; fast-route pairs are redrafted")
+    p.add_argument("--fresh", action="store_true", help="redraft every pair")
+    p.add_argument("--concurrency", type=int, default=int(os.getenv("LLM_MAX_CONCURRENT", "4")),
+                   help="LLM calls in flight")
+    p.add_argument("--rpm", type=int, default=int(os.getenv("LLM_RPM", "60")), help="LLM calls per minute")
+
+    p = sub.add_parser("export", help="bulk export packets (bulk_export.py)")
+    p.add_argument("cands", nargs="*", help="candidates to export (default: whole bank)")
+    p.add_argument("--out", help="write the zip here instead of archiving it to 'finished'")
+    p.add_argument("--no-raw", action="store_true", help="leave out the original uploaded files")
+
+    p = sub.add_parser("purge", help="remove candidates from the dashboard and/or prune the change log and spilled drafts")
+    p.add_argument("cands", nargs="*", help="candidates to remove from the dashboard")
+    p.add_argument("--changes-older-than", type=float, metavar="DAYS", help="prune change-log markers (listing.py)")
+    p.add_argument("--drafts-older-than", type=float, metavar="HOURS",
+                   help="prune orphaned session drafts spilled to 'finished' (session_store.py)")
+    p.add_argument("--yes", action="store_true", help="actually delete (default: report only)")
+
+    p = sub.add_parser("compress-blobs", help="rewrite existing text blobs compressed (storage.py)")
+    p.add_argument("--container", nargs="+", default=[os.getenv("CONTAINER", "dashboard"),
+                                                      os.getenv("FINISHED_CONTAINER", "finished"),
+                                                      os.getenv("RAW_CONTAINER", "raw")])
+    p.add_argument("--prefix", default="", help="only blobs under this prefix")
+    p.add_argument("--yes", action="store_true", help="actually rewrite (default: report savings only)")
+    return ap
+
+
+def main(argv=None) -> int:
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr,
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    # st.cache_* work without a server; their "no runtime" warnings are just noise here
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    args = build_parser().parse_args(argv)
+    args.workers = max(1, args.workers)
+    t0 = time.perf_counter()
+    try:
+        out = COMMANDS[args.command](args)
+    except Exception as e:
+        log.exception("%s failed", args.command)
+        out = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    out = {"command": args.command, "workers": args.workers, **out,
+           "seconds": round(time.perf_counter() - t0, 3)}
+    print(json.dumps(out, indent=2 if args.pretty else None, default=str))
+    return 0 if out.get("ok") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
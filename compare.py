@@ -1,21 +1,25 @@
-import os, io, re
-from typing import Dict, Tuple, List
+import os, io
+from typing import Dict, List
 import pandas as pd
 import streamlit as st
-from azure.storage.blob import BlobServiceClient, ContentSettings
-from azure.identity import DefaultAzureCredential, AzureCliCredential
+import schema
+import storage
+from cache_backend import cached_bytes
+from listing import get_listing, record_change
 
 DASHBOARD = os.getenv("DASHBOARD_CONTAINER", "dashboard")
 
 # Caching storage client
 @st.cache_resource(show_spinner=False)
-def _bsc() -> BlobServiceClient:
+def _bsc():
+    from azure.storage.blob import BlobServiceClient   # the SDK is ~200 ms to import; only clients need it
     conn = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
     if conn:
         return BlobServiceClient.from_connection_string(conn)
     acct = os.getenv("AZURE_STORAGE_ACCOUNT_NAME") or os.getenv("AZURE_STORAGE_ACCOUNT")
     if not acct:
         raise RuntimeError("Set AZURE_STORAGE_CONNECTION_STRING or AZURE_STORAGE_ACCOUNT_NAME.")
+    from azure.identity import DefaultAzureCredential, AzureCliCredential  # only needed without a connection string
     cred = AzureCliCredential() if os.getenv("PREFER_AZ_CLI","1")=="1" else DefaultAzureCredential(exclude_shared_token_cache_credential=True)
     return BlobServiceClient(f"https://{acct}.blob.core.windows.net", credential=cred)
     
@@ -25,10 +29,13 @@ def _cc():
 
 # Blob helpers (streaming the data to Streamlit). Will return none if blob doesn't exist.
 def _download_blob_text(path: str) -> str | None:
-    try:
-        return _cc().download_blob(path).readall().decode("utf-8", errors="replace")
-    except Exception:
-        return None
+    def _load():
+        try:
+            return storage.download(_cc(), path)
+        except Exception:
+            return None
+    b = cached_bytes("blob", f"{DASHBOARD}/{path}", _load, ttl=30)
+    return None if b is None else b.decode("utf-8", errors="replace")
     
 # Loading the AI generated summary
 @st.cache_data(ttl=15, show_spinner=False)
@@ -37,12 +44,10 @@ def load_summary_text(slug: str) -> str:
     
 # This is for when the user makes an edit - it'll write the summary to streamlit so that it updates for the user
 def save_summary_text(slug: str, text: str, filename: str = "summary.txt") -> None:
-    _cc().upload_blob(
-        f"{slug.rstrip('/')}/{filename}",
-        text.encode("utf-8"),
-        overwrite=True,
-        content_settings=ContentSettings(content_type="text/plain"),
-    )
+    res = storage.upload(_cc(), f"{slug.rstrip('/')}/{filename}", text, content_type="text/plain")
+    record_change(_cc(), "put", f"{slug.rstrip('/')}/{filename}", etag=res.get("etag"), size=res["size"])
+    from search_index import index_blob
+    index_blob("dashboard", f"{slug.rstrip('/')}/{filename}", text, etag=res.get("etag"))
 
 
 # Combined summary editor  
@@ -87,6 +92,9 @@ def render_combined_editor(current_slug: str, other_slug: str, context_key: str
 # CSV listing + parsers (Athena/Genos) — used by the comparison table
 @st.cache_data(ttl=30, show_spinner=False)
 def _list_csvs_for_candidate(cand: str) -> list[str]:
+    known = get_listing(DASHBOARD).csvs(cand)
+    if known is not None:
+        return known
     start = cand.rstrip("/") + "/"
     paths = []
     for blob in _cc().list_blobs(name_starts_with=start):
@@ -94,22 +102,6 @@ def _list_csvs_for_candidate(cand: str) -> list[str]:
             paths.append(blob.name)
     return sorted(paths)
 
-def _find_col(df: pd.DataFrame, *cands) -> str | None:
-    cols = {c.strip().lower(): c for c in df.columns if isinstance(c, str)}
-    for c in cands:
-        if c and c.strip().lower() in cols:
-            return cols[c.strip().lower()]
-    norm = {re.sub(r"[^a-z0-9]", "", k): v for k, v in cols.items()}
-    for c in cands:
-        if not c: continue
-        k = re.sub(r"[^a-z0-9]", "", c.strip().lower())
-        if k in norm: return norm[k]
-    wanted = [re.sub(r"[^a-z0-9]", "", c.strip().lower()) for c in cands if c]
-    for raw, orig in cols.items():
-        raw_norm = re.sub(r"[^a-z0-9]", "", raw)
-        if any(w in raw_norm for w in wanted): return orig
-    return None
-
 def _read_csv(path: str) -> pd.DataFrame | None:
     txt = _download_blob_text(path)
     if txt is None: return None
@@ -117,35 +109,25 @@ def _read_csv(path: str) -> pd.DataFrame | None:
     except Exception: return None
 
 def _parse_athena(df: pd.DataFrame) -> tuple[dict[str, str], dict[str, str]]:
+    df = schema.normalize(df, schema.ATHENA)
     if df is None or df.empty: return {}, {}
-    c_measure = _find_col(df, "Measure")
-    c_cand    = _find_col(df, "Candidate Value")
-    c_top     = _find_col(df, "Top Performers")
-    if not c_measure:
-        str_cols = [c for c in df.columns if df[c].dtype == object]
-        c_measure = str_cols[0] if str_cols else df.columns[0]
-    if not c_cand: c_cand = df.columns[-1]
+    has_cand, has_top = "Candidate Value" in df.columns, "Top Performers" in df.columns
+    c_cand = "Candidate Value" if has_cand else df.columns[-1]
     cand_map, top_map = {}, {}
-    for _, row in df.iterrows():
-        m = str(row.get(c_measure, "")).strip()
+    for m, v_c, v_t in zip(df["Trait"].astype(str).str.strip(), df[c_cand],
+                           df["Top Performers"] if has_top else [""] * len(df)):
         if not m: continue
-        v_c = row.get(c_cand, ""); v_t = row.get(c_top, "") if c_top else ""
         cand_map[m] = "" if pd.isna(v_c) else str(v_c).strip()
         top_map[m]  = "" if pd.isna(v_t) else str(v_t).strip()
     return cand_map, top_map
 
 def _parse_genos(df: pd.DataFrame) -> Dict[str, str]:
+    df = schema.normalize(df, schema.GENOS)
     if df is None or df.empty: return {}
-    c_trait = _find_col(df, "Measure", "Trait")
-    c_score = _find_col(df, "Band")
-    if not c_trait or not c_score:
-        str_cols = [c for c in df.columns if df[c].dtype == object]
-        c_trait = c_trait or (str_cols[0] if str_cols else df.columns[0])
-        c_score = c_score or df.columns[-1]
+    c_trait = "Measure" if "Measure" in df.columns else df.columns[0]
+    c_score = "Band" if "Band" in df.columns else df.columns[-1]
     out: Dict[str, str] = {}
-    for _, row in df.iterrows():
-        t = str(row.get(c_trait, "")).strip()
-        v = row.get(c_score, "")
+    for t, v in zip(df[c_trait].astype(str).str.strip(), df[c_score]):
         out[t] = "" if pd.isna(v) else str(v).strip()
     return out
 
@@ -153,8 +135,8 @@ def _parse_genos(df: pd.DataFrame) -> Dict[str, str]:
 def load_candidate_measure_maps(cand: str) -> tuple[dict[str, str], dict[str, str], dict[str, str]]:
     csvs = _list_csvs_for_candidate(cand)
     # pick athena/genos files
-    athena_path = next((p for p in csvs if re.search(r"(athena|athen[_-]?vs[_-]?top)", p, re.I)), None)
-    genos_path  = next((p for p in csvs if re.search(r"genos", p, re.I)), None)
+    athena_path = next((p for p in csvs if schema.detect_kind(p) == schema.ATHENA), None)
+    genos_path  = next((p for p in csvs if schema.detect_kind(p) == schema.GENOS), None)
     ath_df = _read_csv(athena_path) if athena_path else None
     ge_df  = _read_csv(genos_path)  if genos_path  else None
     ath_cand_map, ath_top_map = _parse_athena(ath_df)
@@ -311,32 +293,12 @@ def render_comparison_table(selected: List[str], title: str = "Side-by-side scor
     st.markdown(f"### {title}")
     st.dataframe(df, use_container_width=True)
 '''
-import re
-from html import escape as _escape
 import pandas as pd
 import streamlit as st
+from report import render_group
 
 def build_compare_html(selected: list[str], summary_text: str, title: str) -> str:
     """Return HTML containing the summary + the Athena and Genos tables."""
     ath_df = build_athena_table(selected)
     gen_df = build_gensos_table(selected)
-
-    sections = []
-    if not ath_df.empty:
-        sections.append("<h3>Athena scores</h3>" +
-                        ath_df.to_html(index=False, border=1, justify="left", escape=False))
-    if not gen_df.empty:
-        sections.append("<h3>Genos bands</h3>" +
-                        gen_df.to_html(index=False, border=1, justify="left", escape=False))
-
-    return f"""
-    <html>
-    <body style="font-family: Arial, sans-serif; font-size: 14px; color: #222;">
-      <h2>Cohesive Summary – {title}</h2>
-      <div style="white-space: pre-wrap; line-height:1.5;">{_escape((summary_text or '').strip())}</div>
-      {''.join(sections)}
-      <p style="margin-top:20px; font-style:italic;">Exported from HR Dashboard</p>
-    </body>
-    </html>
-    """.strip()
-
+    return render_group(title, summary_text, ath_df, gen_df)
@@ -0,0 +1,236 @@
+# documents.py
+# Access layer for the candidate documents in the raw container (PDF/DOCX reports, résumés).
+#
+# Callers used to download_blob(...).readall() whole files, which is fine for a 2 KB
+# CSV and bad for a 20 MB PDF. This module instead
+#   - streams large blobs as ordered chunks fetched by parallel range reads
+#     (iter_chunks: at most `max_concurrency` chunks in flight, so memory stays bounded),
+#   - does HTTP range reads for previews (read_range / head),
+#   - exposes a blob as a seekable read-only file (BlobFile), so pypdf/zipfile fetch
+#     only the byte ranges they touch (a PDF's first page, a DOCX's document.xml),
+#   - gives the dashboard a deferred downloader (download_callable) or a short-lived
+#     SAS link (share_url), so rendering a panel never pulls the file itself.
+import io
+import mimetypes
+import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+RAW_CONTAINER = os.getenv("RAW_CONTAINER", "raw")
+DOC_EXTS = (".pdf", ".docx")
+CHUNK_BYTES = int(os.getenv("DOC_CHUNK_BYTES", str(4 * 1024 * 1024)))
+MAX_CONCURRENCY = int(os.getenv("DOC_MAX_CONCURRENCY", "4"))
+BLOCK_BYTES = 256 * 1024      # BlobFile range-read granularity
+HEAD_BYTES = 64 * 1024        # default preview size for head()
+SAS_MINUTES = 15
+
+_pool: ThreadPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _raw_cc():
+    from compare import _bsc
+    return _bsc().get_container_client(RAW_CONTAINER)
+
+
+def _io_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="doc-io")
+    return _pool
+
+
+def content_type(name: str) -> str:
+    if name.lower().endswith(".docx"):
+        return "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+    return mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+
+def list_documents(cand: str, exts: tuple[str, ...] = DOC_EXTS, cc=None) -> list[dict]:
+    """[{name, file, size, etag, content_type}] for a candidate's uploaded documents."""
+    cc = cc or _raw_cc()
+    prefix = cand.rstrip("/") + "/"
+    docs = []
+    for b in cc.list_blobs(name_starts_with=prefix):
+        if not b.name.lower().endswith(exts):
+            continue
+        settings = getattr(b, "content_settings", None)
+        docs.append({
+            "name": b.name,
+            "file": b.name[len(prefix):],
+            "size": b.size or 0,
+            "etag": b.etag,
+            "content_type": getattr(settings, "content_type", None) or content_type(b.name),
+        })
+    return sorted(docs, key=lambda d: d["file"].lower())
+
+
+def blob_size(name: str, cc=None) -> int:
+    cc = cc or _raw_cc()
+    return cc.get_blob_client(name).get_blob_properties().size
+
+
+# ---------- reads ----------
+
+def read_range(name: str, offset: int, length: int, cc=None) -> bytes:
+    """Bytes [offset, offset + length) of a blob (one HTTP range request)."""
+    cc = cc or _raw_cc()
+    return cc.download_blob(name, offset=offset, length=length).readall()
+
+
+def head(name: str, nbytes: int = HEAD_BYTES, cc=None) -> bytes:
+    return read_range(name, 0, nbytes, cc)
+
+
+def read_all(name: str, size: int | None = None, cc=None) -> bytes:
+    """Whole blob; anything over CHUNK_BYTES is fetched with parallel range requests."""
+    cc = cc or _raw_cc()
+    concurrency = MAX_CONCURRENCY if size is None or size > CHUNK_BYTES else 1
+    return cc.download_blob(name, max_concurrency=concurrency).readall()
+
+
+def iter_chunks(name: str, *, size: int | None = None, chunk_size: int = CHUNK_BYTES,
+                max_concurrency: int = MAX_CONCURRENCY, cc=None):
+    """Yield a blob in order, `chunk_size` bytes at a time, keeping up to `max_concurrency` reads in flight."""
+    cc = cc or _raw_cc()
+    if size is None:
+        size = blob_size(name, cc)
+    if size <= chunk_size or max_concurrency <= 1:
+        yield from cc.download_blob(name).chunks()
+        return
+    offsets = iter(range(0, size, chunk_size))
+    pool, inflight = _io_pool(), deque()
+
+    def _submit():
+        off = next(offsets, None)
+        if off is not None:
+            inflight.append(pool.submit(read_range, name, off, min(chunk_size, size - off), cc))
+
+    for _ in range(max_concurrency):
+        _submit()
+    while inflight:
+        data = inflight.popleft().result()
+        _submit()
+        yield data
+
+
+class BlobFile(io.RawIOBase):
+    """Seekable read-only view of a blob backed by cached range reads."""
+
+    def __init__(self, name: str, size: int | None = None, cc=None,
+                 block: int = BLOCK_BYTES, max_blocks: int = 32):
+        self.name = name
+        self._cc = cc or _raw_cc()
+        self.size = blob_size(name, self._cc) if size is None else size
+        self._block, self._max_blocks = block, max_blocks
+        self._blocks: "OrderedDict[int, bytes]" = OrderedDict()
+        self._pos = 0
+        self.bytes_fetched = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self.size}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def _get_block(self, i: int) -> bytes:
+        data = self._blocks.get(i)
+        if data is None:
+            start = i * self._block
+            data = read_range(self.name, start, min(self._block, self.size - start), self._cc)
+            self.bytes_fetched += len(data)
+            self._blocks[i] = data
+            if len(self._blocks) > self._max_blocks:
+                self._blocks.popitem(last=False)
+        else:
+            self._blocks.move_to_end(i)
+        return data
+
+    def readinto(self, buf) -> int:
+        n = max(0, min(len(buf), self.size - self._pos))
+        done = 0
+        while done < n:
+            i, off = divmod(self._pos, self._block)
+            data = self._get_block(i)
+            take = min(n - done, len(data) - off)
+            if take <= 0:
+                break
+            buf[done:done + take] = data[off:off + take]
+            done += take
+            self._pos += take
+        return done
+
+
+# ---------- previews ----------
+
+def first_page_text(name: str, max_chars: int = 2000, size: int | None = None, cc=None) -> str:
+    """Text of a document's first page, read through BlobFile ('' if it can't be parsed)."""
+    from extract import _docx_text
+    lower = name.lower()
+    try:
+        f = BlobFile(name, size=size, cc=cc)
+        if lower.endswith(".pdf"):
+            try:
+                from pypdf import PdfReader
+            except ImportError:
+                return ""
+            reader = PdfReader(f)
+            text = reader.pages[0].extract_text() if reader.pages else ""
+        elif lower.endswith(".docx"):
+            text = _docx_text(f)
+        else:
+            text = head(name, max_chars, cc).decode("utf-8", errors="replace")
+    except Exception:   # truncated/encrypted/odd files just get no preview
+        return ""
+    return (text or "").strip()[:max_chars]
+
+
+# ---------- serving ----------
+
+def download_callable(name: str, size: int | None = None, cc=None):
+    """Zero-arg loader for st.download_button(data=...): runs only when the user clicks."""
+    return lambda: read_all(name, size=size, cc=cc)
+
+
+_delegation: tuple | None = None   # (user delegation key, expiry) reused across links
+
+
+def _delegation_key(expiry: datetime):
+    global _delegation
+    if _delegation is None or _delegation[1] < expiry:
+        from compare import _bsc
+        now = datetime.now(timezone.utc)
+        key_expiry = now + timedelta(hours=1)
+        _delegation = (_bsc().get_user_delegation_key(now - timedelta(minutes=5), key_expiry), key_expiry)
+    return _delegation[0]
+
+
+def share_url(name: str, minutes: int = SAS_MINUTES, cc=None) -> str | None:
+    """Short-lived read-only SAS URL so the browser downloads straight from storage (None if unavailable)."""
+    from azure.storage.blob import BlobSasPermissions, generate_blob_sas
+    cc = cc or _raw_cc()
+    bc = cc.get_blob_client(name)
+    account = getattr(bc, "account_name", None)
+    if not account:
+        return None
+    expiry = datetime.now(timezone.utc) + timedelta(minutes=minutes)
+    try:
+        key = getattr(bc.credential, "account_key", None)
+        signing = {"account_key": key} if key else {"user_delegation_key": _delegation_key(expiry)}
+        sas = generate_blob_sas(account, cc.container_name, name, permission=BlobSasPermissions(read=True),
+                                expiry=expiry, **signing)
+    except Exception:
+        return None
+    return f"{bc.url}?{sas}"
@@ -0,0 +1,200 @@
+# encoding.py
+# Compact, integer encodings for Athena ratings and Genos bands.
+#
+#   measure names  → interned strings + uint16 ids from one process-wide vocabulary
+#                    (process-local: see portable/localize)
+#   Athena ratings → uint8 bitmasks, one bit per label, so "Unique + Excellent" is
+#                    UNIQUE|EXCELLENT and every comparison is an integer operation
+#   Genos bands    → uint8 ordinal codes (0 = unknown, 1 = Very Low … 5 = Very High)
+#
+# encode_athena/encode_genos turn a canonical frame (schema.py) into small NumPy
+# arrays that records.py keeps next to each frame; compact_frame stores the
+# repetitive text columns of those frames as pandas categoricals. The codes are
+# for speed, not size: a live record is ~26 KB, ~19 KB of it the two frames
+# (benchmarks/record_memory.py).
+import re
+import sys
+import threading
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Athena rating labels, lowest first; bit i ↔ rank i + 1
+RATINGS = ("poor", "satisfactory", "excellent", "unique")
+RATING_BIT = {label: 1 << i for i, label in enumerate(RATINGS)}
+RATING_RANK = {label: i + 1 for i, label in enumerate(RATINGS)}
+BIT_RANKS = tuple((1 << i, i + 1) for i in range(len(RATINGS)))
+
+# lookup tables indexed by a 4-bit mask
+MASK_RANK = np.array([max((r for b, r in BIT_RANKS if m & b), default=0) for m in range(16)], dtype=np.uint8)
+MASK_POP = np.array([bin(m).count("1") for m in range(16)], dtype=np.uint8)
+
+BANDS = ("Very Low", "Low", "Average", "High", "Very High")
+_BAND_CODE = {b.lower(): i + 1 for i, b in enumerate(BANDS)}
+_BAND_BINS = np.array([20, 40, 60, 80], dtype=np.float32)   # matches schema.GENOS_BINS
+
+_SPLIT_RE = re.compile(r"(?:[;,/|\n+&]|\band\b)+", re.I)
+
+_vocab: dict[str, int] = {}
+_names: list[str] = []
+_vocab_lock = threading.Lock()
+
+
+def _measure_key(name) -> str:
+    return re.sub(r"\s+", " ", str(name or "")).strip().lower()
+
+
+def measure_id(name) -> int:
+    """uint16 id for a measure/trait name (case- and whitespace-insensitive), stable within this process."""
+    key = sys.intern(_measure_key(name))
+    mid = _vocab.get(key)
+    if mid is None:
+        with _vocab_lock:
+            mid = _vocab.setdefault(key, len(_names))
+            if mid == len(_names):
+                _names.append(key)
+    return mid
+
+
+def find_measure(name) -> int | None:
+    """Id of a measure seen before, without adding `name` to the vocabulary."""
+    return _vocab.get(_measure_key(name))
+
+
+def measure_name(mid: int) -> str:
+    return _names[mid]
+
+
+# Ids are handed out in first-seen order, so they only mean something inside the
+# process that assigned them. Codes that leave the process (the shared "frame"
+# cache, cli.py worker results) carry measure names instead.
+
+def portable(codes: dict[str, np.ndarray] | None) -> dict | None:
+    """encode_athena/encode_genos codes with measure names in place of this process's ids."""
+    if codes is None or "measure" not in codes:
+        return codes
+    out = {k: v for k, v in codes.items() if k != "measure"}
+    out["measure_names"] = [_names[int(m)] for m in codes["measure"]]
+    return out
+
+
+def localize(codes: dict | None) -> dict[str, np.ndarray] | None:
+    """Inverse of portable(): measure names → ids from this process's vocabulary."""
+    if codes is None or "measure_names" not in codes:
+        return codes
+    out = {k: v for k, v in codes.items() if k != "measure_names"}
+    out["measure"] = np.array([measure_id(n) for n in codes["measure_names"]], dtype=np.uint16)
+    return out
+
+
+@lru_cache(maxsize=4096)
+def _rating_mask(text: str) -> int:
+    mask = 0
+    for tok in _SPLIT_RE.split(text.lower()):
+        mask |= RATING_BIT.get(tok.strip(), 0)
+    return mask
+
+
+def rating_mask(value) -> int:
+    """Bitmask of the rating labels in one Athena cell ('Unique + Excellent' → UNIQUE|EXCELLENT)."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return 0
+    return _rating_mask(str(value))
+
+
+def rating_rank(value) -> int:
+    """Highest rank mentioned in an Athena cell (0 when none)."""
+    return int(MASK_RANK[rating_mask(value)])
+
+
+def mask_labels(mask: int) -> list[str]:
+    return [label for label in RATINGS if mask & RATING_BIT[label]]
+
+
+@lru_cache(maxsize=256)
+def _band_code(text: str) -> int:
+    t = text.strip().lower()
+    if t in _BAND_CODE:
+        return _BAND_CODE[t]
+    # longest label first so "very high" isn't read as "high"
+    return next((_BAND_CODE[b] for b in sorted(_BAND_CODE, key=len, reverse=True) if b in t), 0)
+
+
+def band_code(value) -> int:
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return 0
+    return _band_code(str(value))
+
+
+def _col_codes(series: pd.Series, fn, dtype) -> np.ndarray:
+    # encode each distinct value once, then broadcast via the category codes
+    cat = series.astype("category")
+    table = np.array([fn(v) for v in cat.cat.categories], dtype=dtype)
+    codes = cat.cat.codes.to_numpy()
+    out = np.zeros(len(codes), dtype=dtype)
+    ok = codes >= 0
+    out[ok] = table[codes[ok]]
+    return out
+
+
+def encode_athena(df: pd.DataFrame | None) -> dict[str, np.ndarray] | None:
+    """{'measure': uint16, 'candidate': uint8 mask, 'top': uint8 mask} for a canonical Athena frame."""
+    if df is None or df.empty or "Trait" not in df.columns:
+        return None
+    n = len(df)
+    empty = np.zeros(n, dtype=np.uint8)
+    return {
+        "measure": np.array([measure_id(t) for t in df["Trait"]], dtype=np.uint16),
+        "candidate": _col_codes(df["Candidate Value"], rating_mask, np.uint8) if "Candidate Value" in df else empty,
+        "top": _col_codes(df["Top Performers"], rating_mask, np.uint8) if "Top Performers" in df else empty.copy(),
+    }
+
+
+def encode_genos(df: pd.DataFrame | None) -> dict[str, np.ndarray] | None:
+    """{'measure': uint16, 'band': uint8, 'score': float32} for a canonical Genos frame."""
+    if df is None or df.empty or "Measure" not in df.columns:
+        return None
+    score = (pd.to_numeric(df["Raw Score"], errors="coerce").to_numpy(dtype=np.float32)
+             if "Raw Score" in df else np.full(len(df), np.nan, dtype=np.float32))
+    if "Band" in df:
+        band = _col_codes(df["Band"], band_code, np.uint8)
+    else:
+        band = np.where(np.isnan(score), 0, np.searchsorted(_BAND_BINS, score, side="left") + 1).astype(np.uint8)
+    return {
+        "measure": np.array([measure_id(m) for m in df["Measure"]], dtype=np.uint16),
+        "band": band,
+        "score": score,
+    }
+
+
+def athena_fit(codes: dict[str, np.ndarray] | None) -> tuple[float, np.ndarray, np.ndarray]:
+    """Share of Top-Performer flags the candidate meets or beats.
+
+    A flag counts as fit when the candidate's highest rating rank is ≥ the flag's rank.
+    Returns (fit, per-row fits, per-row flag counts).
+    """
+    if codes is None:
+        return 0.0, np.zeros(0, dtype=np.uint8), np.zeros(0, dtype=np.uint8)
+    top, cand_max = codes["top"], MASK_RANK[codes["candidate"]]
+    fits = np.zeros(len(top), dtype=np.uint8)
+    for bit, rank in BIT_RANKS:
+        fits += ((top & bit) != 0) & (cand_max >= rank)
+    flags = MASK_POP[top]
+    den = int(flags.sum())
+    return (float(fits.sum()) / den if den else 0.0), fits, flags
+
+
+_COMPACT_COLS = ("Candidate Value", "Top Performers", "Band Range", "Band")
+
+
+def compact_frame(df: pd.DataFrame | None) -> pd.DataFrame | None:
+    """Store repetitive text columns as categoricals (display and to_html are unchanged)."""
+    if df is None or df.empty:
+        return df
+    out = df.copy()
+    for c in _COMPACT_COLS:
+        if c in out.columns and not isinstance(out[c].dtype, pd.CategoricalDtype):
+            if pd.api.types.is_string_dtype(out[c]) or out[c].dtype == object:
+                out[c] = out[c].astype("category")
+    return out
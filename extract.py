@@ -0,0 +1,194 @@
+# extract.py
+# Text extraction for résumés/reports uploaded to the raw container (PDF, DOCX).
+# Parsing is CPU-bound, so it runs in a ProcessPoolExecutor (spawn, never fork:
+# the callers are background threads of a multithreaded server); results are written
+# as sidecar blobs (raw/_extracted/<cand>/<file>.txt) tagged with the source
+# blob's ETag, so each file version is extracted exactly once. Downloads and parses
+# share one sliding window, so a large backlog never holds more than a window's
+# worth of file bytes in memory.
+#
+# The UI only ever reads sidecars (load_extracted_text). Extraction itself runs
+# from uploads.py in a background thread, or headless:  python extract.py [cand ...]
+import io
+import multiprocessing
+import os
+import re
+import sys
+import threading
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from xml.etree import ElementTree
+
+import storage
+from documents import read_all
+
+RAW_CONTAINER = os.getenv("RAW_CONTAINER", "raw")
+SIDECAR_PREFIX = "_extracted"
+EXTRACTABLE = (".pdf", ".docx")
+IO_WORKERS = 8
+
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def _raw_cc():
+    from compare import _bsc
+    return _bsc().get_container_client(RAW_CONTAINER)
+
+
+def sidecar_name(blob_name: str) -> str:
+    return f"{SIDECAR_PREFIX}/{blob_name}.txt"
+
+
+# ---------- pure extraction (runs in worker processes) ----------
+
+def _docx_text(data) -> str:
+    # bytes, or any seekable file (documents.BlobFile reads just the zip directory + document.xml)
+    with zipfile.ZipFile(io.BytesIO(data) if isinstance(data, bytes) else data) as zf:
+        root = ElementTree.fromstring(zf.read("word/document.xml"))
+    paras = []
+    for p in root.iter(f"{_W_NS}p"):
+        paras.append("".join(t.text or "" for t in p.iter(f"{_W_NS}t")))
+    return "\n".join(paras)
+
+
+def _pdf_text(data: bytes) -> str:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        return ""
+    reader = PdfReader(io.BytesIO(data))
+    return "\n\n".join((page.extract_text() or "") for page in reader.pages)
+
+
+def extract_text(blob_name: str, data: bytes) -> str:
+    """Return plain text for a PDF/DOCX payload ('' if unsupported or unreadable)."""
+    name = blob_name.lower()
+    try:
+        if name.endswith(".docx"):
+            text = _docx_text(data)
+        elif name.endswith(".pdf"):
+            text = _pdf_text(data)
+        else:
+            return ""
+    except Exception:
+        return ""
+    return re.sub(r"[ \t]+\n", "\n", text).strip()
+
+
+# ---------- orchestration ----------
+
+def _sidecar_etag(cc, blob_name: str) -> str | None:
+    try:
+        props = cc.get_blob_client(sidecar_name(blob_name)).get_blob_properties()
+        return (props.metadata or {}).get("source_etag")
+    except Exception:
+        return None
+
+
+def pending_documents(cands: list[str] | None = None) -> list[tuple[str, str, int]]:
+    """(blob_name, etag, size) for every PDF/DOCX whose sidecar is missing or stale."""
+    cc = _raw_cc()
+    prefixes = [c.rstrip("/") + "/" for c in cands] if cands else [""]
+    found = []
+    for prefix in prefixes:
+        for b in cc.list_blobs(name_starts_with=prefix):
+            if b.name.startswith(SIDECAR_PREFIX + "/") or not b.name.lower().endswith(EXTRACTABLE):
+                continue
+            found.append((b.name, b.etag, b.size))
+    with ThreadPoolExecutor(max_workers=IO_WORKERS) as ex:
+        stale = list(ex.map(lambda nb: _sidecar_etag(cc, nb[0]) != nb[1], found))
+    return [nb for nb, s in zip(found, stale) if s]
+
+
+
+def _cpu_pool(max_workers: int | None):
+    """Executor for the parsing step: one thread for max_workers <= 1, else spawned processes.
+
+    Forking a process whose other threads hold locks (Azure SDK, logging, the
+    Streamlit runtime) can deadlock the child, so the start method is spawn.
+    """
+    if max_workers is not None and max_workers <= 1:
+        return ThreadPoolExecutor(max_workers=1)
+    return ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(),
+                               mp_context=multiprocessing.get_context("spawn"))
+
+
+def run_extraction(cands: list[str] | None = None, *, max_workers: int | None = None) -> dict:
+    """Extract every pending document once. Returns {'extracted', 'skipped', 'failed', 'seconds'}."""
+    t0 = time.perf_counter()
+    cc = _raw_cc()
+    todo = pending_documents(cands)
+    stats = {"extracted": 0, "skipped": 0, "failed": 0, "seconds": 0.0}
+    if not todo:
+        stats["seconds"] = time.perf_counter() - t0
+        return stats
+
+    def _download(nb):
+        name, etag, size = nb
+        return name, etag, read_all(name, size=size, cc=cc)   # parallel ranges for big files
+
+    # documents downloaded or parsing at once; each holds its file bytes until parsed
+    window = 2 * max(IO_WORKERS, max_workers or os.cpu_count() or 1)
+    it = iter(todo)
+    downloads, parses = {}, {}
+    with ThreadPoolExecutor(max_workers=IO_WORKERS) as io_pool, \
+            _cpu_pool(max_workers) as cpu_pool:
+        while True:
+            while len(downloads) + len(parses) < window:
+                nb = next(it, None)
+                if nb is None:
+                    break
+                downloads[io_pool.submit(_download, nb)] = nb
+            if not downloads and not parses:
+                break
+            done, _ = wait([*downloads, *parses], return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut in downloads:
+                    downloads.pop(fut)
+                    try:
+                        name, etag, data = fut.result()
+                    except Exception:
+                        stats["failed"] += 1
+                        continue
+                    parses[cpu_pool.submit(extract_text, name, data)] = (name, etag)
+                    del data   # the parse owns the bytes now; the finished download is dropped below
+                    continue
+                name, etag = parses.pop(fut)
+                try:
+                    text = fut.result()
+                    storage.upload(cc, sidecar_name(name), text, content_type="text/plain",
+                                   metadata={"source_etag": etag})
+                except Exception:
+                    stats["failed"] += 1
+                    continue
+                stats["extracted" if text else "skipped"] += 1
+            del done, fut
+    stats["seconds"] = time.perf_counter() - t0
+    return stats
+
+
+def start_background_extraction(cands: list[str] | None = None) -> threading.Thread:
+    """Kick off run_extraction off the request thread (used right after uploads)."""
+    t = threading.Thread(target=run_extraction, args=(cands,), daemon=True, name="extract")
+    t.start()
+    return t
+
+
+def load_extracted_text(cand: str) -> dict[str, str]:
+    """{file name: extracted text} for one candidate, read from sidecars only."""
+    cc = _raw_cc()
+    prefix = f"{SIDECAR_PREFIX}/{cand.rstrip('/')}/"
+    out = {}
+    try:
+        for b in cc.list_blobs(name_starts_with=prefix):
+            text = storage.download(cc, b.name).decode("utf-8", errors="replace")
+            if text.strip():
+                out[b.name[len(prefix):-len(".txt")]] = text
+    except Exception:
+        pass
+    return out
+
+
+if __name__ == "__main__":
+    print(run_extraction(sys.argv[1:] or None))
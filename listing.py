@@ -0,0 +1,289 @@
+# listing.py
+# Incremental listing of the dashboard container.
+#
+# The bank used to walk the whole container for candidate folders every 5 s and
+# then page through each folder for its CSVs, so listing cost grew with the bank.
+# A Listing keeps the previous state (candidate → {blob name: (etag, size)}) and
+# catches up from a change log instead:
+#
+#   - everything that writes to or deletes from the dashboard calls record_change(),
+#     which drops an empty marker blob under _changes/YYYY/MM/DD/HH/ whose metadata
+#     carries {op, path, etag, size};
+#   - refresh() lists only the log partitions written since its cursor (one small
+#     listing per hour touched), so its cost tracks the change rate, not the bank;
+#   - a full resync (first use, then every LISTING_FULL_RESYNC seconds) lists the
+#     name shards (first character) in parallel and merges each shard as it lands.
+#     A shard still running at the time budget keeps its continuation token and
+#     resumes on the next refresh, so no rerun waits on a large bank. One extra
+#     catch-all pass walks the top level for folders no shard covers ("Élodie",
+#     "(old) Bob") and lists those whole.
+#
+# refresh() holds its lock for the whole catch-up; the view has its own short lock
+# so readers on other threads never wait on a scan or see a dict mid-update.
+#
+# Names starting with "_" (the change log, internal state) are never candidates.
+import os
+import string
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import quote, unquote
+
+CHANGE_PREFIX = "_changes"
+FULL_RESYNC_S = float(os.getenv("LISTING_FULL_RESYNC", "600"))
+SCAN_BUDGET_S = float(os.getenv("LISTING_SCAN_BUDGET", "2.0"))
+OVERLAP_S = 120          # re-read this much of the log behind the cursor (writer clock skew)
+PAGE_SIZE = 1000
+SHARDS = tuple(string.ascii_uppercase + string.digits + string.ascii_lowercase)
+OTHER = ""               # the catch-all pass: top-level folders whose first character no shard covers
+
+
+def _partition(ts: float) -> str:
+    return time.strftime("%Y/%m/%d/%H", time.gmtime(ts))
+
+
+def _marker_ns(name: str) -> int:
+    try:
+        return int(name.rsplit("/", 1)[-1].split("-", 1)[0])
+    except ValueError:
+        return 0
+
+
+def record_change(cc, op: str, path: str, etag: str | None = None, size: int | None = None):
+    """Log a put/delete of `path` in `cc`'s container. Best effort: a full resync catches anything missed."""
+    ns = time.time_ns()
+    meta = {"op": op, "path": quote(path)}
+    if etag:
+        meta["etag"] = str(etag).strip('"')
+    if size is not None:
+        meta["size"] = str(size)
+    try:
+        cc.upload_blob(f"{CHANGE_PREFIX}/{_partition(ns / 1e9)}/{ns:020d}-{uuid.uuid4().hex[:8]}",
+                       b"", overwrite=True, metadata=meta)
+    except Exception:
+        pass
+
+
+def prune_changes(cc, older_than_days: float = 7.0, dry_run: bool = False) -> int:
+    """Delete change markers older than `older_than_days`. Returns how many were (or would be) removed."""
+    cutoff = time.time_ns() - int(older_than_days * 86400 * 1e9)
+    removed = 0
+    for b in cc.list_blobs(name_starts_with=CHANGE_PREFIX + "/"):
+        if _marker_ns(b.name) < cutoff:
+            if dry_run:
+                removed += 1
+                continue
+            try:
+                cc.delete_blob(b.name)
+                removed += 1
+            except Exception:
+                pass
+    return removed
+
+
+class Listing:
+    """Candidate folders and their blobs for one container, kept current from the change log."""
+
+    def __init__(self, cc_fn, shards: tuple[str, ...] = SHARDS, max_workers: int = 8):
+        self._cc_fn = cc_fn
+        self._shards = shards
+        self._max_workers = max_workers
+        self._blobs: dict[str, dict[str, tuple[str | None, int | None]]] = {}
+        self._lock = threading.Lock()        # one refresh at a time
+        self._view = threading.Lock()        # short: every read and write of _blobs
+        self._since_ns = 0                   # change-log cursor
+        self._seen: dict[str, int] = {}      # markers applied inside the overlap window
+        self._scan: dict[str, str | None] | None = None   # shard → continuation token of a running resync
+        self._scan_seen: dict[str, set[str]] = {}         # shard → names listed so far in this resync
+        self._touched: set[str] = set()                   # paths changed by the log during the resync
+        self._last_full = 0.0
+        self.generation = 0                  # bumped on every change to the view
+        self.stats = {"full_scans": 0, "delta_refreshes": 0, "changes_applied": 0, "list_calls": 0, "pages": 0}
+
+    # ---- views ----
+    @property
+    def complete(self) -> bool:
+        return self._last_full > 0 and self._scan is None
+
+    def candidates(self) -> list[str]:
+        with self._view:
+            return sorted(c for c, files in self._blobs.items() if files)
+
+    def files(self, cand: str) -> list[str] | None:
+        """Blob names under `cand` (None while the first resync hasn't reached it)."""
+        with self._view:
+            files = self._blobs.get(cand.rstrip("/"))
+            if files is not None:
+                return sorted(files)
+        return [] if self.complete else None
+
+    def blobs(self, cand: str) -> dict[str, tuple[str | None, int | None]] | None:
+        """{blob name: (etag, size)} under `cand` (None while the first resync hasn't reached it)."""
+        with self._view:
+            files = self._blobs.get(cand.rstrip("/"))
+            if files is not None:
+                return dict(files)
+        return {} if self.complete else None
+
+    def csvs(self, cand: str) -> list[str] | None:
+        files = self.files(cand)
+        return None if files is None else [f for f in files if f.lower().endswith(".csv")]
+
+    # ---- updates ----
+    def _put(self, path: str, etag, size):
+        cand, sep, _ = path.partition("/")
+        if sep and not cand.startswith("_"):
+            etag = etag.strip('"') if etag else etag   # the log stores ETags unquoted
+            with self._view:
+                files = self._blobs.setdefault(cand, {})
+                if files.get(path) != (etag, size):
+                    files[path] = (etag, size)
+                    self.generation += 1
+
+    def _delete(self, path: str):
+        cand = path.partition("/")[0]
+        with self._view:
+            files = self._blobs.get(cand)
+            if files is not None and path in files:
+                del files[path]
+                self.generation += 1
+                if not files:
+                    del self._blobs[cand]
+
+    def refresh(self, full: bool = False) -> dict:
+        """Catch up with the container. Returns what this call did; never blocks on another refresh."""
+        if not self._lock.acquire(blocking=False):
+            return {"skipped": True}
+        try:
+            cc = self._cc_fn()
+            now = time.time()
+            if full or (self._scan is None and now - self._last_full > FULL_RESYNC_S):
+                self._start_scan(now)
+            out = {"changes": self._apply_changes(cc)}
+            if self._scan is not None:
+                out["scan"] = self._continue_scan(cc)
+            return out
+        finally:
+            self._lock.release()
+
+    def _apply_changes(self, cc) -> int:
+        if not self._since_ns:
+            return 0
+        self.stats["delta_refreshes"] += 1
+        lo = self._since_ns - int(OVERLAP_S * 1e9)
+        now = time.time()
+        parts, t = [], lo / 1e9
+        while True:
+            parts.append(_partition(t))
+            if t >= now:
+                break
+            t = min(now, t + 3600)
+        applied, newest = 0, self._since_ns
+        for part in dict.fromkeys(parts):
+            self.stats["list_calls"] += 1
+            for b in cc.list_blobs(name_starts_with=f"{CHANGE_PREFIX}/{part}/", include=["metadata"]):
+                ns = _marker_ns(b.name)
+                if ns < lo or b.name in self._seen:
+                    continue
+                meta = b.metadata or {}
+                path = unquote(meta.get("path", ""))
+                if not path:
+                    continue
+                if meta.get("op") == "delete":
+                    self._delete(path)
+                else:
+                    size = meta.get("size")
+                    self._put(path, meta.get("etag"), int(size) if size and size.isdigit() else None)
+                if self._scan is not None:
+                    self._touched.add(path)
+                self._seen[b.name] = ns
+                newest = max(newest, ns)
+                applied += 1
+        self._since_ns = max(newest, int(now * 1e9))   # read up to now; the overlap re-checks the tail
+        cutoff = self._since_ns - int(OVERLAP_S * 1e9)
+        self._seen = {k: v for k, v in self._seen.items() if v >= cutoff}
+        self.stats["changes_applied"] += applied
+        return applied
+
+    # ---- full resync ----
+    def _start_scan(self, now: float):
+        self._scan = {s: None for s in self._shards + (OTHER,)}
+        self._scan_seen = {s: set() for s in self._scan}
+        self._touched = set()
+        # the resync covers everything before it; the log only has to be read from here on
+        self._since_ns = int(now * 1e9)
+        self.stats["full_scans"] += 1
+
+    def _list_shard(self, cc, shard: str, token: str | None, deadline: float):
+        """List one shard until done or past `deadline`. Returns (items, next token, done)."""
+        if shard == OTHER:
+            return self._list_other(cc), None, True
+        items = []
+        pages = cc.list_blobs(name_starts_with=shard, results_per_page=PAGE_SIZE).by_page(continuation_token=token)
+        for page in pages:
+            items.extend((b.name, b.etag, b.size) for b in page)
+            self.stats["pages"] += 1
+            if pages.continuation_token and time.time() > deadline:
+                return items, pages.continuation_token, False
+        return items, None, True
+
+    def _list_other(self, cc) -> list:
+        """Blobs in top-level folders that no shard prefix covers. Rare, so listed whole in one go."""
+        items = []
+        for top in cc.walk_blobs(delimiter="/"):
+            if not top.name.endswith("/") or top.name.startswith(self._shards) or top.name.startswith("_"):
+                continue
+            self.stats["list_calls"] += 1
+            items.extend((b.name, b.etag, b.size) for b in cc.list_blobs(name_starts_with=top.name))
+        return items
+
+    def _covers(self, shard: str, cand: str) -> bool:
+        return not cand.startswith(self._shards) if shard == OTHER else cand.startswith(shard)
+
+    def _continue_scan(self, cc) -> dict:
+        deadline = time.time() + SCAN_BUDGET_S
+        todo = dict(self._scan)
+        done = 0
+        with ThreadPoolExecutor(max_workers=self._max_workers) as ex:
+            futs = {ex.submit(self._list_shard, cc, s, tok, deadline): s for s, tok in todo.items()}
+            self.stats["list_calls"] += len(futs)
+            for fut in as_completed(futs):
+                shard = futs[fut]
+                try:
+                    items, token, finished = fut.result()
+                except Exception:
+                    continue   # retried on the next refresh
+                seen = self._scan_seen[shard]
+                for name, etag, size in items:   # stream what we have so far into the view
+                    self._put(name, etag, size)
+                    seen.add(name)
+                if not finished:
+                    self._scan[shard] = token
+                    continue
+                # shard complete: anything we still hold under it that wasn't listed is gone
+                with self._view:
+                    gone = [p for c, files in self._blobs.items() if self._covers(shard, c)
+                            for p in files if p not in seen and p not in self._touched]
+                for path in gone:
+                    self._delete(path)
+                del self._scan[shard]
+                done += 1
+        if not self._scan:
+            self._scan, self._scan_seen, self._touched = None, {}, set()
+            self._last_full = time.time()
+        return {"shards_done": done, "shards_left": len(self._scan or ())}
+
+
+_listings: dict[str, Listing] = {}
+_listings_lock = threading.Lock()
+
+
+def get_listing(container: str | None = None) -> Listing:
+    """Process-wide Listing for a container (the dashboard by default)."""
+    from compare import _bsc
+    container = container or os.getenv("CONTAINER", "dashboard")
+    with _listings_lock:
+        if container not in _listings:
+            _listings[container] = Listing(lambda: _bsc().get_container_client(container))
+        return _listings[container]
@@ -0,0 +1,185 @@
+# pairwise.py
+# One-to-one comparison briefs for a cohort, each pair drafted once.
+#
+# A-vs-B and B-vs-A are the same brief, so a pair is stored once under its sorted
+# slugs in the dashboard container (_pairs/<a>--<b>.json; listing.py skips "_"
+# folders) along with a digest of both summaries and the agent instructions. The
+# Compare panel, the cohort matrix and `python -m cli compare-matrix` all read
+# from there, and a group view can be put together from stored pairs without a new
+# call. A pair is drafted again only when one of its summaries or the
+# instructions change.
+#
+# Missing pairs are drafted in a thread pool under Quota: a cap on calls in flight
+# plus a requests-per-minute window, shared by every session in the process.
+# Pairs are compared on summaries only (no document excerpts) so they stay reusable.
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import combinations
+
+import storage
+from cache_backend import cached_obj, get_cache
+from records import CONTAINER, display_name, get_cc, slug
+
+PAIR_PREFIX = "_pairs"
+PAIR_TTL = 300
+
+
+class Quota:
+    """At most `concurrency` calls in flight and `rpm` call starts per rolling minute."""
+
+    def __init__(self, concurrency: int = 4, rpm: int = 60):
+        self.concurrency = max(1, concurrency)
+        self.rpm = max(1, rpm)
+        self._sem = threading.BoundedSemaphore(self.concurrency)
+        self._starts = deque()
+        self._lock = threading.Lock()
+
+    def _wait_for_window(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._starts and now - self._starts[0] >= 60:
+                    self._starts.popleft()
+                if len(self._starts) < self.rpm:
+                    self._starts.append(now)
+                    return
+                delay = 60 - (now - self._starts[0])
+            time.sleep(min(delay, 1.0))
+
+    @contextmanager
+    def slot(self):
+        with self._sem:
+            self._wait_for_window()
+            yield
+
+
+QUOTA = Quota(int(os.getenv("LLM_MAX_CONCURRENT", "4")), int(os.getenv("LLM_RPM", "60")))
+
+
+def pair_key(a: str, b: str) -> tuple[str, str]:
+    return (a, b) if slug(a) <= slug(b) else (b, a)
+
+
+def _path(a: str, b: str) -> str:
+    a, b = pair_key(a, b)
+    return f"{PAIR_PREFIX}/{slug(a)}--{slug(b)}.json"
+
+
+def _digest(a_summary: str, b_summary: str) -> str:
+    from agent_comparer import INSTRUCTIONS
+    h = hashlib.blake2b(digest_size=16)
+    for part in (INSTRUCTIONS, a_summary, b_summary):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _read(path: str) -> dict | None:
+    def _load():
+        try:
+            return json.loads(storage.download(get_cc(), path))
+        except Exception:
+            return None
+    return cached_obj("llm", f"{CONTAINER}/{path}", _load, PAIR_TTL)
+
+
+def load_pair(a: str, b: str, summaries: dict[str, str], final: bool = False) -> dict | None:
+    """Stored brief for {a, b} if it matches both current summaries (and is strong-route when final)."""
+    a, b = pair_key(a, b)
+    rec = _read(_path(a, b))
+    if not rec or rec.get("digest") != _digest(summaries.get(a, ""), summaries.get(b, "")):
+        return None
+    if final and rec.get("route") != "strong":
+        return None
+    return rec
+
+
+def save_pair(rec: dict):
+    path = _path(rec["a"], rec["b"])
+    storage.upload(get_cc(), path, json.dumps(rec), content_type="application/json")
+    get_cache().set_obj("llm", f"{CONTAINER}/{path}", rec, PAIR_TTL)
+
+
+def _draft(a: str, b: str, summaries: dict[str, str], final: bool, fresh: bool, quota: Quota) -> dict:
+    from agent_comparer import compare_summaries_detailed
+    with quota.slot():
+        call = compare_summaries_detailed(
+            summaries.get(a, ""),
+            {display_name(b): summaries.get(b, "")},
+            cand_name=display_name(a),
+            final=final,
+            use_cache=not fresh,
+        )
+    rec = {"a": a, "b": b, "text": call["text"], "route": call["route"], "model": call["model"],
+           "digest": _digest(summaries.get(a, ""), summaries.get(b, "")), "created": time.time()}
+    if not call["error"]:
+        save_pair(rec)
+    return {**rec, "call": call}
+
+
+def compute_pairs(pairs, summaries: dict[str, str], *, final: bool = False, fresh: bool = False,
+                  quota: Quota = QUOTA, progress=None) -> dict:
+    """Briefs for each pair, reusing stored ones and drafting the rest concurrently.
+
+    `pairs` may name a pair in either order or more than once; `summaries` maps
+    each candidate to its summary text. Returns {"pairs": {(a, b): record},
+    "reused", "drafted", "failed": {"a--b": error}, "calls": [call records]} with
+    keys in pair_key() order. progress(done, total) is called as pairs finish.
+    """
+    todo = sorted({pair_key(a, b) for a, b in pairs if a != b})
+    out = {"pairs": {}, "reused": 0, "drafted": 0, "failed": {}, "calls": []}
+    missing = []
+    for a, b in todo:
+        rec = None if fresh else load_pair(a, b, summaries, final)
+        if rec is None:
+            missing.append((a, b))
+        else:
+            out["pairs"][(a, b)] = rec
+            out["reused"] += 1
+    done = out["reused"]
+    if progress:
+        progress(done, len(todo))
+    if missing:
+        with ThreadPoolExecutor(max_workers=quota.concurrency) as ex:
+            futs = {ex.submit(_draft, a, b, summaries, final, fresh, quota): (a, b) for a, b in missing}
+            for fut, (a, b) in futs.items():
+                try:
+                    rec = fut.result()
+                except Exception as e:
+                    out["failed"][f"{a}--{b}"] = str(e)
+                else:
+                    out["calls"].append(rec.pop("call"))
+                    if out["calls"][-1]["error"]:
+                        out["failed"][f"{a}--{b}"] = out["calls"][-1]["error"]
+                    else:
+                        out["pairs"][(a, b)] = rec
+                        out["drafted"] += 1
+                done += 1
+                if progress:
+                    progress(done, len(todo))
+    return out
+
+
+def matrix(cands: list[str], summaries: dict[str, str], **kw) -> dict:
+    """compute_pairs over every pair in the cohort (N·(N-1)/2 briefs)."""
+    return compute_pairs(combinations(cands, 2), summaries, **kw)
+
+
+def group_pairs(cand: str, others: list[str]) -> list[tuple[str, str]]:
+    return [(cand, o) for o in others if o != cand]
+
+
+def assemble_group(cand: str, others: list[str], pairs: dict) -> str:
+    """A group view for `cand` made of its stored pairwise briefs, one section per other candidate."""
+    parts = []
+    for o in others:
+        rec = pairs.get(pair_key(cand, o))
+        body = rec["text"] if rec else "_No brief for this pair yet._"
+        parts.append(f"#### {display_name(cand)} vs {display_name(o)}\n\n{body}")
+    return "\n\n".join(parts)
@@ -0,0 +1,250 @@
+# previews.py
+# First-page thumbnails and paged text previews for documents in the raw container.
+#
+# Rendering is CPU-bound, so like extract.py it runs in a ProcessPoolExecutor and
+# writes sidecars next to the source blob, tagged with the blob's ETag so each file
+# version is rendered exactly once:
+#   raw/_previews/<cand>/<file>.json   {"source_etag", "page_count", "pages": [text, ...]}
+#   raw/_previews/<cand>/<file>.png    first-page thumbnail
+#
+# Thumbnails come from PyMuPDF or pypdfium2 when either is installed; otherwise
+# (and for DOCX) Pillow draws the first page's text as a card. The UI only reads
+# sidecars (load_preview); rendering runs from uploads.py / processor.py, or from
+# the Solo view in a background thread when it finds a document without one.
+#   python previews.py [cand ...]
+import io
+import json
+import multiprocessing
+import os
+import sys
+import textwrap
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from azure.storage.blob import ContentSettings
+
+import storage
+from documents import DOC_EXTS, read_all
+
+RAW_CONTAINER = os.getenv("RAW_CONTAINER", "raw")
+PREVIEW_PREFIX = "_previews"
+MAX_PAGES = 5          # text pages kept per document
+PAGE_CHARS = 1800      # DOCX has no pages; split its text into chunks of about this size
+THUMB_SIZE = (240, 320)
+
+_inflight: set[str] = set()
+_inflight_lock = threading.Lock()
+
+
+def _raw_cc():
+    from compare import _bsc
+    return _bsc().get_container_client(RAW_CONTAINER)
+
+
+def sidecar_names(blob_name: str) -> tuple[str, str]:
+    return f"{PREVIEW_PREFIX}/{blob_name}.json", f"{PREVIEW_PREFIX}/{blob_name}.png"
+
+
+# ---------- pure rendering (runs in worker processes) ----------
+
+def _pdf_pages(data: bytes) -> tuple[list[str], int]:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        try:
+            import fitz
+        except ImportError:
+            return [], 0
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            return [doc[i].get_text() for i in range(min(MAX_PAGES, doc.page_count))], doc.page_count
+    reader = PdfReader(io.BytesIO(data))
+    return [(p.extract_text() or "") for p in reader.pages[:MAX_PAGES]], len(reader.pages)
+
+
+def _docx_pages(data: bytes) -> tuple[list[str], int]:
+    from extract import _docx_text
+    pages, cur = [], ""
+    for para in _docx_text(data).split("\n"):
+        if cur and len(cur) + len(para) > PAGE_CHARS:
+            pages.append(cur)
+            cur = ""
+        cur += para + "\n"
+    if cur.strip():
+        pages.append(cur)
+    return pages[:MAX_PAGES], len(pages)
+
+
+def _png(img) -> bytes:
+    img.thumbnail(THUMB_SIZE)
+    buf = io.BytesIO()
+    img.save(buf, "PNG", optimize=True)
+    return buf.getvalue()
+
+
+def _pdf_thumbnail(data: bytes) -> bytes | None:
+    try:
+        import fitz
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            pix = doc[0].get_pixmap(matrix=fitz.Matrix(0.5, 0.5))
+            from PIL import Image
+            return _png(Image.open(io.BytesIO(pix.tobytes("png"))))
+    except ImportError:
+        pass
+    try:
+        import pypdfium2 as pdfium
+        page = pdfium.PdfDocument(data)[0]
+        return _png(page.render(scale=0.5).to_pil())
+    except ImportError:
+        return None
+
+
+def _text_card(text: str) -> bytes | None:
+    try:
+        from PIL import Image, ImageDraw, ImageFont
+    except ImportError:
+        return None
+    w, h = THUMB_SIZE
+    img = Image.new("RGB", (w, h), "white")
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default()
+    draw.rectangle([0, 0, w - 1, h - 1], outline=(200, 200, 200))
+    y = 10
+    for line in textwrap.wrap(" ".join(text.split()), 38)[: (h - 20) // 12]:
+        draw.text((10, y), line, fill=(50, 50, 50), font=font)
+        y += 12
+    return _png(img)
+
+
+def render_preview(blob_name: str, data: bytes) -> tuple[dict, bytes | None]:
+    """({'page_count', 'pages'}, thumbnail PNG or None) for a PDF/DOCX payload."""
+    name = blob_name.lower()
+    pages, count, thumb = [], 0, None
+    try:
+        if name.endswith(".pdf"):
+            pages, count = _pdf_pages(data)
+            thumb = _pdf_thumbnail(data)
+        elif name.endswith(".docx"):
+            pages, count = _docx_pages(data)
+    except Exception:
+        pass
+    pages = [p.strip() for p in pages]
+    if thumb is None and pages:
+        thumb = _text_card(pages[0])
+    return {"page_count": count, "pages": pages}, thumb
+
+
+# ---------- orchestration ----------
+
+def _sidecar_etag(cc, blob_name: str) -> str | None:
+    try:
+        props = cc.get_blob_client(sidecar_names(blob_name)[0]).get_blob_properties()
+        return (props.metadata or {}).get("source_etag")
+    except Exception:
+        return None
+
+
+def pending_previews(cands: list[str] | None = None) -> list[tuple[str, str, int]]:
+    """(blob_name, etag, size) for every PDF/DOCX whose preview is missing or stale."""
+    cc = _raw_cc()
+    prefixes = [c.rstrip("/") + "/" for c in cands] if cands else [""]
+    found = []
+    for prefix in prefixes:
+        for b in cc.list_blobs(name_starts_with=prefix):
+            if b.name.startswith("_") or not b.name.lower().endswith(DOC_EXTS):
+                continue
+            found.append((b.name, b.etag, b.size))
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        stale = list(ex.map(lambda d: _sidecar_etag(cc, d[0]) != d[1], found))
+    return [d for d, s in zip(found, stale) if s]
+
+
+
+def _cpu_pool(max_workers: int | None):
+    """Inline (one thread) for max_workers <= 1, else spawned processes; see extract._cpu_pool."""
+    if max_workers is not None and max_workers <= 1:
+        return ThreadPoolExecutor(max_workers=1)
+    return ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(),
+                               mp_context=multiprocessing.get_context("spawn"))
+
+
+def run_previews(cands: list[str] | None = None, *, todo: list[tuple[str, str, int]] | None = None,
+                 max_workers: int | None = None) -> dict:
+    """Render every pending preview once. Returns {'rendered', 'thumbnails', 'failed', 'seconds'}."""
+    t0 = time.perf_counter()
+    cc = _raw_cc()
+    todo = pending_previews(cands) if todo is None else todo
+    stats = {"rendered": 0, "thumbnails": 0, "failed": 0, "seconds": 0.0}
+    if todo:
+        with ThreadPoolExecutor(max_workers=8) as io_pool, \
+                _cpu_pool(max_workers) as cpu_pool:
+            jobs = []
+            for (name, etag, _), fut in [(d, io_pool.submit(read_all, d[0], size=d[2], cc=cc)) for d in todo]:
+                try:
+                    jobs.append((name, etag, cpu_pool.submit(render_preview, name, fut.result())))
+                except Exception:
+                    stats["failed"] += 1
+            for name, etag, fut in jobs:
+                try:
+                    meta, thumb = fut.result()
+                    json_name, png_name = sidecar_names(name)
+                    if thumb:
+                        cc.upload_blob(png_name, thumb, overwrite=True, metadata={"source_etag": etag},
+                                       content_settings=ContentSettings(content_type="image/png"))
+                    # the JSON goes last: its source_etag marks the preview as complete
+                    storage.upload(cc, json_name, json.dumps({"source_etag": etag, "thumbnail": bool(thumb), **meta}),
+                                   content_type="application/json", metadata={"source_etag": etag})
+                except Exception:
+                    stats["failed"] += 1
+                    continue
+                stats["rendered"] += 1
+                stats["thumbnails"] += bool(thumb)
+    stats["seconds"] = round(time.perf_counter() - t0, 3)
+    return stats
+
+
+def start_background_previews(cands: list[str] | None = None, *,
+                              todo: list[tuple[str, str, int]] | None = None,
+                              max_workers: int | None = 2) -> threading.Thread | None:
+    """Render off the request thread; documents already being rendered here are skipped."""
+    if todo is not None:
+        with _inflight_lock:
+            todo = [d for d in todo if f"{d[0]}@{d[1]}" not in _inflight]
+            _inflight.update(f"{d[0]}@{d[1]}" for d in todo)
+        if not todo:
+            return None
+
+    def _run():
+        try:
+            run_previews(cands, todo=todo, max_workers=max_workers)
+        finally:
+            if todo:
+                with _inflight_lock:
+                    _inflight.difference_update(f"{d[0]}@{d[1]}" for d in todo)
+
+    t = threading.Thread(target=_run, daemon=True, name="previews")
+    t.start()
+    return t
+
+
+def load_preview(blob_name: str, etag: str) -> dict | None:
+    """{'page_count', 'pages', 'thumbnail': PNG bytes | None} if the sidecar matches `etag`, else None."""
+    cc = _raw_cc()
+    json_name, png_name = sidecar_names(blob_name)
+    try:
+        meta = json.loads(storage.download(cc, json_name))
+    except Exception:
+        return None
+    if meta.get("source_etag") != etag:
+        return None
+    thumb = None
+    if meta.get("thumbnail"):
+        try:
+            thumb = cc.download_blob(png_name).readall()
+        except Exception:
+            pass
+    return {"page_count": meta.get("page_count", 0), "pages": meta.get("pages", []), "thumbnail": thumb}
+
+
+if __name__ == "__main__":
+    print(run_previews(sys.argv[1:] or None))
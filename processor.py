@@ -0,0 +1,187 @@
+# processor.py
+# Headless raw → dashboard promoter.
+#
+# uploads.py drops files into raw/<Candidate>/; candidates.py reads dashboard/<Candidate>/.
+# This worker watches raw/, fingerprints every candidate folder (blob names + ETags),
+# and only for folders that are new or changed since the last checkpoint:
+#   - rewrites the Athena/Genos CSVs in the canonical layout (schema.py),
+#   - extracts text from uploaded PDF/DOCX (extract.py) and renders previews (previews.py),
+#   - promotes the result into dashboard/<Candidate>/.
+# The checkpoint lives in raw/_state/processor.json and is written after every
+# candidate, so a restart resumes where it left off.
+#
+#   python processor.py --once            # single pass (cron)
+#   python processor.py --interval 60     # keep polling
+import argparse
+import hashlib
+import io
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+import pandas as pd
+
+import schema
+import storage
+from listing import record_change
+
+RAW_CONTAINER = os.getenv("RAW_CONTAINER", "raw")
+DASHBOARD = os.getenv("DASHBOARD_CONTAINER", "dashboard")
+CHECKPOINT_BLOB = "_state/processor.json"
+SKIP_PREFIXES = ("_state/", "_extracted/", "_previews/")
+
+log = logging.getLogger("processor")
+
+
+def _bsc():
+    from compare import _bsc as make
+    return make()
+
+
+def _raw_cc():
+    return _bsc().get_container_client(RAW_CONTAINER)
+
+
+def _dash_cc():
+    return _bsc().get_container_client(DASHBOARD)
+
+
+# ---------- checkpoint ----------
+
+def load_checkpoint() -> dict:
+    try:
+        return json.loads(storage.download(_raw_cc(), CHECKPOINT_BLOB))
+    except Exception:
+        return {"folders": {}}
+
+
+def save_checkpoint(state: dict):
+    storage.upload(_raw_cc(), CHECKPOINT_BLOB, json.dumps(state, indent=1), content_type="application/json")
+
+
+# ---------- change detection ----------
+
+def scan_raw() -> dict[str, dict]:
+    """{cand: {'fingerprint', 'last_modified' (epoch), 'blobs': [names]}} for every raw folder."""
+    folders: dict[str, dict] = {}
+    for b in _raw_cc().list_blobs():
+        if b.name.startswith(SKIP_PREFIXES) or "/" not in b.name:
+            continue
+        cand = b.name.split("/", 1)[0]
+        f = folders.setdefault(cand, {"parts": [], "last_modified": 0.0, "blobs": []})
+        f["parts"].append(f"{b.name}|{b.etag}")
+        f["blobs"].append(b.name)
+        if b.last_modified:
+            f["last_modified"] = max(f["last_modified"], b.last_modified.timestamp())
+    for f in folders.values():
+        f["fingerprint"] = hashlib.sha1("\n".join(sorted(f.pop("parts"))).encode("utf-8")).hexdigest()
+    return folders
+
+
+def changed_folders(folders: dict[str, dict], state: dict) -> list[str]:
+    done = state.get("folders", {})
+    return sorted(c for c, f in folders.items() if done.get(c, {}).get("fingerprint") != f["fingerprint"])
+
+
+# ---------- per-candidate work ----------
+
+def normalize_csv(name: str, data: bytes) -> bytes:
+    """Rewrite one Athena/Genos CSV in the canonical layout (schema.py)."""
+    df = pd.read_csv(io.BytesIO(data), encoding="utf-8-sig")
+    kind = schema.detect_kind(name)
+    if kind is not None:
+        df = schema.normalize(df, kind)
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def process_candidate(cand: str, blobs: list[str]) -> dict:
+    """Normalize + promote one candidate folder. Returns per-candidate metrics."""
+    raw, dash = _raw_cc(), _dash_cc()
+    out = {"cand": cand, "files": 0, "bytes_in": 0, "bytes_out": 0}
+    for name in blobs:
+        base = name.split("/", 1)[1]
+        lower = base.lower()
+        if lower.endswith(".csv"):
+            data = storage.download(raw, name)
+            body, ctype = normalize_csv(base, data), "text/csv"
+        elif lower == "summary.txt":
+            # Never overwrite a summary HR has already edited on the dashboard
+            if dash.get_blob_client(f"{cand}/summary.txt").exists():
+                continue
+            data = body = storage.download(raw, name)
+            ctype = "text/plain"
+        else:
+            continue
+        res = storage.upload(dash, f"{cand}/{base}", body, content_type=ctype)
+        record_change(dash, "put", f"{cand}/{base}", etag=res.get("etag"), size=res["size"])
+        out["files"] += 1
+        out["bytes_in"] += len(data)
+        out["bytes_out"] += res["size"]
+
+    if any(b.lower().endswith((".pdf", ".docx")) for b in blobs):
+        # max_workers=1 parses inline: this already runs on one of run_once's threads
+        from extract import run_extraction
+        out["extract"] = run_extraction([cand], max_workers=1)
+        from previews import run_previews
+        out["previews"] = run_previews([cand], max_workers=1)
+    return out
+
+
+# ---------- driver ----------
+
+def run_once(workers: int = 4) -> dict:
+    """One pass over raw/. Returns throughput and lag metrics for the pass."""
+    t0 = time.perf_counter()
+    state = load_checkpoint()
+    folders = scan_raw()
+    todo = changed_folders(folders, state)
+    metrics = {"scanned": len(folders), "changed": len(todo), "processed": 0, "failed": [],
+               "bytes_in": 0, "lag_seconds_max": 0.0, "lag_seconds_avg": 0.0}
+    lags = []
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        futs = {ex.submit(process_candidate, c, folders[c]["blobs"]): c for c in todo}
+        for fut in as_completed(futs):
+            cand = futs[fut]
+            try:
+                res = fut.result()
+            except Exception as e:
+                log.warning("processing %s failed: %s", cand, e)
+                metrics["failed"].append(cand)
+                continue
+            now = time.time()
+            lags.append(now - folders[cand]["last_modified"])
+            state.setdefault("folders", {})[cand] = {
+                "fingerprint": folders[cand]["fingerprint"],
+                "processed_at": datetime.now(timezone.utc).isoformat(),
+            }
+            save_checkpoint(state)
+            metrics["processed"] += 1
+            metrics["bytes_in"] += res["bytes_in"]
+    elapsed = time.perf_counter() - t0
+    metrics["seconds"] = round(elapsed, 3)
+    metrics["candidates_per_sec"] = round(metrics["processed"] / elapsed, 3) if elapsed else 0.0
+    if lags:
+        metrics["lag_seconds_max"] = round(max(lags), 1)
+        metrics["lag_seconds_avg"] = round(sum(lags) / len(lags), 1)
+    return metrics
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Promote new/changed raw candidate folders into the dashboard.")
+    p.add_argument("--once", action="store_true", help="run a single pass and exit")
+    p.add_argument("--interval", type=float, default=60.0, help="seconds between passes")
+    p.add_argument("--workers", type=int, default=4, help="candidates processed in parallel")
+    args = p.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    while True:
+        log.info(json.dumps(run_once(args.workers)))
+        if args.once:
+            return
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+# query.py
+# Bank-wide filtering and ranking over candidates' headline metrics.
+#
+# Each candidate is one row of preallocated NumPy columns:
+#   fit       float32   Top Performer Fit in % (encoding.athena_fit)
+#   echelon   float32   Echelon score ("7 / 9" → 7)
+#   global    uint8     Global Spread rating rank (0 missing, 1 poor … 4 unique)
+#   athena    uint8     [row, measure id] Athena rating ranks (0 missing)
+#   genos     uint8     [row, measure id] Genos band codes (0 missing, 1 Very Low … 5 Very High)
+#   score     float32   [row, measure id] Genos raw scores (NaN missing)
+# Measure ids come from encoding.measure_id, so traits line up across candidates.
+#
+#   where="genos empathy >= high and fit >= 70%"   → boolean masks over the columns
+#   order_by="-fit, -genos empathy"                → multi-key sort ('-' or 'desc' = best first)
+# Top-k takes argpartition on the first key (keeping ties) and lexsorts only that
+# slice, so a 10k bank answers in a few milliseconds.
+import hashlib
+import re
+import threading
+import time
+
+import numpy as np
+
+import encoding
+
+ECHELON = encoding.measure_id("Echelon Scores")
+GLOBAL = encoding.measure_id("Global Spread")
+
+_NUM_RE = re.compile(r"-?\d+(?:\.\d+)?")
+_SPLIT_RE = re.compile(r"(\(|\)|&&|\|\||\band\b|\bor\b|\bnot\b)", re.I)
+_CLAUSE_RE = re.compile(r"^\s*(?P<field>.+?)\s*(?P<op>>=|<=|!=|==|≥|≤|≠|=|>|<)\s*(?P<value>.+?)\s*$")
+_OPS = {">=": np.greater_equal, "≥": np.greater_equal, "<=": np.less_equal, "≤": np.less_equal,
+        ">": np.greater, "<": np.less, "=": np.equal, "==": np.equal, "!=": np.not_equal, "≠": np.not_equal}
+
+
+class QueryError(ValueError):
+    """A filter or sort expression that can't be parsed or refers to an unknown field."""
+
+
+def _echelon_value(text) -> float:
+    m = _NUM_RE.search(str(text or ""))
+    return float(m.group()) if m else np.nan
+
+
+def echelon_of(athena_df, athena_codes: dict | None) -> float:
+    """Echelon score of one candidate from its canonical Athena frame (NaN if absent)."""
+    if athena_df is None or athena_codes is None or "Candidate Value" not in athena_df:
+        return np.nan
+    hit = np.flatnonzero(athena_codes["measure"] == ECHELON)
+    return _echelon_value(athena_df["Candidate Value"].iat[int(hit[0])]) if hit.size else np.nan
+
+
+def row_digest(athena_codes: dict | None, genos_codes: dict | None, echelon: float) -> str:
+    h = hashlib.sha1(repr(echelon).encode())
+    for codes in (athena_codes, genos_codes):
+        for arr in (codes or {}).values():
+            h.update(arr.tobytes())
+    return h.hexdigest()
+
+
+class BankQuery:
+    def __init__(self, capacity: int = 1024, measures: int = 64):
+        self._fit = np.full(capacity, np.nan, dtype=np.float32)
+        self._echelon = np.full(capacity, np.nan, dtype=np.float32)
+        self._global = np.zeros(capacity, dtype=np.uint8)
+        self._athena = np.zeros((capacity, measures), dtype=np.uint8)
+        self._genos = np.zeros((capacity, measures), dtype=np.uint8)
+        self._score = np.full((capacity, measures), np.nan, dtype=np.float32)
+        self._rows: dict[str, int] = {}
+        self._names: list[str] = []
+        self._digests: dict[str, str] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._names)
+
+    def names(self) -> list[str]:
+        with self._lock:
+            return list(self._names)
+
+    # ---- storage ----
+    def _grow(self, rows: int, cols: int):
+        cap, width = self._athena.shape
+        if rows <= cap and cols <= width:
+            return
+        new_cap, new_w = max(cap, 1), max(width, 1)
+        while new_cap < rows:
+            new_cap *= 2
+        while new_w < cols:
+            new_w *= 2
+
+        def _resize(a, fill):
+            shape = (new_cap,) if a.ndim == 1 else (new_cap, new_w)
+            out = np.full(shape, fill, dtype=a.dtype)
+            out[tuple(slice(0, s) for s in a.shape)] = a
+            return out
+
+        self._fit, self._echelon = _resize(self._fit, np.nan), _resize(self._echelon, np.nan)
+        self._global = _resize(self._global, 0)
+        self._athena, self._genos = _resize(self._athena, 0), _resize(self._genos, 0)
+        self._score = _resize(self._score, np.nan)
+
+    def upsert(self, cand: str, athena_codes: dict | None = None, genos_codes: dict | None = None,
+               echelon: float = np.nan, digest: str | None = None):
+        """Add or replace one candidate from its encoding.py codes; `digest` (see row_digest) skips unchanged rows."""
+        a, g = athena_codes, genos_codes
+        digest = digest or row_digest(a, g, echelon)
+        with self._lock:
+            if self._digests.get(cand) == digest:
+                return
+            row = self._rows.get(cand)
+            if row is None:
+                row = len(self._names)
+            widest = max([int(c["measure"].max()) + 1 for c in (a, g) if c is not None and len(c["measure"])] or [0])
+            self._grow(row + 1, widest)
+            if cand not in self._rows:
+                self._rows[cand] = row
+                self._names.append(cand)
+            self._clear(row)
+            self._echelon[row] = echelon
+            if a is not None:
+                ranks = encoding.MASK_RANK[a["candidate"]]
+                self._athena[row, a["measure"]] = ranks
+                self._fit[row] = encoding.athena_fit(a)[0] * 100
+                hit = np.flatnonzero(a["measure"] == GLOBAL)
+                self._global[row] = ranks[hit[0]] if hit.size else 0
+            if g is not None:
+                self._genos[row, g["measure"]] = g["band"]
+                self._score[row, g["measure"]] = g["score"]
+            self._digests[cand] = digest
+
+    def _clear(self, row: int):
+        self._fit[row] = self._echelon[row] = np.nan
+        self._global[row] = 0
+        self._athena[row] = 0
+        self._genos[row] = 0
+        self._score[row] = np.nan
+
+    def remove(self, cand: str):
+        with self._lock:
+            row = self._rows.pop(cand, None)
+            if row is None:
+                return
+            self._digests.pop(cand, None)
+            last = len(self._names) - 1
+            if row != last:  # move the last row into the hole
+                moved = self._names[last]
+                for arr in (self._fit, self._echelon, self._global, self._athena, self._genos, self._score):
+                    arr[row] = arr[last]
+                self._names[row] = moved
+                self._rows[moved] = row
+            self._clear(last)
+            self._names.pop()
+
+    # ---- fields ----
+    def _field(self, text: str) -> tuple[str, str, np.ndarray]:
+        """(label, kind, column) for a field name; kind is 'num', 'rating' or 'band'."""
+        n = len(self._names)
+        key = " ".join(text.lower().replace('"', "").replace("'", "").split())
+        if key in ("fit", "top performer fit", "athena fit"):
+            return "Fit %", "num", self._fit[:n]
+        if key in ("echelon", "echelon score", "echelon scores"):
+            return "Echelon", "num", self._echelon[:n]
+        if key in ("global", "global spread"):
+            return "Global Spread", "rating", self._global[:n]
+        source, _, trait = key.partition(" ")
+        if source not in ("athena", "genos"):
+            source, trait = None, key
+        score = source == "genos" and trait.endswith(" score")
+        if score:
+            trait = trait[: -len(" score")]
+        mid = encoding.find_measure(trait)
+        if mid is None or mid >= self._athena.shape[1]:
+            raise QueryError(f"Unknown field: {text.strip()!r}")
+        if source is None:   # bare trait name: whichever report has it
+            source = "athena" if self._athena[:n, mid].any() else "genos"
+        label = encoding.measure_name(mid).title()
+        if score:
+            return f"Genos {label} score", "num", self._score[:n, mid]
+        if source == "athena":
+            return f"Athena {label}", "rating", self._athena[:n, mid]
+        return f"Genos {label}", "band", self._genos[:n, mid]
+
+    @staticmethod
+    def _value(kind: str, text: str) -> float:
+        t = text.strip().strip("'\"").strip()
+        num = _NUM_RE.fullmatch(t.rstrip("%").strip())
+        if num:
+            return float(num.group())
+        code = encoding.band_code(t) if kind == "band" else encoding.rating_rank(t) if kind == "rating" else 0
+        if not code:
+            raise QueryError(f"Can't compare a {'number' if kind == 'num' else kind} with {t!r}")
+        return float(code)
+
+    def _clause(self, text: str, used: dict) -> np.ndarray:
+        m = _CLAUSE_RE.match(text)
+        if not m:
+            raise QueryError(f"Expected '<field> <op> <value>', got {text.strip()!r}")
+        if m["value"][0] in "<>=!≥≤≠":
+            raise QueryError(f"Missing value in {text.strip()!r}")
+        label, kind, col = self._field(m["field"])
+        used[label] = (kind, col)
+        value = self._value(kind, m["value"])
+        present = ~np.isnan(col) if kind == "num" else col > 0
+        with np.errstate(invalid="ignore"):
+            return _OPS[m["op"]](col, value) & present
+
+    # ---- filter expression: or-of-ands with not and parentheses ----
+    def _parse(self, expr: str, used: dict) -> np.ndarray:
+        toks = [t.strip() for t in _SPLIT_RE.split(expr) if t and t.strip()]
+        pos = 0
+
+        def peek():
+            return toks[pos].lower() if pos < len(toks) else None
+
+        def take():
+            nonlocal pos
+            pos += 1
+            return toks[pos - 1]
+
+        def or_expr():
+            mask = and_expr()
+            while peek() in ("or", "||"):
+                take()
+                mask = mask | and_expr()
+            return mask
+
+        def and_expr():
+            mask = factor()
+            while peek() in ("and", "&&"):
+                take()
+                mask = mask & factor()
+            return mask
+
+        def factor():
+            tok = peek()
+            if tok is None:
+                raise QueryError("Filter ends too early")
+            if tok == "not":
+                take()
+                return ~factor()
+            if tok == "(":
+                take()
+                mask = or_expr()
+                if peek() != ")":
+                    raise QueryError("Missing ')'")
+                take()
+                return mask
+            if tok in (")", "and", "or", "&&", "||"):
+                raise QueryError(f"Unexpected {toks[pos]!r}")
+            return self._clause(take(), used)
+
+        mask = or_expr()
+        if pos != len(toks):
+            raise QueryError(f"Unexpected {toks[pos]!r}")
+        return mask
+
+    def _sort_keys(self, order_by: str, used: dict) -> list[np.ndarray]:
+        """Ascending float64 keys (best first), NaN/missing last."""
+        keys = []
+        for part in filter(None, (p.strip() for p in order_by.split(","))):
+            desc = True
+            if part[0] in "+-":
+                desc, part = part[0] == "-", part[1:].strip()
+            words = part.rsplit(" ", 1)
+            if len(words) == 2 and words[1].lower() in ("asc", "desc"):
+                desc, part = words[1].lower() == "desc", words[0]
+            label, kind, col = self._field(part)
+            used[label] = (kind, col)
+            k = col.astype(np.float64)
+            if kind != "num":
+                k[col == 0] = np.nan
+            k = -k if desc else k
+            keys.append(np.where(np.isnan(k), np.inf, k))
+        return keys
+
+    # ---- query ----
+    def query(self, where: str = "", order_by: str = "-fit", k: int = 20,
+              among: list[str] | None = None) -> dict:
+        """Filtered, ranked top-k. Returns {'rows', 'matched', 'total', 'ms'}."""
+        t0 = time.perf_counter()
+        with self._lock:
+            n = len(self._names)
+            used: dict[str, tuple[str, np.ndarray]] = {}
+            mask = self._parse(where, used) if where.strip() else np.ones(n, dtype=bool)
+            if among is not None:
+                allowed = np.zeros(n, dtype=bool)
+                allowed[[self._rows[c] for c in among if c in self._rows]] = True
+                mask &= allowed
+            keys = self._sort_keys(order_by or "-fit", used)
+            idx = np.flatnonzero(mask)
+            if keys and idx.size:
+                sub = [key[idx] for key in keys]
+                if idx.size > k > 0:
+                    # everything at or better than the k-th first key, then an exact sort of that slice
+                    cut = np.partition(sub[0], k - 1)[k - 1]
+                    keep = sub[0] <= cut
+                    idx, sub = idx[keep], [s[keep] for s in sub]
+                order = np.lexsort(sub[::-1])
+                idx = idx[order]
+            idx = idx[:k]
+            rows = []
+            for i in idx:
+                row = {"Candidate": self._names[i], "Fit %": self._fit[i], "Echelon": self._echelon[i],
+                       "Global Spread": self._global[i]}
+                for label, (_, col) in used.items():
+                    row[label] = col[i]
+                rows.append({lbl: self._display(lbl, v, used) for lbl, v in row.items()})
+            return {"rows": rows, "matched": int(mask.sum()), "total": n,
+                    "ms": round((time.perf_counter() - t0) * 1000, 2)}
+
+    @staticmethod
+    def _display(label: str, v, used: dict):
+        if label == "Candidate":
+            return v
+        kind = "rating" if label == "Global Spread" else used.get(label, ("num",))[0]
+        if kind == "rating":
+            return encoding.RATINGS[int(v) - 1].title() if v else None
+        if kind == "band":
+            return encoding.BANDS[int(v) - 1] if v else None
+        return None if np.isnan(v) else round(float(v), 1)
@@ -0,0 +1,209 @@
+# records.py
+# Headless loaders for candidate records in the dashboard container.
+#
+# candidates.py renders these; cli.py (nightly batch runs) loads them in worker
+# processes. Nothing here touches st.session_state, so it imports cleanly outside
+# a Streamlit page. Cache keys are the ones the bank has always used ("blob",
+# "manifest", "frame" in cache_backend.py), so a batch warm with a shared
+# CACHE_BACKEND primes the app as well. Records in the shared "frame" cache hold
+# measure names rather than encoding.py's process-local ids; candidate_record()
+# maps them back to this process's ids after loading.
+import io
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import pandas as pd
+import streamlit as st
+
+import schema
+import storage
+from cache_backend import cached_bytes, cached_obj, get_cache
+from listing import get_listing
+
+CONTAINER = os.getenv("CONTAINER", "dashboard")
+RECORD_TTL = 30
+
+
+@st.cache_resource
+def make_bsc():
+    from azure.storage.blob import BlobServiceClient   # the SDK is ~200 ms to import; only clients need it
+    conn_str = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
+    if conn_str:
+        return BlobServiceClient.from_connection_string(conn_str)
+    acct = os.getenv("AZURE_STORAGE_ACCOUNT_NAME")
+    from azure.identity import DefaultAzureCredential  # only needed without a connection string
+    cred = DefaultAzureCredential(exclude_shared_token_cache_credential=True)
+    return BlobServiceClient(account_url=f"https://{acct}.blob.core.windows.net", credential=cred)
+
+
+def get_cc():
+    return make_bsc().get_container_client(CONTAINER)
+
+
+def slug(s: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", s.strip().lower()).strip("-")
+
+
+def display_name(s: str) -> str:
+    # Replace underscores/dashes with spaces
+    name = re.sub(r'[_\-]+', ' ', s.strip('/').strip())
+    # Insert a space before Capital letters that follow a lowercase (CamelCase → Camel Case)
+    name = re.sub(r'(?<=[a-z])(?=[A-Z])', ' ', name)
+    # Collapse extra spaces
+    name = re.sub(r'\s+', ' ', name).strip()
+    # Optional: if ALL CAPS, title-case it
+    if name.isupper():
+        name = name.title()
+    return name
+
+
+def _download_blob_bytes(path: str) -> bytes | None:
+    def _load():
+        try:
+            return storage.download(get_cc(), path)
+        except Exception:
+            return None
+    # shared across instances when CACHE_BACKEND is disk/redis (see cache_backend.py)
+    return cached_bytes("blob", f"{CONTAINER}/{path}", _load, ttl=30)
+
+
+def list_candidates(wait: bool = False) -> list[str]:
+    """Candidate folders, from the change-log driven listing (listing.py).
+
+    A page takes whatever one refresh gives it; batch runs pass wait=True to
+    finish the first full resync before answering.
+    """
+    bank = get_listing(CONTAINER)
+    for _ in range(50 if wait else 1):
+        if not bank.refresh().get("scan", {}).get("shards_left"):
+            break
+    return bank.candidates()
+
+
+def list_csvs_for_candidate(cand: str) -> list[str]:
+    # We grab the csv paths so that we can load the csvs
+    known = get_listing(CONTAINER).csvs(cand)
+    if known is not None:
+        return known
+    def _load():
+        cc = get_cc()
+        start = cand.rstrip("/") + "/"
+        paths = []
+        for blob in cc.list_blobs(name_starts_with=start):
+            if blob.name.lower().endswith(".csv"):
+                paths.append(blob.name)
+        return sorted(paths)
+    return cached_obj("manifest", f"{CONTAINER}/{cand}/csvs", _load, ttl=30)
+
+
+# We load the csvs so that we can display them in streamlit
+def load_csv(blob_path: str) -> pd.DataFrame | None:
+    try:
+        b = _download_blob_bytes(blob_path)
+        if b is None:
+            return None
+        return pd.read_csv(io.StringIO(b.decode("utf-8")))
+    except Exception:
+        return None
+
+
+def load_summary(cand: str) -> str:
+    """Read dashboard/{cand}/summary.txt → str ('' if missing)."""
+    try:
+        data = storage.download(get_cc(), f"{cand.rstrip('/')}/summary.txt")
+        return data.decode("utf-8", errors="replace")
+    except Exception:
+        return ""
+
+
+def candidate_documents(cand: str) -> str:
+    """Text extracted from the candidate's uploaded PDF/DOCX files ('' if none yet)."""
+    from extract import load_extracted_text
+    docs = load_extracted_text(cand)
+    return "\n\n".join(f"[{name}]\n{text}" for name, text in sorted(docs.items()))
+
+
+def _build_record(cand: str) -> dict:
+    """A candidate's record in portable form (no process-local measure ids), as the shared cache keeps it."""
+    import encoding
+    from query import echelon_of
+    csvs = list_csvs_for_candidate(cand)
+    athena_path = next((p for p in csvs if "athena" in p.lower()), None)
+    genos_path  = next((p for p in csvs if "genos" in p.lower()), None)
+    # normalize once into the canonical layout (schema.py); views below rely on it
+    athena_df   = schema.normalize(load_csv(athena_path), schema.ATHENA) if athena_path else None
+    genos_df    = schema.normalize(load_csv(genos_path), schema.GENOS) if genos_path else None
+    # integer codes (encoding.py) make comparisons cheap; categorical columns trim the frames a little.
+    # The frames stay in the record: every panel renders them on each rerun, and unpickling them is
+    # ~6x cheaper than rebuilding them from codes (benchmarks/record_memory.py).
+    athena_df, genos_df = encoding.compact_frame(athena_df), encoding.compact_frame(genos_df)
+
+    # preload summary.txt
+    summary = ""
+    try:
+        b = _download_blob_bytes(f"{cand.rstrip('/')}/summary.txt")
+        if b:
+            summary = b.decode("utf-8", errors="replace")
+    except Exception:
+        pass
+
+    athena_codes, genos_codes = encoding.encode_athena(athena_df), encoding.encode_genos(genos_df)
+    return {
+        "csvs": csvs,
+        "athena_df": athena_df,
+        "genos_df": genos_df,
+        "athena_codes": encoding.portable(athena_codes),
+        "genos_codes": encoding.portable(genos_codes),
+        "echelon": echelon_of(athena_df, athena_codes),
+        "summary": summary,        # include it
+    }
+
+
+def _localize(rec: dict) -> dict:
+    """A record from _build_record with codes in this process's measure ids."""
+    import encoding
+    from query import row_digest
+    a, g = encoding.localize(rec.get("athena_codes")), encoding.localize(rec.get("genos_codes"))
+    echelon = rec.get("echelon", float("nan"))
+    # lets sync skip unchanged rows; computed here because it hashes the local ids
+    return {**rec, "athena_codes": a, "genos_codes": g, "query_digest": row_digest(a, g, echelon)}
+
+
+def load_candidate_record(cand: str) -> dict:
+    return _localize(_build_record(cand))
+
+
+def _frame_key(cand: str) -> str:
+    # "@names": entries written before records went portable held process-local ids
+    return f"{CONTAINER}/{cand}@names"
+
+
+EMPTY_RECORD = {"csvs": [], "athena_df": None, "genos_df": None, "summary": ""}
+
+
+def candidate_record(cand: str) -> dict:
+    """load_candidate_record through the shared "frame" cache."""
+    return _localize(cached_obj("frame", _frame_key(cand), partial(_build_record, cand), RECORD_TTL))
+
+
+def load_records(cands: list[str], max_workers: int = 8) -> dict[str, dict]:
+    """{cand: record} for many candidates, fetched in a thread pool; failures get EMPTY_RECORD."""
+    out = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        futures = {ex.submit(candidate_record, c): c for c in cands}
+        for fut, cand in futures.items():
+            try:
+                out[cand] = fut.result()
+            except Exception:
+                out[cand] = dict(EMPTY_RECORD)
+    return out
+
+
+def invalidate_candidate(cand: str):
+    """Drop shared-cache entries for one candidate after a write or delete."""
+    c = get_cache()
+    c.delete("frame", _frame_key(cand))
+    c.delete("blob", f"{CONTAINER}/{cand}/summary.txt")
+    c.delete("manifest", f"{CONTAINER}/{cand}/csvs")
@@ -0,0 +1,221 @@
+# report.py
+# One HTML report engine for every exporter (solo, compare, group, email).
+# Templates are compiled once at import and table/summary fragments are cached
+# by content hash, so a rerun with unchanged data never calls DataFrame.to_html.
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from html import escape as _escape
+from string import Template
+
+import pandas as pd
+
+GENOS_LEGEND_HTML = """
+<div style="margin-top:8px; padding:10px 12px; border:1px solid #eee; border-radius:8px; background:#fafafa; font-size:13px; line-height:1.5;">
+  <strong>Genos Band Mapping</strong><br>
+  1-20 <b>Very Low</b> – Exhibits this emotional intelligence trait much less often than average. Represents a real jeopardy<br>
+  21-40 <b>Low</b> – Exhibits this trait less often than typical or average. Development needed<br>
+  41-60 <b>Average</b> – Exhibits this trait as often as the typical person does in the workplace<br>
+  61-80 <b>High</b> – Exhibits this trait more often than the typical person; well developed behavioral trait<br>
+  81-99 <b>Very High</b> – Significant strength; has the ability to increase or improvement this trait in others
+</div>
+""".strip()
+
+_BOLD_RE = re.compile(r"\*\*(.+?)\*\*")
+
+# Precompiled page templates
+_PAGE = Template("""<!doctype html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>$title</title>
+</head>
+<body style="font-family:Arial, Helvetica, sans-serif; font-size:14px; color:#222; padding:24px;">
+$body
+<p style="margin-top:24px; font-style:italic; color:#666">Exported from HR Dashboard</p>
+</body>
+</html>""")
+
+_EMAIL_PAGE = Template("""<html>
+<body style="font-family: Arial, sans-serif; font-size: 14px; color: #222;">
+$body
+<p style="margin-top: 20px; font-style: italic;">Exported from HR Dashboard</p>
+</body>
+</html>""")
+
+_H2 = Template("<h2 style='margin:0 0 12px 0'>$heading</h2>")
+_H3 = Template("<h3 style='margin:20px 0 8px'>$heading</h3>")
+_SUMMARY = Template("<div style='white-space:pre-wrap; line-height:1.5'>$text</div>")
+
+
+class _LRU:
+    """Tiny thread-safe LRU used for fragment and document caches."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            val = self._data.get(key)
+            if val is not None:
+                self._data.move_to_end(key)
+            return val
+
+    def put(self, key: str, val: str) -> str:
+        with self._lock:
+            self._data[key] = val
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return val
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_fragments = _LRU(maxsize=4096)
+_documents = _LRU(maxsize=512)
+
+
+def _text_digest(text: str) -> str:
+    return hashlib.sha1((text or "").encode("utf-8")).hexdigest()
+
+
+def df_digest(df: pd.DataFrame | None) -> str:
+    """Content hash of a DataFrame (values + column names), '' for empty/None."""
+    if df is None or df.empty:
+        return ""
+    h = hashlib.sha1()
+    h.update("\x1f".join(map(str, df.columns)).encode("utf-8"))
+    try:
+        h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    except TypeError:
+        # unhashable cells (lists etc.) – fall back to the CSV form
+        h.update(df.to_csv(index=False).encode("utf-8"))
+    return h.hexdigest()
+
+
+def table_fragment(df: pd.DataFrame | None, *, classes: str | None = None) -> str:
+    """`df.to_html(...)`, rendered once per distinct table content."""
+    digest = df_digest(df)
+    if not digest:
+        return ""
+    key = f"tbl:{classes or ''}:{digest}"
+    hit = _fragments.get(key)
+    if hit is not None:
+        return hit
+    return _fragments.put(
+        key,
+        df.to_html(index=False, border=1, justify="left", escape=False, classes=classes),
+    )
+
+
+def summary_fragment(text: str, *, bold: bool = True) -> str:
+    """Escaped summary text; `**bold**` becomes <strong> unless bold=False."""
+    key = f"sum:{int(bold)}:{_text_digest(text)}"
+    hit = _fragments.get(key)
+    if hit is not None:
+        return hit
+    safe = _escape(text or "")
+    if bold:
+        safe = _BOLD_RE.sub(r"<strong>\1</strong>", safe)
+    return _fragments.put(key, _SUMMARY.substitute(text=safe))
+
+
+def _sections(
+    ath_df: pd.DataFrame | None,
+    gen_df: pd.DataFrame | None,
+    *,
+    athena_title: str,
+    genos_title: str,
+    include_genos_legend: bool,
+    classes: str | None = None,
+) -> list[str]:
+    parts = []
+    ath = table_fragment(ath_df, classes=classes)
+    if ath:
+        parts.append(_H3.substitute(heading=athena_title) + ath)
+    gen = table_fragment(gen_df, classes=classes)
+    if gen:
+        parts.append(_H3.substitute(heading=genos_title) + gen)
+        if include_genos_legend:
+            parts.append(GENOS_LEGEND_HTML)
+    return parts
+
+
+def _doc_key(variant: str, *fields: str, frames=()) -> str:
+    return ":".join([variant, *(_text_digest(f) for f in fields), *(df_digest(d) for d in frames)])
+
+
+def render_solo(
+    title_cand: str,
+    text: str,
+    ath_df: pd.DataFrame | None,
+    gen_df: pd.DataFrame | None,
+    *,
+    include_genos_legend: bool = True,
+) -> str:
+    """Single-candidate summary page (the "Download summary HTML" export)."""
+    key = _doc_key(f"solo{int(include_genos_legend)}", title_cand, text, frames=(ath_df, gen_df))
+    hit = _documents.get(key)
+    if hit is not None:
+        return hit
+    parts = [_H2.substitute(heading=f"Candidate Summary — {title_cand}"), summary_fragment(text)]
+    parts += _sections(ath_df, gen_df, athena_title="Athena Scores", genos_title="Genos Scores",
+                       include_genos_legend=include_genos_legend)
+    return _documents.put(key, _PAGE.substitute(title=f"{title_cand} — Summary", body="".join(parts)))
+
+
+def render_compare(
+    title_cand: str,
+    title_other: str,
+    text: str,
+    ath_df: pd.DataFrame | None,
+    gen_df: pd.DataFrame | None,
+    *,
+    include_genos_legend: bool = True,
+) -> str:
+    """Candidate vs. others comparison page."""
+    key = _doc_key(f"cmp{int(include_genos_legend)}", title_cand, title_other, text, frames=(ath_df, gen_df))
+    hit = _documents.get(key)
+    if hit is not None:
+        return hit
+    parts = [_H2.substitute(heading=f"Comparison — {title_cand} vs {title_other}"), summary_fragment(text)]
+    parts += _sections(ath_df, gen_df, athena_title="Athena Scores", genos_title="Genos Scores",
+                       include_genos_legend=include_genos_legend)
+    return _documents.put(
+        key, _PAGE.substitute(title=f"{title_cand} vs {title_other} — Comparison", body="".join(parts))
+    )
+
+
+def render_group(title: str, text: str, ath_df: pd.DataFrame | None, gen_df: pd.DataFrame | None) -> str:
+    """Cohesive summary for a whole group (compare.build_compare_html)."""
+    key = _doc_key("group", title, text, frames=(ath_df, gen_df))
+    hit = _documents.get(key)
+    if hit is not None:
+        return hit
+    parts = [_H2.substitute(heading=f"Cohesive Summary – {title}"), summary_fragment((text or "").strip(), bold=False)]
+    parts += _sections(ath_df, gen_df, athena_title="Athena scores", genos_title="Genos bands",
+                       include_genos_legend=False)
+    return _documents.put(key, _PAGE.substitute(title=f"{title} — Cohesive Summary", body="".join(parts)))
+
+
+def render_email(cand: str, text: str, ath_df: pd.DataFrame | None, gen_df: pd.DataFrame | None) -> str:
+    """Email-pasteable variant (no doctype/head, `dataframe` table class)."""
+    key = _doc_key("email", cand, text, frames=(ath_df, gen_df))
+    hit = _documents.get(key)
+    if hit is not None:
+        return hit
+    parts = [_H2.substitute(heading=f"Candidate Summary – {cand}"), summary_fragment(text)]
+    parts += _sections(ath_df, gen_df, athena_title="Athena vs Top Performers", genos_title="Genos Scores",
+                       include_genos_legend=False, classes="dataframe")
+    return _documents.put(key, _EMAIL_PAGE.substitute(body="".join(parts)))
+
+
+def clear_cache():
+    _fragments.clear()
+    _documents.clear()
@@ -0,0 +1,131 @@
+# schema.py
+# Canonical layout for Athena/Genos CSVs.
+#
+# A CSV's header tuple is its "signature". Each signature is resolved once
+# (lru_cache) into a {canonical column: source column} mapping; normalize() then
+# renames/types the frame into the canonical layout below. processor.py persists
+# the normalized form into the dashboard container, so loaders read canonical
+# headers and never have to sniff columns again.
+#
+#   Athena: Trait | Candidate Value | Top Performers | (extra columns kept)
+#   Genos:  Measure | Raw Score (float) | Band Range | Band | Interpretation
+import re
+from functools import lru_cache
+
+import pandas as pd
+
+ATHENA = "athena"
+GENOS = "genos"
+
+# canonical name -> accepted header spellings, in priority order
+CANONICAL: dict[str, dict[str, tuple[str, ...]]] = {
+    ATHENA: {
+        "Trait": ("trait", "measure"),
+        "Candidate Value": ("candidate value", "candidate"),
+        "Top Performers": ("top performers", "top performer"),
+    },
+    GENOS: {
+        "Measure": ("measure", "trait"),
+        "Raw Score": ("raw score", "score", "percentile", "genos score", "overall score"),
+        "Band Range": ("band range",),
+        "Band": ("band",),
+        "Interpretation": ("interpretation",),
+    },
+}
+
+GENOS_BINS = [0, 20, 40, 60, 80, 100]
+GENOS_BANDS = ["Very Low", "Low", "Average", "High", "Very High"]
+
+
+def _norm(s: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", s.strip().lower())
+
+
+def detect_kind(path: str) -> str | None:
+    p = (path or "").lower()
+    if re.search(r"(athena|athen[_-]?vs[_-]?top)", p):
+        return ATHENA
+    if "genos" in p:
+        return GENOS
+    return None
+
+
+@lru_cache(maxsize=512)
+def resolve_signature(kind: str, header: tuple[str, ...]) -> tuple[tuple[str, str], ...]:
+    """Map canonical columns to the source header (exact → punctuation-free → substring)."""
+    cols = {str(c).strip().lower(): c for c in header}
+    norm = {_norm(k): v for k, v in cols.items()}
+    taken: set[str] = set()
+    out: list[tuple[str, str]] = []
+    for canon, aliases in CANONICAL[kind].items():
+        hit = next((cols[a] for a in aliases if a in cols and cols[a] not in taken), None)
+        if hit is None:
+            hit = next((norm[_norm(a)] for a in aliases if _norm(a) in norm and norm[_norm(a)] not in taken), None)
+        if hit is None:
+            wanted = [_norm(a) for a in aliases]
+            hit = next((orig for raw, orig in cols.items()
+                        if orig not in taken and any(w in _norm(raw) for w in wanted)), None)
+        if hit is not None:
+            taken.add(hit)
+            out.append((canon, hit))
+    return tuple(out)
+
+
+def column_map(df: pd.DataFrame, kind: str) -> dict[str, str]:
+    """{canonical: source column} for `df`, cached by its header signature."""
+    return dict(resolve_signature(kind, tuple(str(c) for c in df.columns)))
+
+
+def bands_from_scores(scores: pd.Series) -> pd.Series:
+    v = pd.to_numeric(scores, errors="coerce")
+    return pd.cut(v, bins=GENOS_BINS, labels=GENOS_BANDS, include_lowest=True).astype(object).where(v.notna(), None)
+
+
+def is_canonical(df: pd.DataFrame | None) -> bool:
+    return df is not None and bool(df.attrs.get("canonical"))
+
+
+def normalize(df: pd.DataFrame | None, kind: str) -> pd.DataFrame | None:
+    """Return `df` in the canonical layout for `kind` (idempotent, never mutates input)."""
+    if df is None or is_canonical(df):
+        return df
+    out = df.copy()
+    out.columns = pd.Index([str(c).strip() for c in out.columns])
+    out = out.loc[:, ~out.columns.duplicated()]
+    out = out.dropna(how="all").dropna(axis=1, how="all")
+    mapping = column_map(out, kind)
+    out = out.rename(columns={src: canon for canon, src in mapping.items() if src != canon})
+
+    if kind == ATHENA and "Trait" not in out.columns and len(out.columns):
+        str_cols = [c for c in out.columns if pd.api.types.is_string_dtype(out[c])]
+        out = out.rename(columns={(str_cols[0] if str_cols else out.columns[0]): "Trait"})
+
+    for c in out.columns:
+        if pd.api.types.is_string_dtype(out[c]):
+            out[c] = out[c].str.strip()
+
+    if kind == GENOS:
+        if "Raw Score" in out.columns:
+            out["Raw Score"] = pd.to_numeric(out["Raw Score"], errors="coerce")
+            if "Band" not in out.columns:
+                out["Band"] = bands_from_scores(out["Raw Score"])
+        preferred = [c for c in CANONICAL[GENOS] if c in out.columns]
+        out = out[preferred + [c for c in out.columns if c not in preferred]]
+    else:
+        preferred = [c for c in CANONICAL[ATHENA] if c in out.columns]
+        out = out[preferred + [c for c in out.columns if c not in preferred]]
+
+    out = out.reset_index(drop=True)
+    out.attrs["canonical"] = kind
+    return out
+
+
+def value_by_trait(df: pd.DataFrame | None, trait_name: str, value_col: str = "Candidate Value") -> str | None:
+    """Look up one Athena row by Trait in a canonical frame."""
+    if df is None or df.empty or "Trait" not in df.columns or value_col not in df.columns:
+        return None
+    m = df["Trait"].astype(str).str.casefold() == str(trait_name).strip().casefold()
+    if not m.any():
+        return None
+    v = df.loc[m, value_col].iloc[0]
+    return None if pd.isna(v) else str(v).strip()
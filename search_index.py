@@ -0,0 +1,303 @@
+# search_index.py
+# Inverted index over dashboard summaries and archived (finished) exports.
+#
+# Documents are keyed "<container>/<blob path>". The index is kept in memory
+# (one per process), updated incrementally whenever save_summary / upload_text
+# write, reconciled against storage by ETag (refresh), and persisted as a gzip'd
+# JSON blob (finished/_index/search.json.gz) so new instances start warm.
+# Queries are BM25-ranked over in-memory postings.
+#
+# refresh() lists every container, so it never runs on a Streamlit rerun: warmup
+# runs it once at boot and then start_refresher() repeats it on a daemon thread;
+# request_refresh() just wakes that thread. The index blob is only replaced if it
+# still has the ETag this process read (or wrote) it at, so two instances can't
+# silently overwrite each other's index; the loser reloads the newer blob and its
+# next refresh() reconciles it with storage.
+import gzip
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from html import unescape as _unescape
+
+import storage
+
+INDEX_BLOB = "_index/search.json.gz"
+PERSIST_DELAY = 5.0   # seconds to batch writes before persisting the index blob
+REFRESH_INTERVAL = float(os.getenv("SEARCH_REFRESH_INTERVAL", "300"))
+K1, B = 1.2, 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]{2,}")
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+def html_to_text(html: str) -> str:
+    html = re.sub(r"(?is)<(script|style)[^>]*>.*?</\1>", " ", html or "")
+    html = re.sub(r"(?i)<br\s*/?>|</(p|div|tr|h[1-6])>", "\n", html)
+    return _unescape(re.sub(r"<[^>]+>", " ", html))
+
+
+class SearchIndex:
+    def __init__(self):
+        self.docs: dict[str, dict] = {}                  # doc_id -> {len, etag, preview, ...meta}
+        self.postings: dict[str, dict[str, int]] = {}    # term -> {doc_id: tf}
+        self._doc_terms: dict[str, list[str]] = {}       # doc_id -> its terms (for cheap removal)
+        self._total_len = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, doc_id: str, text: str, **meta):
+        with self._lock:
+            self.remove(doc_id)
+            toks = tokenize(text)
+            counts = Counter(toks)
+            for term, tf in counts.items():
+                self.postings.setdefault(term, {})[doc_id] = tf
+            self._doc_terms[doc_id] = list(counts)
+            preview = re.sub(r"\s+", " ", text or "").strip()[:200]
+            self.docs[doc_id] = {"len": len(toks), "preview": preview, **meta}
+            self._total_len += len(toks)
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            doc = self.docs.pop(doc_id, None)
+            if doc is None:
+                return
+            self._total_len -= doc["len"]
+            for term in self._doc_terms.pop(doc_id, ()):
+                plist = self.postings.get(term)
+                if plist is not None:
+                    plist.pop(doc_id, None)
+                    if not plist:
+                        del self.postings[term]
+
+    def search(self, query: str, k: int = 20, *, kind: str | None = None) -> list[dict]:
+        """BM25 top-k. Each hit is the doc's meta plus 'id' and 'score'."""
+        with self._lock:
+            n = len(self.docs)
+            if not n:
+                return []
+            avg = self._total_len / n or 1.0
+            scores: dict[str, float] = {}
+            for term in set(tokenize(query)):
+                plist = self.postings.get(term)
+                if not plist:
+                    continue
+                idf = math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+                for doc_id, tf in plist.items():
+                    dl = self.docs[doc_id]["len"]
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (K1 + 1) / (
+                        tf + K1 * (1 - B + B * dl / avg))
+            if kind:
+                scores = {d: s for d, s in scores.items() if self.docs[d].get("kind") == kind}
+            best = heapq.nlargest(k, scores.items(), key=lambda kv: kv[1])
+            return [{"id": d, "score": round(s, 3), **self.docs[d]} for d, s in best]
+
+    # ---- persistence ----
+    def to_bytes(self) -> bytes:
+        with self._lock:
+            payload = {"docs": self.docs, "postings": self.postings}
+            return gzip.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SearchIndex":
+        idx = cls()
+        payload = json.loads(gzip.decompress(data))
+        idx.docs = payload.get("docs", {})
+        idx.postings = payload.get("postings", {})
+        idx._total_len = sum(d["len"] for d in idx.docs.values())
+        for term, plist in idx.postings.items():
+            for doc_id in plist:
+                idx._doc_terms.setdefault(doc_id, []).append(term)
+        return idx
+
+
+# ---------- process-wide index + storage wiring ----------
+
+_index: SearchIndex | None = None
+_index_etag: str | None = None   # ETag of the index blob as last read or written by this process
+_index_lock = threading.Lock()
+_persist_lock = threading.Lock()
+_persist_timer: threading.Timer | None = None
+_refresher: threading.Thread | None = None
+_wake = threading.Event()
+
+
+def _containers():
+    from send_back import _archive_cc, _dash_cc
+    return {"dashboard": _dash_cc(), "finished": _archive_cc()}
+
+
+def get_index() -> SearchIndex:
+    """The process-wide index, loaded from the index blob on first use."""
+    global _index, _index_etag
+    with _index_lock:
+        if _index is None:
+            try:
+                dl = _containers()["finished"].download_blob(INDEX_BLOB)
+                _index = SearchIndex.from_bytes(dl.readall())
+                _index_etag = dl.properties.etag
+            except Exception:
+                _index, _index_etag = SearchIndex(), None
+        return _index
+
+
+def persist() -> bool:
+    """Upload the index blob unless another instance replaced it since we read it.
+
+    On a conflict the in-memory index is dropped so the next get_index() loads the
+    newer blob, the refresher is woken to reconcile it, and False is returned.
+    """
+    global _index, _index_etag
+    from azure.core import MatchConditions
+    from azure.core.exceptions import ResourceExistsError, ResourceModifiedError
+    from azure.storage.blob import ContentSettings
+    with _persist_lock:
+        idx = get_index()
+        cond = ({"etag": _index_etag, "match_condition": MatchConditions.IfNotModified}
+                if _index_etag else {"overwrite": False})
+        try:
+            res = _containers()["finished"].upload_blob(
+                INDEX_BLOB, idx.to_bytes(),
+                content_settings=ContentSettings(content_type="application/gzip"), **cond,
+            )
+        except (ResourceExistsError, ResourceModifiedError):
+            with _index_lock:
+                if _index is idx:
+                    _index, _index_etag = None, None
+            _wake.set()
+            return False
+        _index_etag = (res or {}).get("etag")
+        return True
+
+
+def _schedule_persist():
+    global _persist_timer
+    with _index_lock:
+        if _persist_timer is not None and _persist_timer.is_alive():
+            return
+        _persist_timer = threading.Timer(PERSIST_DELAY, _safe_persist)
+        _persist_timer.daemon = True
+        _persist_timer.start()
+
+
+def _safe_persist():
+    try:
+        persist()
+    except Exception:
+        pass
+
+
+def _doc_meta(container: str, path: str) -> dict:
+    # dashboard/<cand>/summary.txt and finished/<cand>/{exports,comparisons}/... carry a candidate
+    head = path.split("/", 1)[0] if "/" in path else ""
+    cand = "" if head in ("solo", "compare", "exports") else head
+    kind = "summary" if container == "dashboard" else "export"
+    return {"kind": kind, "container": container, "path": path, "cand": cand}
+
+
+def _indexable(container: str, path: str) -> bool:
+    p = path.lower()
+    if p.startswith("_"):
+        return False
+    if container == "dashboard":
+        return p.endswith("/summary.txt")
+    return p.endswith((".html", ".txt"))
+
+
+def index_blob(container: str, path: str, text: str, *, content_type: str = "text/plain", etag: str | None = None):
+    """Hook for writers: (re)index one blob that was just written. Never raises."""
+    try:
+        path = path.strip("/")
+        if not _indexable(container, path):
+            return
+        body = html_to_text(text) if (content_type == "text/html" or path.lower().endswith(".html")) else text
+        get_index().add(f"{container}/{path}", body, etag=etag, **_doc_meta(container, path))
+        _schedule_persist()
+    except Exception:
+        pass
+
+
+def forget_prefix(container: str, prefix: str):
+    """Drop every indexed doc under container/prefix (e.g. a removed candidate)."""
+    idx = get_index()
+    key = f"{container}/{prefix.strip('/')}/"
+    for doc_id in [d for d in list(idx.docs) if d.startswith(key)]:
+        idx.remove(doc_id)
+    _schedule_persist()
+
+
+def refresh() -> dict:
+    """Reconcile the index with storage: (re)index blobs whose ETag changed, drop deleted ones.
+
+    Lists both containers, so call it from warmup, the refresher thread or the CLI,
+    never from a page rerun.
+    """
+    t0 = time.perf_counter()
+    idx = get_index()
+    seen, changed = set(), 0
+    for container, cc in _containers().items():
+        for b in cc.list_blobs():
+            if not _indexable(container, b.name):
+                continue
+            doc_id = f"{container}/{b.name}"
+            seen.add(doc_id)
+            if idx.docs.get(doc_id, {}).get("etag") == b.etag:
+                continue
+            try:
+                text = storage.download(cc, b.name).decode("utf-8", errors="replace")
+            except Exception:
+                continue
+            body = html_to_text(text) if b.name.lower().endswith(".html") else text
+            idx.add(doc_id, body, etag=b.etag, **_doc_meta(container, b.name))
+            changed += 1
+    stale = [d for d in list(idx.docs) if d not in seen]
+    for d in stale:
+        idx.remove(d)
+    persisted = persist() if (changed or stale) else None
+    return {"docs": len(idx), "reindexed": changed, "removed": len(stale), "persisted": persisted,
+            "seconds": round(time.perf_counter() - t0, 3)}
+
+
+def _refresh_loop(interval: float, first_delay: float):
+    _wake.wait(first_delay)
+    while True:
+        _wake.clear()
+        try:
+            refresh()
+        except Exception:
+            pass
+        _wake.wait(interval)
+
+
+def start_refresher(interval: float = REFRESH_INTERVAL, first_delay: float = 0.0) -> threading.Thread:
+    """Run refresh() every `interval` seconds on a daemon thread, once per process."""
+    global _refresher
+    with _index_lock:
+        if _refresher is None:
+            _refresher = threading.Thread(target=_refresh_loop, args=(interval, first_delay),
+                                          name="search-refresh", daemon=True)
+            _refresher.start()
+        return _refresher
+
+
+def request_refresh():
+    """Ask the refresher thread for a refresh() now (e.g. after the Refresh button); never blocks."""
+    _wake.set()
+
+
+if __name__ == "__main__":
+    import sys
+    print(refresh())
+    for q in sys.argv[1:]:
+        for hit in get_index().search(q, k=10):
+            print(f"{hit['score']:>7}  {hit['id']}")
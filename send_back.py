@@ -1,18 +1,20 @@
 # send_back.py
 import os
 import streamlit as st
-from azure.storage.blob import BlobServiceClient, ContentSettings
-from azure.identity import DefaultAzureCredential
 import re
 from pathlib import Path
 from html import unescape as _unescape 
 
+import storage
+
 @st.cache_resource(show_spinner=False)
-def _make_bsc() -> BlobServiceClient:
+def _make_bsc():
+    from azure.storage.blob import BlobServiceClient   # the SDK is ~200 ms to import; only clients need it
     conn = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
     if conn:
         return BlobServiceClient.from_connection_string(conn)
     acct = os.getenv("AZURE_STORAGE_ACCOUNT_NAME")
+    from azure.identity import DefaultAzureCredential  # only needed without a connection string
     cred = DefaultAzureCredential(exclude_shared_token_cache_credential=True)
     return BlobServiceClient(account_url=f"https://{acct}.blob.core.windows.net", credential=cred)
 
@@ -27,12 +29,34 @@ def _archive_cc():
     return _make_bsc().get_container_client(CONTAINER)
 
 def upload_text(path: str, text: str, *, content_type="text/html"):
-    _archive_cc().upload_blob(
-        name=path.strip("/"),
-        data=text.encode("utf-8"),
-        overwrite=True,
-        content_settings=ContentSettings(content_type=content_type),
-    )
+    # stored gzip-encoded (storage.py); server-side copies below keep the encoding
+    res = storage.upload(_archive_cc(), path.strip("/"), text, content_type=content_type)
+    from search_index import index_blob
+    index_blob("finished", path, text, content_type=content_type, etag=res.get("etag"))
+
+def upload_text_fanout(paths: list[str], text: str, *, content_type="text/html"):
+    """Upload `text` once to paths[0], then server-side copy it to the other paths.
+
+    Copies stay inside the storage account, so only one transfer leaves the app
+    however many archive locations there are. Falls back to a plain upload if a
+    copy is rejected (e.g. credentials that can't authorize the copy source).
+    """
+    paths = [p.strip("/") for p in paths if p and p.strip("/")]
+    if not paths:
+        return
+    upload_text(paths[0], text, content_type=content_type)
+    cc = _archive_cc()
+    src_url = cc.get_blob_client(paths[0]).url
+    for p in dict.fromkeys(paths[1:]):
+        if p == paths[0]:
+            continue
+        try:
+            cc.get_blob_client(p).start_copy_from_url(src_url)
+        except Exception:
+            upload_text(p, text, content_type=content_type)
+            continue
+        from search_index import index_blob
+        index_blob("finished", p, text, content_type=content_type)
 
 def _slug(s: str) -> str:
     return re.sub(r"[^a-z0-9]+", "-", s.strip().lower()).strip("-")
@@ -51,10 +75,15 @@ def _resolve_by_basename(basename: str) -> str | None:
             return n
     return None
 
+def candidate_archive_path(cand: str) -> str:
+    return _safe_join(f"{cand}/exports", f"{_slug(cand)}_summary.html")
+
+def comparison_archive_paths(cand: str, other: str) -> list[str]:
+    base_name = f"{_slug(cand)}-vs-{_slug(other)}.html"
+    return [_safe_join(f"{cand}/comparisons", base_name), _safe_join(f"{other}/comparisons", base_name)]
+
 def render_candidate_download(cand: str, solo_html: str):
-    folder = f"{cand}/exports"
-    file_name = f"{_slug(cand)}_summary.html"
-    archive_path = _safe_join(folder, file_name)
+    archive_path = candidate_archive_path(cand)
     try:
         upload_text(archive_path, solo_html, content_type="text/html")
         st.toast(f"Archived to Blob: {archive_path}", icon="✅")
@@ -64,12 +93,8 @@ def render_candidate_download(cand: str, solo_html: str):
         st.warning(f"Downloaded locally, but failed to archive to Blob: {e}")
 
 def render_comparison_download(cand: str, other: str, html: str):
-    base_name = f"{_slug(cand)}-vs-{_slug(other)}.html"
-    cand_path  = _safe_join(f"{cand}/comparisons", base_name)
-    other_path = _safe_join(f"{other}/comparisons", base_name)
     try:
-        upload_text(cand_path, html, content_type="text/html")
-        upload_text(other_path, html, content_type="text/html")
+        upload_text_fanout(comparison_archive_paths(cand, other), html, content_type="text/html")
         st.toast("Comparison archived")
     except Exception as e:
         st.warning(f"Downloaded locally, but failed to archive comparison: {e}")
@@ -83,7 +108,7 @@ def load_summary_only(blob_name: str) -> str:
             return ""
         path = resolved
     try:
-        html = cc.download_blob(path).readall().decode("utf-8", "replace")
+        html = storage.download(cc, path).decode("utf-8", "replace")
         m = re.search(r"<!--\s*SUMMARY_START\s*-->(.*?)<!--\s*SUMMARY_END\s*-->", html, re.S|re.I)
         if not m:
             m = re.search(r'<div[^>]+id=["\']summary-text["\'][^>]*>(.*?)</div>', html, re.S|re.I)
@@ -100,6 +125,7 @@ def load_summary_only(blob_name: str) -> str:
 
 def delete_candidate_from_dashboard(cand: str) -> tuple[int, list[str]]:
     """Remove all blobs for this candidate from the dashboard container."""
+    from listing import record_change
     cc = _dash_cc()  # fixed: use dashboard container + correct helper
     prefix = f"{cand.rstrip('/')}/"
     names = [b.name for b in cc.list_blobs(name_starts_with=prefix)]
@@ -107,7 +133,10 @@ def delete_candidate_from_dashboard(cand: str) -> tuple[int, list[str]]:
     for name in names:
         try:
             cc.get_blob_client(name).delete_blob(delete_snapshots="include")
+            record_change(cc, "delete", name)
             deleted += 1
         except Exception as e:
             errors.append(f"{name}: {e}")
+    from search_index import forget_prefix
+    forget_prefix("dashboard", cand)
     return deleted, errors
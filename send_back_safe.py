@@ -4,6 +4,8 @@ import streamlit as st
 from azure.storage.blob import BlobServiceClient, ContentSettings
 from azure.identity import DefaultAzureCredential
 
+import storage
+
 @st.cache_resource(show_spinner=False)
 def _make_bsc() -> BlobServiceClient:
     conn = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
@@ -54,7 +56,7 @@ def load_summary_only(blob_name: str) -> str:
     """
     cc = _archive_cc()
     try:
-        html_doc = cc.download_blob(blob_name).readall().decode("utf-8", errors="replace")
+        html_doc = storage.download(cc, blob_name).decode("utf-8", errors="replace")
 
         # --- Step 1: Locate the section before the table ---
         # Grab everything from <h2> down to <h3>Comparison Table</h3>
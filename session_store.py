@@ -0,0 +1,261 @@
+# session_store.py
+# Byte-budgeted per-session storage for large values (rendered HTML, LLM drafts).
+#
+# st.session_state keeps everything for as long as the browser tab lives, so big
+# strings pile up per user. A SessionStore lives in one session_state slot and
+#   - compresses values over COMPRESS_MIN bytes (zlib),
+#   - keeps total stored bytes under a budget (SESSION_BUDGET_BYTES, default 8 MB),
+#   - evicts least-recently-used ARTIFACTs first (derived values callers can rebuild),
+#   - spills DRAFTs (user-edited text) to blob storage when SESSION_SPILL_DRAFTS=1
+#     instead of dropping them; they are read back transparently on get().
+# A spill blob is deleted when its entry is read back, replaced or dropped, and
+# whatever a session still has spilled is deleted when its store is garbage
+# collected (the session ended). Blobs left by a process that died are removed by
+# prune_spills() (`python -m cli purge --drafts-older-than HOURS`).
+# Every live store is registered so the app can report per-session memory.
+import os
+import pickle
+import threading
+import time
+import weakref
+import zlib
+from collections import OrderedDict
+
+ARTIFACT = "artifact"
+DRAFT = "draft"
+
+BUDGET_BYTES = int(os.getenv("SESSION_BUDGET_BYTES", str(8 * 1024 * 1024)))
+COMPRESS_MIN = 2048
+SPILL_DRAFTS = os.getenv("SESSION_SPILL_DRAFTS", "0") == "1"
+SPILL_PREFIX = "_drafts"   # under the finished container; '_' keeps it out of the search index
+
+_SLOT = "_session_store"
+_stores: "weakref.WeakValueDictionary[str, SessionStore]" = weakref.WeakValueDictionary()
+
+
+class _Entry:
+    __slots__ = ("kind", "data", "codec", "raw_len", "spilled", "touched")
+
+    def __init__(self, kind: str, data: bytes, codec: str, raw_len: int):
+        self.kind, self.data, self.codec, self.raw_len = kind, data, codec, raw_len
+        self.spilled: str | None = None
+        self.touched = time.time()
+
+
+def _encode(value) -> tuple[bytes, str, int]:
+    if isinstance(value, str):
+        raw, codec = value.encode("utf-8"), "str"
+    elif isinstance(value, bytes):
+        raw, codec = value, "bytes"
+    else:
+        raw, codec = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), "pickle"
+    if len(raw) >= COMPRESS_MIN:
+        packed = zlib.compress(raw, 6)
+        if len(packed) < len(raw):
+            return packed, codec + "+z", len(raw)
+    return raw, codec, len(raw)
+
+
+def _decode(data: bytes, codec: str):
+    if codec.endswith("+z"):
+        data, codec = zlib.decompress(data), codec[:-2]
+    if codec == "str":
+        return data.decode("utf-8")
+    if codec == "bytes":
+        return data
+    return pickle.loads(data)
+
+
+class SessionStore:
+    def __init__(self, session_id: str, budget: int = BUDGET_BYTES, spill_cc=None):
+        """`spill_cc` is a zero-arg callable returning a container client (None disables spilling)."""
+        self.session_id = session_id
+        self.budget = budget
+        self._spill_cc = spill_cc
+        self._items: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.evictions = 0
+        self.spills = 0
+        self._spilled: set[str] = set()   # live spill paths, shared with the finalizer below
+        weakref.finalize(self, _drop_spills, spill_cc, self._spilled)
+        _stores[session_id] = self
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._items
+
+    def keys(self, prefix: str = "") -> list[str]:
+        return [k for k in self._items if k.startswith(prefix)]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(e.data) for e in self._items.values() if e.spilled is None)
+
+    def put(self, key: str, value, kind: str = ARTIFACT):
+        if value is None:
+            self.pop(key)
+            return
+        data, codec, raw_len = _encode(value)
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None and old.spilled:
+                self._delete_spill(old.spilled)
+            self._items[key] = _Entry(kind, data, codec, raw_len)
+            self._enforce()
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            e = self._items.get(key)
+            if e is None:
+                return default
+            if e.spilled is not None:
+                try:
+                    e.data = self._spill_cc().download_blob(e.spilled).readall()
+                except Exception:
+                    return default
+                self._delete_spill(e.spilled)
+                e.spilled = None
+            e.touched = time.time()
+            self._items.move_to_end(key)
+            value = _decode(e.data, e.codec)
+            self._enforce(keep=key)
+            return value
+
+    def pop(self, key: str, default=None):
+        with self._lock:
+            if key not in self._items:
+                return default
+            value = self.get(key, default)
+            e = self._items.pop(key, None)
+            if e is not None and e.spilled:
+                self._delete_spill(e.spilled)
+            return value
+
+    def clear(self, kind: str | None = None):
+        with self._lock:
+            for key in [k for k, e in self._items.items() if kind in (None, e.kind)]:
+                e = self._items.pop(key)
+                if e.spilled:
+                    self._delete_spill(e.spilled)
+
+    # ---- budget ----
+    def _enforce(self, keep: str | None = None):
+        """Evict LRU artifacts, then spill LRU drafts, until under budget. Drafts are never dropped."""
+        size = self.nbytes
+        if size <= self.budget:
+            return
+        for key in [k for k, e in self._items.items() if e.kind == ARTIFACT and k != keep]:
+            size -= len(self._items.pop(key).data)
+            self.evictions += 1
+            if size <= self.budget:
+                return
+        if not (SPILL_DRAFTS and self._spill_cc):
+            return
+        for key, e in list(self._items.items()):
+            if e.kind != DRAFT or e.spilled is not None or key == keep:
+                continue
+            if self._spill(key, e):
+                size -= len(e.data)
+                e.data = b""
+                if size <= self.budget:
+                    return
+
+    def _spill_path(self, key: str) -> str:
+        safe = "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in key)
+        return f"{SPILL_PREFIX}/{self.session_id}/{safe}"
+
+    def _spill(self, key: str, e: _Entry) -> bool:
+        path = self._spill_path(key)
+        try:
+            self._spill_cc().upload_blob(path, e.data, overwrite=True)
+        except Exception:
+            return False
+        e.spilled = path
+        self._spilled.add(path)
+        self.spills += 1
+        return True
+
+    def _delete_spill(self, path: str):
+        self._spilled.discard(path)
+        try:
+            self._spill_cc().delete_blob(path)
+        except Exception:
+            pass
+
+    # ---- reporting ----
+    def report(self) -> dict:
+        with self._lock:
+            by_kind: dict[str, dict] = {}
+            for e in self._items.values():
+                k = by_kind.setdefault(e.kind, {"items": 0, "stored_bytes": 0, "raw_bytes": 0, "spilled": 0})
+                k["items"] += 1
+                k["raw_bytes"] += e.raw_len
+                if e.spilled is None:
+                    k["stored_bytes"] += len(e.data)
+                else:
+                    k["spilled"] += 1
+            return {
+                "session": self.session_id,
+                "stored_bytes": self.nbytes,
+                "budget_bytes": self.budget,
+                "items": len(self._items),
+                "evictions": self.evictions,
+                "spills": self.spills,
+                "kinds": by_kind,
+            }
+
+
+def _drop_spills(spill_cc, paths: set[str]):
+    """Finalizer: delete a dead store's spill blobs, off the garbage collector's thread."""
+    if not (spill_cc and paths):
+        return
+
+    def _run(todo):
+        cc = spill_cc()
+        for path in todo:
+            try:
+                cc.delete_blob(path)
+            except Exception:
+                pass
+    threading.Thread(target=_run, args=(list(paths),), name="session-spill-cleanup", daemon=True).start()
+
+
+def prune_spills(cc, older_than_hours: float = 24.0, dry_run: bool = False) -> int:
+    """Delete spill blobs older than `older_than_hours` that no live session in this process owns.
+
+    Sessions are in-memory, so after a restart every spill blob is an orphan; the age
+    cutoff keeps other instances' sessions safe. Returns how many were (or would be) removed.
+    """
+    cutoff = time.time() - older_than_hours * 3600
+    live = {f"{SPILL_PREFIX}/{sid}/" for sid in list(_stores.keys())}
+    removed = 0
+    for b in cc.list_blobs(name_starts_with=SPILL_PREFIX + "/"):
+        modified = b.last_modified
+        modified = modified.timestamp() if hasattr(modified, "timestamp") else float(modified or 0)
+        if modified >= cutoff or any(b.name.startswith(p) for p in live):
+            continue
+        if dry_run:
+            removed += 1
+            continue
+        try:
+            cc.delete_blob(b.name)
+            removed += 1
+        except Exception:
+            pass
+    return removed
+
+
+def get_store(spill_cc=None) -> SessionStore:
+    """The current Streamlit session's store (created on first use)."""
+    import streamlit as st
+    store = st.session_state.get(_SLOT)
+    if store is None:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        store = SessionStore(ctx.session_id if ctx else "local", spill_cc=spill_cc)
+        st.session_state[_SLOT] = store
+    return store
+
+
+def all_sessions() -> list[dict]:
+    """Reports for every live session in this process, largest first."""
+    return sorted((s.report() for s in list(_stores.values())), key=lambda r: -r["stored_bytes"])
@@ -0,0 +1,169 @@
+# similarity.py
+# Local candidate-similarity index (no external API).
+#
+# Each candidate becomes one float32 row made of three hashed blocks:
+#   - Athena ordinal ratings  (measure → poor..unique+excellent as 1..4, via encoding.py)
+#   - Genos bands             (trait → Very Low..Very High as 1..5, via encoding.py)
+#   - summary text            (hashed TF-IDF over word unigrams/bigrams)
+# Blocks are L2-normalized and weighted, so a dot product is a weighted cosine.
+# Rows live in a growable NumPy matrix; upserts are O(dims), and a top-k query is
+# one mat-vec plus argpartition (a few ms for 50k candidates).
+import re
+import threading
+import zlib
+
+import numpy as np
+
+import encoding
+
+ATHENA_DIMS = 128
+GENOS_DIMS = 64
+TEXT_DIMS = 256
+WEIGHTS = {"athena": 0.4, "genos": 0.3, "text": 0.3}
+
+_TOKEN_RE = re.compile(r"[a-z][a-z0-9']+")
+_STOP = frozenset("the and for with that this are was were has have had from but not his her their they "
+                  "she him its our you your a an of to in on at by as is be or it".split())
+
+
+def _h(s: str, dims: int) -> int:
+    return zlib.crc32(s.encode("utf-8")) % dims
+
+
+def athena_rank(value: str) -> int:
+    """Highest rating mentioned in an Athena cell ('unique + excellent' → 4)."""
+    return encoding.rating_rank(value)
+
+
+def genos_rank(value: str) -> int:
+    return encoding.band_code(value)
+
+
+def _tokens(text: str) -> list[str]:
+    words = [w for w in _TOKEN_RE.findall((text or "").lower()) if w not in _STOP]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def _unit(v: np.ndarray) -> np.ndarray:
+    n = float(np.linalg.norm(v))
+    return v / n if n else v
+
+
+class SimilarityIndex:
+    def __init__(self, capacity: int = 1024):
+        self.dims = ATHENA_DIMS + GENOS_DIMS + TEXT_DIMS
+        self._m = np.zeros((capacity, self.dims), dtype=np.float32)
+        self._tf: dict[str, np.ndarray] = {}          # raw text term counts, for idf refreshes
+        self._df = np.zeros(TEXT_DIMS, dtype=np.float64)
+        self._idf = np.ones(TEXT_DIMS, dtype=np.float32)
+        self._idf_docs = 0
+        self._rows: dict[str, int] = {}
+        self._names: list[str] = []
+        self._digests: dict[str, str] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._names)
+
+    def names(self) -> list[str]:
+        with self._lock:
+            return list(self._names)
+
+    def is_current(self, cand: str, digest: str) -> bool:
+        return self._digests.get(cand) == digest
+
+    # ---- vectorizing ----
+    def _structured(self, athena: dict[str, str], genos: dict[str, str]) -> np.ndarray:
+        a = np.zeros(ATHENA_DIMS, dtype=np.float32)
+        for m, v in (athena or {}).items():
+            a[_h(m.strip().lower(), ATHENA_DIMS)] += athena_rank(v) / 4.0
+        g = np.zeros(GENOS_DIMS, dtype=np.float32)
+        for t, v in (genos or {}).items():
+            g[_h(t.strip().lower(), GENOS_DIMS)] += genos_rank(v) / 5.0
+        return np.concatenate([WEIGHTS["athena"] ** 0.5 * _unit(a), WEIGHTS["genos"] ** 0.5 * _unit(g)])
+
+    def _text_block(self, tf: np.ndarray) -> np.ndarray:
+        return WEIGHTS["text"] ** 0.5 * _unit(np.log1p(tf) * self._idf)
+
+    def _refresh_idf(self):
+        """Recompute idf and re-weight every text block; amortized by doubling thresholds."""
+        n = len(self._names)
+        self._idf = (np.log((1 + n) / (1 + self._df)) + 1).astype(np.float32)
+        self._idf_docs = n
+        off = ATHENA_DIMS + GENOS_DIMS
+        for name, row in self._rows.items():
+            self._m[row, off:] = self._text_block(self._tf[name])
+
+    # ---- updates ----
+    def upsert(self, cand: str, athena: dict[str, str], genos: dict[str, str], summary: str,
+               digest: str | None = None):
+        """Add or replace one candidate. `digest` lets callers skip unchanged rows."""
+        with self._lock:
+            if digest is not None and self._digests.get(cand) == digest:
+                return
+            tf = np.zeros(TEXT_DIMS, dtype=np.float32)
+            for tok in _tokens(summary):
+                tf[_h(tok, TEXT_DIMS)] += 1
+            old = self._tf.get(cand)
+            if old is not None:
+                self._df -= old > 0
+            self._df += tf > 0
+            self._tf[cand] = tf
+
+            row = self._rows.get(cand)
+            if row is None:
+                row = len(self._names)
+                if row >= self._m.shape[0]:
+                    grown = np.zeros((self._m.shape[0] * 2, self.dims), dtype=np.float32)
+                    grown[:row] = self._m[:row]
+                    self._m = grown
+                self._rows[cand] = row
+                self._names.append(cand)
+            self._m[row] = np.concatenate([self._structured(athena, genos), self._text_block(tf)])
+            if digest is not None:
+                self._digests[cand] = digest
+            if len(self._names) >= max(8, 2 * self._idf_docs):
+                self._refresh_idf()
+
+    def remove(self, cand: str):
+        with self._lock:
+            row = self._rows.pop(cand, None)
+            if row is None:
+                return
+            self._df -= self._tf.pop(cand) > 0
+            self._digests.pop(cand, None)
+            last = len(self._names) - 1
+            if row != last:  # move the last row into the hole
+                moved = self._names[last]
+                self._m[row] = self._m[last]
+                self._names[row] = moved
+                self._rows[moved] = row
+            self._m[last] = 0
+            self._names.pop()
+
+    # ---- queries ----
+    def top_k(self, cand: str, k: int = 5, *, contrasting: bool = False,
+              among: list[str] | None = None) -> list[tuple[str, float]]:
+        """Most similar (or most contrasting) candidates to `cand`, best first."""
+        with self._lock:
+            row = self._rows.get(cand)
+            n = len(self._names)
+            if row is None or n < 2:
+                return []
+            scores = self._m[:n] @ self._m[row]
+            scores[row] = np.nan
+            if among is not None:
+                mask = np.ones(n, dtype=bool)
+                mask[[self._rows[c] for c in among if c in self._rows]] = False
+                scores[mask] = np.nan
+            if contrasting:
+                scores = -scores
+            scores = np.nan_to_num(scores, nan=-np.inf)
+            valid = int(np.isfinite(scores).sum())
+            k = min(k, valid)
+            if k <= 0:
+                return []
+            idx = np.argpartition(-scores, k - 1)[:k]
+            idx = idx[np.argsort(-scores[idx])]
+            sign = -1.0 if contrasting else 1.0
+            return [(self._names[i], float(sign * scores[i])) for i in idx]
@@ -0,0 +1,174 @@
+# storage.py
+# Transparent compression for the text blobs the app writes: CSVs, summaries,
+# archived HTML reports, JSON/text sidecars.
+#
+# upload() compresses text-like payloads of at least MIN_BYTES and records the codec
+# in the blob's Content-Encoding property; download() asks for the stored bytes
+# (decompress=False, so the HTTP transport doesn't decode some encodings and not
+# others) and decodes by that property. Blobs without a Content-Encoding read back
+# unchanged, so old and new blobs mix freely; migrate() rewrites existing ones.
+#
+#   STORAGE_CODEC=gzip   default; browsers decode it too, so SAS links keep working
+#   STORAGE_CODEC=zstd   faster and smaller; needs the `zstandard` package (else gzip)
+#   STORAGE_CODEC=none   write uncompressed (reads still decode)
+#
+# PDFs, DOCX, PNGs and zips are already compressed and are stored as-is; that also
+# keeps documents.py's range reads valid for them.
+import gzip
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger("storage")
+
+CODEC = os.getenv("STORAGE_CODEC", "gzip").lower()
+MIN_BYTES = int(os.getenv("STORAGE_COMPRESS_MIN", "512"))
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 6
+TEXT_TYPES = ("text/", "application/json", "application/xml", "image/svg+xml")
+TEXT_EXTS = (".csv", ".txt", ".html", ".htm", ".json", ".md", ".xml", ".svg")
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+try:
+    import zstandard as _zstd
+except ImportError:
+    _zstd = None
+
+
+def codec() -> str | None:
+    """The Content-Encoding new writes use (None = uncompressed)."""
+    if CODEC in ("", "none", "identity"):
+        return None
+    if CODEC == "zstd" and _zstd is None:
+        return "gzip"
+    return CODEC if CODEC in ("gzip", "zstd") else "gzip"
+
+
+def compressible(name: str, content_type: str | None, size: int) -> bool:
+    if size < MIN_BYTES:
+        return False
+    if content_type:
+        return content_type.startswith(TEXT_TYPES)
+    return name.lower().endswith(TEXT_EXTS)
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return _zstd.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    # mtime=0: the same text always gives the same bytes (stable MD5s, no churn on rewrites)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def decompress(data: bytes, encoding: str | None) -> bytes:
+    """Decode by Content-Encoding; bytes that don't carry the codec's magic are returned as-is."""
+    if encoding == "gzip" and data[:2] == _GZIP_MAGIC:
+        return gzip.decompress(data)
+    if encoding == "zstd" and data[:4] == _ZSTD_MAGIC:
+        if _zstd is None:
+            raise RuntimeError("blob is zstd-encoded; install the `zstandard` package to read it")
+        return _zstd.ZstdDecompressor().decompress(data)
+    return data
+
+
+def _encoding_of(props) -> str | None:
+    settings = getattr(props, "content_settings", None)
+    return (getattr(settings, "content_encoding", None) or "").lower() or None
+
+
+def encode(name: str, data: bytes, content_type: str | None = None,
+           force: bool | None = None) -> tuple[bytes, str | None]:
+    """(stored bytes, Content-Encoding) for a payload; force=True/False overrides the type/size check."""
+    enc = codec() if force is not False else None
+    if enc is None or (force is None and not compressible(name, content_type, len(data))):
+        return data, None
+    body = compress(data, enc)
+    if len(body) >= len(data):   # tiny or incompressible after all
+        return data, None
+    return body, enc
+
+
+def upload(cc, name: str, data: bytes | str, *, content_type: str | None = None,
+           overwrite: bool = True, metadata: dict | None = None, compress: bool | None = None, **kw) -> dict:
+    """upload_blob with compression. Returns the upload result plus the stored 'size'."""
+    from azure.storage.blob import ContentSettings   # the SDK is ~200 ms to import; search_index imports us
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    body, enc = encode(name, data, content_type, compress)
+    settings = ContentSettings(content_type=content_type, content_encoding=enc)
+    res = cc.upload_blob(name, body, overwrite=overwrite, metadata=metadata, content_settings=settings, **kw)
+    return {**(res or {}), "size": len(body)}
+
+
+def download(cc, name: str, **kw) -> bytes:
+    """Blob content, decompressed if it was stored with a Content-Encoding."""
+    stream = cc.download_blob(name, decompress=False, **kw)
+    data = stream.readall()
+    return decompress(data, _encoding_of(getattr(stream, "properties", None)))
+
+
+def download_text(cc, name: str) -> str | None:
+    """UTF-8 text of a blob, or None if it's missing or unreadable."""
+    try:
+        return download(cc, name).decode("utf-8", errors="replace")
+    except Exception:
+        return None
+
+
+def is_encoded(props) -> bool:
+    return _encoding_of(props) is not None
+
+
+# ---------- migration ----------
+
+def migrate(cc, prefix: str = "", *, dry_run: bool = False, max_workers: int = 8,
+            record: bool = False) -> dict:
+    """Recompress existing uncompressed text blobs under `prefix` in place.
+
+    Each rewrite is conditional on the ETag it was read at, so a blob written
+    meanwhile is skipped rather than overwritten. With record=True the rewrite is
+    logged for listing.py (the dashboard container).
+    """
+    from azure.core import MatchConditions
+    from azure.storage.blob import ContentSettings
+    from listing import CHANGE_PREFIX, record_change
+    stats = {"scanned": 0, "candidates": 0, "rewritten": 0, "skipped": 0, "failed": 0,
+             "bytes_before": 0, "bytes_after": 0}
+    todo = []
+    for b in cc.list_blobs(name_starts_with=prefix or None, include=["metadata"]):
+        stats["scanned"] += 1
+        if b.name.startswith(CHANGE_PREFIX + "/") or is_encoded(b):
+            continue
+        ctype = getattr(getattr(b, "content_settings", None), "content_type", None)
+        if compressible(b.name, ctype, b.size or 0):
+            todo.append((b.name, b.etag, ctype, dict(b.metadata or {})))
+    stats["candidates"] = len(todo)
+
+    def _one(item):
+        name, etag, ctype, meta = item
+        raw = download(cc, name)
+        body, enc = encode(name, raw, ctype)
+        if enc is None:
+            return "skipped", len(raw), len(raw)
+        if dry_run:
+            return "rewritten", len(raw), len(body)
+        res = cc.upload_blob(name, body, overwrite=True, metadata=meta,
+                             content_settings=ContentSettings(content_type=ctype, content_encoding=enc),
+                             etag=etag, match_condition=MatchConditions.IfNotModified)
+        if record:
+            record_change(cc, "put", name, etag=(res or {}).get("etag"), size=len(body))
+        return "rewritten", len(raw), len(body)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        for item, fut in [(i, ex.submit(_one, i)) for i in todo]:
+            try:
+                outcome, before, after = fut.result()
+            except Exception as e:   # changed underneath us, or unreadable
+                log.warning("compress %s failed: %s", item[0], e)
+                stats["failed"] += 1
+                continue
+            stats[outcome] += 1
+            stats["bytes_before"] += before
+            stats["bytes_after"] += after
+    return stats
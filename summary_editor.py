@@ -1,7 +1,8 @@
 import os
 import streamlit as st
-from azure.storage.blob import BlobServiceClient, ContentSettings
-from azure.identity import DefaultAzureCredential
+from azure.storage.blob import BlobServiceClient
+
+import storage
 
 st.set_page_config(page_title="Summary Editor", page_icon="✏️", layout="wide")
 
@@ -13,6 +14,7 @@ def make_bsc():
     if conn_str:
         return BlobServiceClient.from_connection_string(conn_str)
     acct = os.getenv("AZURE_STORAGE_ACCOUNT_NAME")
+    from azure.identity import DefaultAzureCredential  # only needed without a connection string
     cred = DefaultAzureCredential(exclude_shared_token_cache_credential=True)
     return BlobServiceClient(account_url=f"https://{acct}.blob.core.windows.net", credential=cred)
 
@@ -20,19 +22,15 @@ def load_summary_text(cand: str) -> str:
     if not cand:
         return ""
     cc = make_bsc().get_container_client(CONTAINER)
-    try:
-        return cc.download_blob(f"{cand}/summary.txt").readall().decode("utf-8", errors="replace")
-    except Exception:
-        return ""
+    return storage.download_text(cc, f"{cand}/summary.txt") or ""
 
 def save_summary_text(cand: str, text: str):
     cc = make_bsc().get_container_client(CONTAINER)
-    cc.upload_blob(
-        f"{cand}/summary.txt",
-        text.encode("utf-8"),
-        overwrite=True,
-        content_settings=ContentSettings(content_type="text/plain"),
-    )
+    res = storage.upload(cc, f"{cand}/summary.txt", text, content_type="text/plain")
+    from listing import record_change
+    record_change(cc, "put", f"{cand}/summary.txt", etag=res.get("etag"), size=res["size"])
+    from search_index import index_blob
+    index_blob("dashboard", f"{cand}/summary.txt", text, etag=res.get("etag"))
 
 # Accept candidate from session OR URL (?candidate=slug)
 cand = (
@@ -0,0 +1,38 @@
+# tests/conftest.py
+# The app is flat top-level modules; the tests import them (and benchmarks/fakes.py) directly.
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "benchmarks")]
+
+
+def run_clean(code: str, env: dict | None = None, timeout: float = 120,
+              script: str | None = None) -> subprocess.CompletedProcess:
+    """Run `code` in a fresh interpreter with the repo importable (a process with its own encoding vocab).
+
+    With `script`, the code is saved to that path and run as a file: spawned worker
+    processes re-run its top level (everything outside the __main__ guard) as they start.
+    """
+    full_env = {**os.environ, "PYTHONPATH": os.pathsep.join([ROOT, os.path.join(ROOT, "benchmarks")]),
+                **(env or {})}
+    args = ["-c", code]
+    if script:
+        with open(script, "w") as f:
+            f.write(code)
+        args = [script]
+    return subprocess.run([sys.executable, *args], cwd=ROOT, env=full_env, capture_output=True,
+                          text=True, timeout=timeout)
+
+
+@pytest.fixture
+def store():
+    """benchmarks/fakes.py in-memory blob storage, emptied for each test."""
+    import fakes
+    fakes.install_storage()
+    fakes.STORE.reset()
+    yield fakes.STORE
+    fakes.STORE.reset()
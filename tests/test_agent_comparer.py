@@ -0,0 +1,22 @@
+# tests/test_agent_comparer.py
+import agent_comparer as ac
+
+
+def test_routes():
+    assert ac.choose_route(1, 2000) == "fast"
+    assert ac.choose_route(1, 2000, final=True) == "strong"
+    assert ac.choose_route(ac.STRONG_MIN_OTHERS, 2000) == "strong"
+    assert ac.choose_route(1, ac.STRONG_MIN_CHARS) == "strong"
+
+
+def test_cached_tokens_are_only_discounted_where_the_route_prices_them():
+    p_in, p_out, p_cached = ac.ROUTES["strong"]["prices"]
+    assert p_cached == p_in   # gpt-4: no prompt caching, no discount
+    assert ac._cost("strong", 2000, 1024, 100) == ac._cost("strong", 2000, 0, 100)
+    assert ac._cost("fast", 2000, 1024, 100) < ac._cost("fast", 2000, 0, 100)
+
+
+def test_instructions_lead_and_inputs_follow():
+    msgs = ac._build_messages(ac._build_summary_prompt("A's summary", {"B": "B's summary"}, "A"))
+    assert msgs[0] == {"role": "system", "content": ac.INSTRUCTIONS}
+    assert msgs[1]["content"].index("A's summary") < msgs[1]["content"].index("B's summary")
@@ -0,0 +1,72 @@
+# tests/test_api.py
+import gzip
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import api
+import listing
+
+
+@pytest.fixture
+def server(store):
+    import fakes
+    listing._listings.clear()
+    cands = fakes.seed_bank(3, "dashboard", 7)
+    app = api.Api()
+    app.bank.listing.refresh(full=True)
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), api.make_handler(app))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}", app, cands
+    httpd.shutdown()
+    httpd.server_close()
+    listing._listings.clear()
+
+
+def _get(url: str, **headers):
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers)) as r:
+            return r.status, dict(r.headers), r.read()
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), e.read()
+
+
+def test_unchanged_resources_revalidate_with_304(server):
+    base, app, cands = server
+    status, headers, body = _get(f"{base}/candidates/{cands[0]}/summary")
+    assert status == 200 and json.loads(body)["name"] == cands[0]
+    etag = headers["ETag"]
+
+    status, headers, body = _get(f"{base}/candidates/{cands[0]}/summary", **{"If-None-Match": etag})
+    assert (status, body, headers["ETag"]) == (304, b"", etag)
+    status, _, _ = _get(f"{base}/candidates/{cands[0]}/summary", **{"If-Modified-Since": headers["Last-Modified"]})
+    assert status == 304
+    assert app.cache.stats["builds"] == 1 and app.cache.stats["not_modified"] == 2
+
+
+def test_a_changed_candidate_gets_a_new_etag(server):
+    import records
+    base, app, cands = server
+    _, headers, _ = _get(f"{base}/candidates/{cands[1]}/summary")
+    cc = records.get_cc()
+    res = cc.upload_blob(f"{cands[1]}/summary.txt", b"rewritten summary", overwrite=True)
+    listing.record_change(cc, "put", f"{cands[1]}/summary.txt", etag=res.get("etag"), size=17)
+    app.bank.refresh()
+
+    status, new_headers, body = _get(f"{base}/candidates/{cands[1]}/summary", **{"If-None-Match": headers["ETag"]})
+    assert status == 200 and new_headers["ETag"] != headers["ETag"]
+    assert json.loads(body)["summary"] == "rewritten summary"
+
+
+def test_large_bodies_are_gzipped_and_errors_are_json(server):
+    base, _, cands = server
+    status, headers, body = _get(f"{base}/compare?c={cands[0]}&c={cands[1]}", **{"Accept-Encoding": "gzip"})
+    assert status == 200 and headers.get("Content-Encoding") == "gzip"
+    assert json.loads(gzip.decompress(body))["candidates"] == cands[:2]
+
+    status, headers, body = _get(f"{base}/candidates/Nobody")
+    assert status == 404 and "unknown candidate" in json.loads(body)["error"]
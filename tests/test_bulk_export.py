@@ -0,0 +1,65 @@
+# tests/test_bulk_export.py
+import io
+import zipfile
+
+import pytest
+
+import bulk_export
+
+
+def test_a_packet_that_fails_partway_is_only_counted_as_failed(store, monkeypatch):
+    import fakes
+    ok, bad = fakes.seed_bank(2, "dashboard", 1)
+    raw = store.get_container_client(bulk_export.RAW_CONTAINER)
+    for cand in (ok, bad):
+        for name in ("cv.pdf", "cover.pdf"):
+            raw.upload_blob(f"{cand}/{name}", b"%PDF-1.4 " + name.encode())
+
+    real_chunks = bulk_export.iter_chunks
+
+    def flaky_chunks(name, **kw):
+        if name == f"{bad}/cv.pdf":
+            raise OSError("connection reset")
+        return real_chunks(name, **kw)
+
+    monkeypatch.setattr(bulk_export, "iter_chunks", flaky_chunks)
+    buf = io.BytesIO()
+    manifest = bulk_export.write_export_zip(buf, [ok, bad], max_workers=2)
+
+    assert manifest["exported"] == [ok]
+    assert set(manifest["failed"]) == {bad} and "connection reset" in manifest["failed"][bad]
+    assert manifest["raw_files"] == 2
+    names = zipfile.ZipFile(buf).namelist()
+    assert f"{bad}/EXPORT_INCOMPLETE.txt" in names and f"{ok}/EXPORT_INCOMPLETE.txt" not in names
+
+
+def test_spool_is_closed_when_the_build_fails(monkeypatch):
+    spools = []
+    real = bulk_export.tempfile.SpooledTemporaryFile
+
+    def spy(*a, **kw):
+        spools.append(real(*a, **kw))
+        return spools[-1]
+
+    def boom(*a, **kw):
+        raise RuntimeError("render crashed")
+
+    monkeypatch.setattr(bulk_export.tempfile, "SpooledTemporaryFile", spy)
+    monkeypatch.setattr(bulk_export, "write_export_zip", boom)
+    with pytest.raises(RuntimeError):
+        bulk_export.build_export_file(["x"])
+    assert spools and spools[0].closed
+
+
+def test_browser_exports_go_through_storage_and_memory_is_capped(store, monkeypatch):
+    spool = bulk_export.tempfile.SpooledTemporaryFile()
+    spool.write(b"PK" + b"\0" * 100)
+    spool.seek(0)
+    with spool:
+        name, url = bulk_export.share_export(spool, "exports/test.zip")
+        # the in-memory store can't sign a SAS link: the caller falls back to download_payload
+        assert url is None
+        assert store.get_container_client("finished").download_blob(name).readall() == b"PK" + b"\0" * 100
+        assert bulk_export.download_payload(spool) == b"PK" + b"\0" * 100
+        monkeypatch.setattr(bulk_export, "DOWNLOAD_MAX_BYTES", 50)
+        assert bulk_export.download_payload(spool) is None
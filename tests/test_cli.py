@@ -0,0 +1,29 @@
+# tests/test_cli.py
+import json
+
+from conftest import run_clean
+
+# workers are spawned: each re-runs the top level, so each holds the same seeded store
+SCORE = (
+    "import sys, fakes\n"
+    "fakes.install_storage(); fakes.seed_bank(12, 'dashboard', 5)\n"
+    "if __name__ == '__main__':\n"
+    "    import cli\n"
+    "    sys.exit(cli.main(['--workers', '{workers}', 'score', '--where', 'genos empathy >= high',\n"
+    "                       '--order', '-genos empathy score, -fit']))\n"
+)
+
+
+def _score(workers: int, tmp_path) -> dict:
+    out = run_clean(SCORE.format(workers=workers), script=str(tmp_path / f"score_{workers}.py"))
+    lines = [ln for ln in out.stdout.splitlines() if ln.startswith("{")]
+    assert lines, out.stderr
+    return json.loads(lines[-1])
+
+
+def test_score_with_worker_processes_matches_inline(tmp_path):
+    inline, pooled = _score(1, tmp_path), _score(2, tmp_path)
+    assert inline["ok"], inline
+    assert pooled["ok"], pooled
+    assert pooled["matched"] == inline["matched"] > 0
+    assert [r["Candidate"] for r in pooled["rows"]] == [r["Candidate"] for r in inline["rows"]]
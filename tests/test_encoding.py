@@ -0,0 +1,66 @@
+# tests/test_encoding.py
+import base64
+import pickle
+
+import numpy as np
+import pandas as pd
+
+import encoding
+from conftest import run_clean
+
+
+def test_portable_round_trip_in_this_process():
+    codes = encoding.encode_genos(pd.DataFrame({"Measure": ["Empathy", "Drive"], "Raw Score": [85, 30]}))
+    back = encoding.localize(encoding.portable(codes))
+    assert [encoding.measure_name(int(m)) for m in back["measure"]] == ["empathy", "drive"]
+    assert np.array_equal(back["band"], codes["band"])
+
+
+def test_codes_from_another_process_keep_their_measures():
+    # the child sees these measures in a different order, so its ids differ from ours
+    out = run_clean(
+        "import base64, pickle, sys, pandas as pd, encoding\n"
+        "for m in ('Zeta', 'Drive', 'Tolerance'): encoding.measure_id(m)\n"
+        "codes = encoding.encode_genos(pd.DataFrame({'Measure': ['Empathy', 'Drive'], 'Raw Score': [85, 30]}))\n"
+        "sys.stdout.write(base64.b64encode(pickle.dumps(encoding.portable(codes))).decode())\n"
+    )
+    assert out.returncode == 0, out.stderr
+    encoding.measure_id("Empathy")   # make sure our own ids are in a different order
+    codes = encoding.localize(pickle.loads(base64.b64decode(out.stdout)))
+    assert [encoding.measure_name(int(m)) for m in codes["measure"]] == ["empathy", "drive"]
+    assert list(codes["band"]) == [5, 2]
+
+
+def test_shared_frame_cache_is_decoded_with_local_ids(tmp_path):
+    env = {"CACHE_BACKEND": "disk", "CACHE_DIR": str(tmp_path)}
+    writer = run_clean(
+        "import fakes, encoding, records\n"
+        "fakes.install_storage(); fakes.seed_bank(1, records.CONTAINER, 3)\n"
+        "rec = records.candidate_record('Candidate00000')\n"
+        "print(sorted(encoding.measure_name(int(m)) for m in rec['genos_codes']['measure']))\n",
+        env,
+    )
+    assert writer.returncode == 0, writer.stderr
+    # a second instance with a different vocabulary order, and nothing in its storage
+    reader = run_clean(
+        "import fakes, encoding, records\n"
+        "fakes.install_storage()\n"
+        "for m in ('Resilience', 'Zeta', 'Empathy', 'Tolerance'): encoding.measure_id(m)\n"
+        "rec = records.candidate_record('Candidate00000')\n"
+        "print(sorted(encoding.measure_name(int(m)) for m in rec['genos_codes']['measure']))\n",
+        env,
+    )
+    assert reader.returncode == 0, reader.stderr
+    assert reader.stdout.strip().splitlines()[-1] == writer.stdout.strip().splitlines()[-1]
+    assert "empathy" in reader.stdout
+
+
+def test_rating_mask_splits_on_every_separator():
+    both = encoding.RATING_BIT["satisfactory"] | encoding.RATING_BIT["excellent"]
+    for text in ("Satisfactory + Excellent", "Satisfactory, Excellent", "Satisfactory/Excellent",
+                 "Satisfactory and Excellent", "Satisfactory & Excellent", "satisfactory AND excellent",
+                 "Satisfactory&Excellent"):
+        assert encoding.rating_mask(text) == both, text
+    assert encoding.rating_rank("Poor and Unique") == encoding.RATING_RANK["unique"]
+    # "and" only splits as a whole word
+    assert encoding.rating_mask("Excellent") == encoding.RATING_BIT["excellent"]
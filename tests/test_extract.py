@@ -0,0 +1,29 @@
+# tests/test_extract.py
+import threading
+
+import extract
+
+
+def test_extraction_holds_at_most_a_window_of_documents(store, monkeypatch):
+    cc = store.get_container_client(extract.RAW_CONTAINER)
+    for i in range(60):
+        cc.upload_blob(f"Cand{i}/cv.pdf", b"%PDF-1.4 not really")
+    lock, live = threading.Lock(), {"now": 0, "peak": 0}
+    read_all = extract.read_all
+
+    def counting_read_all(*a, **kw):
+        with lock:
+            live["now"] += 1
+            live["peak"] = max(live["peak"], live["now"])
+        return read_all(*a, **kw)
+
+    def counting_extract(name, data):
+        with lock:
+            live["now"] -= 1
+        return ""
+
+    monkeypatch.setattr(extract, "read_all", counting_read_all)
+    monkeypatch.setattr(extract, "extract_text", counting_extract)
+    stats = extract.run_extraction(max_workers=1)
+    assert (stats["skipped"], stats["failed"]) == (60, 0)
+    assert live["peak"] <= 2 * extract.IO_WORKERS
@@ -0,0 +1,17 @@
+# tests/test_fakes.py
+import fakes
+
+
+def _cached(stub, prompt):
+    return stub._create(model="m", messages=[{"role": "user", "content": prompt}]).usage \
+        .prompt_tokens_details.cached_tokens
+
+
+def test_stub_caches_only_a_shared_prefix_of_1024_tokens():
+    stub = fakes.StubLLM(latency=0)
+    short_prefix = "x" * 4 * 300
+    assert _cached(stub, short_prefix + "a" * 8000) == 0
+    assert _cached(stub, short_prefix + "b" * 8000) == 0   # long prompts, short shared prefix
+    long_prefix = "y" * 4 * 1100
+    assert _cached(stub, long_prefix + "a" * 400) == 0     # first sight
+    assert _cached(stub, long_prefix + "b" * 400) == 1024  # 1100 shared tokens → 8 blocks of 128
@@ -0,0 +1,72 @@
+# tests/test_pairwise.py
+import itertools
+import types
+import uuid
+
+import pytest
+
+import pairwise
+
+
+@pytest.fixture
+def llm(store, monkeypatch):
+    import agent_comparer
+    import fakes
+    stub = fakes.StubLLM(latency=0)
+    monkeypatch.setattr(agent_comparer, "_client", stub)
+    return stub
+
+
+def _cohort(n: int) -> tuple[list[str], dict[str, str]]:
+    tag = uuid.uuid4().hex[:6]   # the "llm" cache is process-wide; keep each test's pairs apart
+    cands = [f"Cand{tag}{i}" for i in range(n)]
+    return cands, {c: f"{c} summary: steady, organised, strong empathy." for c in cands}
+
+
+def test_pair_key_is_order_free():
+    assert pairwise.pair_key("Bob", "ann") == pairwise.pair_key("ann", "Bob") == ("ann", "Bob")
+    assert pairwise._path("Bob", "ann") == pairwise._path("ann", "Bob") == "_pairs/ann--bob.json"
+
+
+def test_pairs_are_drafted_once_and_redrafted_only_when_an_input_changes(llm):
+    cands, summaries = _cohort(3)
+    res = pairwise.matrix(cands, summaries)
+    assert (res["drafted"], res["reused"], res["failed"], llm.calls) == (3, 0, {}, 3)
+
+    flipped = [(b, a) for a, b in itertools.combinations(cands, 2)]
+    res = pairwise.compute_pairs(flipped + flipped, summaries)
+    assert (res["drafted"], res["reused"], llm.calls) == (0, 3, 3)
+
+    summaries[cands[0]] += " Updated after the interview."
+    res = pairwise.matrix(cands, summaries)
+    assert (res["drafted"], res["reused"], llm.calls) == (2, 1, 5)
+
+    # final wants strong-route briefs: the fast ones on file don't count
+    res = pairwise.compute_pairs([(cands[1], cands[2])], summaries, final=True)
+    assert res["drafted"] == 1 and res["pairs"][pairwise.pair_key(cands[1], cands[2])]["route"] == "strong"
+
+
+def test_group_view_is_assembled_from_stored_pairs(llm):
+    cands, summaries = _cohort(3)
+    me, others = cands[0], cands[1:]
+    res = pairwise.compute_pairs(pairwise.group_pairs(me, others[:1]), summaries)
+    text = pairwise.assemble_group(me, others, res["pairs"])
+    assert text.count("#### ") == 2 and "_No brief for this pair yet._" in text
+
+
+def test_quota_holds_call_starts_to_the_rpm_window(monkeypatch):
+    clock = {"now": 1000.0, "slept": 0.0}
+
+    def sleep(s):
+        clock["now"] += s
+        clock["slept"] += s
+
+    monkeypatch.setattr(pairwise, "time", types.SimpleNamespace(monotonic=lambda: clock["now"], sleep=sleep))
+    q = pairwise.Quota(concurrency=1, rpm=2)
+    for _ in range(2):
+        with q.slot():
+            pass
+    assert clock["slept"] == 0
+    with q.slot():
+        pass
+    assert clock["slept"] == pytest.approx(60)
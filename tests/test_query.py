@@ -0,0 +1,68 @@
+# tests/test_query.py
+import re
+
+import pandas as pd
+import pytest
+
+import encoding
+from query import BankQuery, QueryError
+
+
+def _genos(**scores) -> dict:
+    return encoding.encode_genos(pd.DataFrame({"Measure": list(scores), "Raw Score": list(scores.values())}))
+
+
+def _athena(**values) -> dict:
+    df = pd.DataFrame({"Trait": list(values), "Candidate Value": list(values.values()),
+                       "Top Performers": ["Excellent"] * len(values)})
+    return encoding.encode_athena(df)
+
+
+@pytest.fixture
+def bank() -> BankQuery:
+    q = BankQuery(capacity=2)   # grows past capacity on the third upsert
+    q.upsert("ann", _athena(Drive="Excellent"), _genos(Empathy=90, Resilience=30), echelon=7)
+    q.upsert("bob", _athena(Drive="Poor"), _genos(Empathy=55, Resilience=80), echelon=5)
+    q.upsert("cy", None, _genos(Empathy=20), echelon=8)
+    return q
+
+
+def _names(res: dict) -> list[str]:
+    return [r["Candidate"] for r in res["rows"]]
+
+
+def test_filters_combine_with_precedence_and_parentheses(bank):
+    assert _names(bank.query("genos empathy >= high", "-genos empathy")) == ["ann"]
+    assert _names(bank.query("genos empathy score < 60 and echelon >= 6 or fit >= 100%", "-echelon")) == ["cy", "ann"]
+    assert _names(bank.query("not (echelon > 6) && genos resilience score >= 50", "-fit")) == ["bob"]
+    # cy has no Resilience row, so no comparison on it matches cy
+    assert bank.query("genos resilience score < 100")["matched"] == 2
+
+
+def test_ranking_is_multi_key_with_missing_values_last(bank):
+    assert _names(bank.query("", "-fit, -echelon", k=3)) == ["ann", "bob", "cy"]
+    assert _names(bank.query("", "echelon asc")) == ["bob", "ann", "cy"]
+    assert _names(bank.query("", "-genos resilience score", k=2)) == ["bob", "ann"]
+    assert _names(bank.query("", "-echelon", among=["ann", "bob"])) == ["ann", "bob"]
+
+
+@pytest.mark.parametrize("where, message", [
+    ("genos empathy high", "Expected"),
+    ("genos empathy >=", "Missing value"),
+    ("shoe size > 3", "Unknown field"),
+    ("(echelon > 3", "Missing ')'"),
+    ("echelon > 3 and", "ends too early"),
+    ("genos empathy >= purple", "Can't compare"),
+])
+def test_bad_filters_raise_query_error(bank, where, message):
+    with pytest.raises(QueryError, match=re.escape(message)):
+        bank.query(where)
+
+
+def test_upsert_skips_unchanged_rows_and_remove_compacts(bank):
+    before = bank.query("", "-echelon")["rows"]
+    bank.upsert("bob", _athena(Drive="Poor"), _genos(Empathy=55, Resilience=80), echelon=5)
+    assert bank.query("", "-echelon")["rows"] == before
+    bank.remove("ann")
+    assert sorted(bank.names()) == ["bob", "cy"]
+    assert _names(bank.query("genos empathy score > 50")) == ["bob"]
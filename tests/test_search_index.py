@@ -0,0 +1,56 @@
+# tests/test_search_index.py
+import pytest
+
+import search_index
+from search_index import SearchIndex
+
+
+@pytest.fixture
+def fresh(store):
+    search_index._index, search_index._index_etag = None, None
+    yield store
+    search_index._index, search_index._index_etag = None, None
+
+
+def test_bm25_prefers_the_denser_match_and_filters_by_kind():
+    idx = SearchIndex()
+    idx.add("dashboard/a/summary.txt", "forklift certified, forklift lead", kind="summary")
+    idx.add("dashboard/b/summary.txt", "certified welder with some forklift hours on night shifts", kind="summary")
+    idx.add("finished/a/exports/x.html", "forklift forklift forklift", kind="export")
+    hits = idx.search("forklift", kind="summary")
+    assert [h["id"] for h in hits] == ["dashboard/a/summary.txt", "dashboard/b/summary.txt"]
+    assert SearchIndex.from_bytes(idx.to_bytes()).search("forklift", kind="summary") == hits
+
+
+def test_refresh_reconciles_with_storage(fresh):
+    import records
+    import storage
+    cc = records.get_cc()
+    storage.upload(cc, "ann/summary.txt", "Strong empathy, forklift certified")
+    stats = search_index.refresh()
+    assert stats["reindexed"] == 1 and stats["persisted"] is True
+    assert search_index.get_index().search("forklift")[0]["cand"] == "ann"
+
+    cc.delete_blob("ann/summary.txt")
+    assert search_index.refresh()["removed"] == 1
+    assert search_index.get_index().search("forklift") == []
+
+
+def test_persist_does_not_overwrite_another_instances_index(fresh):
+    a = search_index.get_index()
+    a.add("dashboard/ann/summary.txt", "forklift", kind="summary")
+    assert search_index.persist() is True
+    a_state = (search_index._index, search_index._index_etag)
+
+    # a second instance loads the blob, adds a doc and persists first
+    search_index._index, search_index._index_etag = None, None
+    b = search_index.get_index()
+    assert "dashboard/ann/summary.txt" in b.docs
+    b.add("dashboard/bob/summary.txt", "welder", kind="summary")
+    assert search_index.persist() is True
+
+    # the first instance's write is now stale: refused, and it reloads the newer blob
+    search_index._index, search_index._index_etag = a_state
+    a.add("dashboard/cy/summary.txt", "driver", kind="summary")
+    assert search_index.persist() is False
+    assert "dashboard/bob/summary.txt" in search_index.get_index().docs
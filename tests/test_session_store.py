@@ -0,0 +1,60 @@
+# tests/test_session_store.py
+import gc
+import time
+
+import pytest
+
+import session_store
+from session_store import DRAFT, SPILL_PREFIX, SessionStore, prune_spills
+
+
+@pytest.fixture
+def finished(store, monkeypatch):
+    monkeypatch.setattr(session_store, "SPILL_DRAFTS", True)
+    return store.get_container_client("finished")
+
+
+def _spills(cc) -> list[str]:
+    return sorted(b.name for b in cc.list_blobs(name_starts_with=SPILL_PREFIX + "/"))
+
+
+def _spilled_store(cc, sid: str) -> SessionStore:
+    s = SessionStore(sid, budget=100, spill_cc=lambda: cc)
+    s.put("draft-a", "a" * 80, DRAFT)
+    s.put("draft-b", "b" * 80, DRAFT)   # over budget: draft-a spills
+    assert _spills(cc) == [f"{SPILL_PREFIX}/{sid}/draft-a"]
+    return s
+
+
+def test_spill_blob_is_deleted_when_replaced_or_dropped(finished):
+    s = _spilled_store(finished, "s1")
+    s.put("draft-a", "new text", DRAFT)
+    assert s.get("draft-a") == "new text"
+    s.put("draft-b", "b" * 80, DRAFT)
+    s.put("draft-c", "c" * 80, DRAFT)
+    assert _spills(finished)
+    s.clear()
+    assert _spills(finished) == []
+
+
+def test_spill_blobs_are_deleted_when_the_session_ends(finished):
+    s = _spilled_store(finished, "s2")
+    del s
+    gc.collect()
+    end = time.monotonic() + 5
+    while _spills(finished) and time.monotonic() < end:
+        time.sleep(0.01)
+    assert _spills(finished) == []
+
+
+def test_prune_spills_keeps_live_and_recent_drafts(finished, store):
+    live = _spilled_store(finished, "live")
+    finished.upload_blob(f"{SPILL_PREFIX}/dead/draft-x", b"x")
+    finished.upload_blob(f"{SPILL_PREFIX}/recent/draft-y", b"y")
+    for name in (f"{SPILL_PREFIX}/dead/draft-x", f"{SPILL_PREFIX}/live/draft-a"):
+        store._data["finished"][name][1]["last_modified"] = time.time() - 48 * 3600
+
+    assert prune_spills(finished, 24, dry_run=True) == 1
+    assert prune_spills(finished, 24) == 1
+    assert _spills(finished) == [f"{SPILL_PREFIX}/live/draft-a", f"{SPILL_PREFIX}/recent/draft-y"]
+    assert live.get("draft-a") == "a" * 80
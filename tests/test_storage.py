@@ -0,0 +1,70 @@
+# tests/test_storage.py
+import random
+
+import pytest
+
+import storage
+
+TEXT = ("Name,Trait,Score\n" + "Ann,Empathy,5\n" * 200).encode()
+NOISE = random.Random(0).randbytes(2048)
+
+
+@pytest.fixture
+def cc(store):
+    return store.get_container_client("dashboard")
+
+
+def _stored(cc, name: str) -> tuple[bytes, str | None]:
+    dl = cc.download_blob(name)
+    return dl.readall(), storage._encoding_of(dl.properties)
+
+
+def test_text_round_trips_gzipped(cc):
+    res = storage.upload(cc, "Ann/athena.csv", TEXT, content_type="text/csv")
+    body, enc = _stored(cc, "Ann/athena.csv")
+    assert enc == "gzip" and body[:2] == b"\x1f\x8b" and res["size"] == len(body) < len(TEXT)
+    assert storage.download(cc, "Ann/athena.csv") == TEXT
+    assert storage.download_text(cc, "Ann/athena.csv") == TEXT.decode()
+    # mtime=0: rewriting the same text stores the same bytes
+    storage.upload(cc, "Ann/athena.csv", TEXT, content_type="text/csv")
+    assert _stored(cc, "Ann/athena.csv")[0] == body
+
+
+@pytest.mark.parametrize("name, data, ctype", [
+    ("Ann/summary.txt", b"short summary", "text/plain"),
+    ("Ann/cv.pdf", b"%PDF-1.4" + TEXT, None),
+    ("Ann/notes.txt", NOISE, "text/plain"),
+], ids=["under-min-bytes", "pdf", "incompressible"])
+def test_payloads_that_are_not_worth_compressing_are_stored_as_is(cc, name, data, ctype):
+    storage.upload(cc, name, data, content_type=ctype)
+    assert _stored(cc, name) == (data, None)
+    assert storage.download(cc, name) == data
+
+
+def test_codec_none_still_reads_compressed_blobs(cc, monkeypatch):
+    storage.upload(cc, "Ann/athena.csv", TEXT, content_type="text/csv")
+    monkeypatch.setattr(storage, "CODEC", "none")
+    storage.upload(cc, "Bob/athena.csv", TEXT, content_type="text/csv")
+    assert _stored(cc, "Bob/athena.csv") == (TEXT, None)
+    assert storage.download(cc, "Ann/athena.csv") == storage.download(cc, "Bob/athena.csv") == TEXT
+
+
+def test_zstd_falls_back_to_gzip_without_the_package(monkeypatch):
+    monkeypatch.setattr(storage, "CODEC", "zstd")
+    assert storage.codec() == ("zstd" if storage._zstd else "gzip")
+    enc = storage.codec()
+    assert storage.decompress(storage.compress(TEXT, enc), enc) == TEXT
+    assert storage.decompress(TEXT, "gzip") == TEXT   # no magic: returned as-is
+
+
+def test_migrate_recompresses_old_blobs_in_place(cc):
+    cc.upload_blob("Ann/athena.csv", TEXT)
+    cc.upload_blob("Ann/cv.pdf", b"%PDF" + TEXT)
+    assert storage.migrate(cc, dry_run=True)["rewritten"] == 1
+    assert _stored(cc, "Ann/athena.csv") == (TEXT, None)
+
+    stats = storage.migrate(cc, record=True)
+    assert stats["rewritten"] == 1 and stats["failed"] == 0 and stats["bytes_after"] < stats["bytes_before"]
+    assert _stored(cc, "Ann/athena.csv")[1] == "gzip"
+    assert storage.download(cc, "Ann/athena.csv") == TEXT
+    assert storage.migrate(cc)["candidates"] == 0   # already encoded: nothing left to do
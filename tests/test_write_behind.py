@@ -0,0 +1,54 @@
+# tests/test_write_behind.py
+import time
+
+from write_behind import WriteBehindQueue
+
+
+def _settle(q: WriteBehindQueue, group: str, timeout: float = 5.0) -> dict:
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        st = q.status(group)
+        if st["pending"] == 0:
+            return st
+        time.sleep(0.01)
+    raise AssertionError(f"queue didn't settle: {q.status(group)}")
+
+
+def _boom():
+    raise OSError("storage down")
+
+
+def test_failure_clears_after_a_later_successful_write():
+    q = WriteBehindQueue(max_workers=2, retries=1, backoff=0)
+    q.submit("cand", "finished/a.html", _boom)
+    st = _settle(q, "cand")
+    assert st["failed"] == 1 and "storage down" in st["last_error"]
+
+    q.submit("cand", "finished/a.html", lambda: None)
+    st = _settle(q, "cand")
+    assert st == {"pending": 0, "done": 1, "failed": 0, "last_error": None}
+
+
+def test_other_targets_failure_stays_reported():
+    q = WriteBehindQueue(max_workers=2, retries=1, backoff=0)
+    q.submit("cand", "finished/a.html", _boom)
+    q.submit("cand", "finished/b.txt", lambda: None)
+    st = _settle(q, "cand")
+    assert st["failed"] == 1 and st["last_error"].startswith("finished/a.html")
+
+
+def test_same_target_runs_in_submission_order():
+    q = WriteBehindQueue(max_workers=4, retries=1, backoff=0)
+    seen = []
+    for i in range(20):
+        q.submit("cand", "finished/a.html", seen.append, i)
+    _settle(q, "cand")
+    assert seen == list(range(20))
+
+
+def test_a_final_failure_is_reported_without_another_backoff():
+    q = WriteBehindQueue(max_workers=1, retries=2, backoff=1.0)
+    t = time.monotonic()
+    q.submit("cand", "finished/a.html", _boom)
+    st = _settle(q, "cand")
+    assert st["failed"] == 1 and time.monotonic() - t < 1.9   # one 1 s backoff between the two tries
@@ -1,7 +1,9 @@
 import os, re, unicodedata, zipfile, io
 from pathlib import Path
 import streamlit as st
-from azure.storage.blob import BlobServiceClient, ContentSettings
+from azure.storage.blob import BlobServiceClient
+
+import storage
 
 RAW_CONTAINER = os.getenv("RAW_CONTAINER", "raw")
 bsc = BlobServiceClient.from_connection_string(os.environ["AZURE_STORAGE_CONNECTION_STRING"])
@@ -16,7 +18,6 @@ def to_pascal_compact(name: str) -> str:
 
 from pathlib import Path
 import streamlit as st
-from azure.storage.blob import ContentSettings
 
 st.subheader("Upload candidate folder")
 
@@ -46,14 +47,17 @@ if uploaded_files and candidate_name and st.button("Upload", key="upload_btn"):
             else "application/octet-stream"
         )
 
-        cc.upload_blob(
-            name=blob_name,
-            data=file_data,
-            overwrite=True,
-            content_settings=ContentSettings(content_type=content_type),
-        )
+        # CSVs are stored gzip-encoded; PDF/DOCX as-is (storage.py decides by type)
+        storage.upload(cc, blob_name, file_data, content_type=content_type)
 
     st.success(f"Uploaded {len(uploaded_files[:5])} files to raw/{candidate_id}/")
 
+    # Pull text out of any PDF/DOCX and render previews in the background (once per file version)
+    if any(f.name.lower().endswith((".pdf", ".docx")) for f in uploaded_files[:5]):
+        from extract import start_background_extraction
+        start_background_extraction([candidate_id])
+        from previews import start_background_previews
+        start_background_previews([candidate_id])
+
 
 
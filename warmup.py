@@ -0,0 +1,138 @@
+# warmup.py
+# Boot-time warm-up: pay the slow imports, client construction and first
+# storage round-trips in a background thread instead of on the first request.
+#
+#   python warmup.py [streamlit args...]   warm in the background, then `streamlit run app.py`
+#   python warmup.py --only                warm in the foreground and print timings (no server)
+#
+# app.py also calls start_warmup() once per process, so a plain `streamlit run app.py`
+# still warms for every user after the first. The listing and cache keys primed here
+# match the ones candidates.py reads (listing.get_listing, cache_backend "blob").
+import importlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger("warmup")
+
+HEAVY_MODULES = ("pandas", "numpy", "openai", "azure.storage.blob",
+                 "schema", "report", "similarity", "search_index", "compare")
+MAX_CANDIDATES = int(os.getenv("WARMUP_MAX_CANDIDATES", "200"))
+
+_thread: threading.Thread | None = None
+_lock = threading.Lock()
+_report: dict = {"state": "idle", "steps": {}}
+
+
+def _step(name: str, fn):
+    t0 = time.perf_counter()
+    try:
+        detail = fn()
+        _report["steps"][name] = {"ok": True, "seconds": round(time.perf_counter() - t0, 3), "detail": detail}
+    except Exception as e:  # one failing step (e.g. no LLM key) must not stop the others
+        _report["steps"][name] = {"ok": False, "seconds": round(time.perf_counter() - t0, 3), "error": str(e)}
+        log.warning("warm-up step %s failed: %s", name, e)
+
+
+def _imports():
+    for mod in HEAVY_MODULES:
+        importlib.import_module(mod)
+    return len(HEAVY_MODULES)
+
+
+def _clients():
+    import compare
+    import send_back
+    from agent_comparer import get_client
+    send_back._make_bsc()
+    compare._bsc()
+    return {"llm": get_client() is not None}
+
+
+def _search_index():
+    """Load and reconcile the index here, then keep it fresh off the request path."""
+    from search_index import REFRESH_INTERVAL, refresh, start_refresher
+    stats = refresh()
+    start_refresher(first_delay=REFRESH_INTERVAL)
+    return stats
+
+
+def _candidate_data():
+    """Prime listings and CSV/summary bytes under the keys candidates.py uses."""
+    import storage
+    from cache_backend import cached_bytes
+    from listing import get_listing
+    from send_back import _dash_cc
+    container = os.getenv("CONTAINER", "dashboard")
+    cc = _dash_cc()
+
+    # the first full listing resync (listing.py) is the expensive one; pay it here
+    bank = get_listing(container)
+    for _ in range(50):
+        if not bank.refresh().get("scan", {}).get("shards_left"):
+            break
+    cands = bank.candidates()[:MAX_CANDIDATES]
+
+    def _blob(path: str):
+        def _load():
+            try:
+                return storage.download(cc, path)
+            except Exception:
+                return None
+        return cached_bytes("blob", f"{container}/{path}", _load, ttl=30)
+
+    def _one(cand: str) -> int:
+        start = cand.rstrip("/") + "/"
+        csvs = bank.csvs(cand) or []
+        for p in [*csvs, f"{start}summary.txt"]:
+            _blob(p)
+        return len(csvs) + 1
+
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        blobs = sum(ex.map(_one, cands))
+    return {"candidates": len(cands), "blobs": blobs}
+
+
+def warm() -> dict:
+    """Run every warm-up step in order; returns the timing report."""
+    t0 = time.perf_counter()
+    _report.update(state="running", started=time.time(), steps={})
+    _step("imports", _imports)
+    _step("clients", _clients)
+    _step("search_index", _search_index)
+    if os.getenv("WARMUP_PRELOAD", "1") == "1":
+        _step("candidate_data", _candidate_data)
+    _report.update(state="done", seconds=round(time.perf_counter() - t0, 3))
+    log.info("warm-up finished in %.2fs", _report["seconds"])
+    return _report
+
+
+def start_warmup() -> threading.Thread:
+    """Start warm() in a daemon thread once per process; later calls return the same thread."""
+    global _thread
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=warm, name="warmup", daemon=True)
+            _thread.start()
+        return _thread
+
+
+def report() -> dict:
+    return dict(_report)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if sys.argv[1:] == ["--only"]:
+        print(json.dumps(warm(), indent=2, default=str))
+        sys.exit(0)
+    # start through the importable module so app.py's start_warmup() sees the same thread
+    import warmup
+    warmup.start_warmup()
+    from streamlit.web import cli as stcli
+    sys.argv = ["streamlit", "run", os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py"), *sys.argv[1:]]
+    sys.exit(stcli.main())
@@ -0,0 +1,86 @@
+# write_behind.py
+# Background persistence for archive copies.
+#
+# Save handlers commit the primary write (dashboard summary.txt) synchronously and
+# hand every archive copy to this queue. Jobs are grouped into lanes by target blob:
+# writes to the same blob run strictly in submission order (last save wins), while
+# different blobs flush in parallel. Failed jobs are retried with backoff, and a
+# per-candidate status is kept for the UI: a target that failed stays reported
+# until a later write to it succeeds, and counters start over with each new save.
+#
+# Deliberately not durable, and ordered per target blob rather than per candidate.
+# Only derived copies go through here: every job writes one complete, self-contained
+# blob rendered from a summary that is already stored, and no job depends on
+# another target's write. Anything that must survive a crash, like the summary
+# itself, is written synchronously by the caller and never queued. On a clean
+# shutdown the pool's threads are joined, so queued copies are written; if the
+# process is killed they are lost, and saving the candidate again re-renders and
+# re-queues them. A journal (blob or SQLite) would have to persist rendered HTML
+# that the summary already determines.
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+
+class WriteBehindQueue:
+    def __init__(self, max_workers: int = 4, retries: int = 3, backoff: float = 0.5):
+        self.retries = retries
+        self.backoff = backoff
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="write-behind")
+        self._lanes: dict[str, deque] = {}
+        self._active: set[str] = set()
+        self._status: dict[str, dict] = {}
+        self._errors: dict[str, dict[str, str]] = {}   # group → {target key: last error}
+        self._lock = threading.Lock()
+
+    def submit(self, group: str, key: str, fn: Callable, *args, **kwargs):
+        """Queue `fn(*args, **kwargs)` for target `key`, reported under `group` (the candidate)."""
+        with self._lock:
+            self._lanes.setdefault(key, deque()).append((group, fn, args, kwargs))
+            st = self._status.setdefault(group, {"pending": 0, "done": 0, "failed": 0, "last_error": None})
+            if st["pending"] == 0:   # a new save: earlier successes no longer describe it
+                st["done"] = 0
+            st["pending"] += 1
+            if key not in self._active:
+                self._active.add(key)
+                self._pool.submit(self._drain, key)
+
+    def _run(self, fn, args, kwargs) -> Exception | None:
+        err = None
+        for attempt in range(self.retries):
+            try:
+                fn(*args, **kwargs)
+                return None
+            except Exception as e:
+                err = e
+                if attempt + 1 < self.retries:   # no wait after the last try: report the failure now
+                    time.sleep(self.backoff * (2 ** attempt))
+        return err
+
+    def _drain(self, key: str):
+        while True:
+            with self._lock:
+                lane = self._lanes.get(key)
+                if not lane:
+                    self._lanes.pop(key, None)
+                    self._active.discard(key)
+                    return
+                group, fn, args, kwargs = lane.popleft()
+            err = self._run(fn, args, kwargs)
+            with self._lock:
+                st = self._status[group]
+                errors = self._errors.setdefault(group, {})
+                st["pending"] -= 1
+                if err is None:
+                    st["done"] += 1
+                    errors.pop(key, None)
+                else:
+                    errors[key] = f"{key}: {err}"
+                st["failed"] = len(errors)
+                st["last_error"] = next(reversed(errors.values()), None)
+
+    def status(self, group: str) -> dict:
+        with self._lock:
+            return dict(self._status.get(group, {"pending": 0, "done": 0, "failed": 0, "last_error": None}))